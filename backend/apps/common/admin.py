@@ -1,3 +1,34 @@
 from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html
 
-# Register your models here.
+from .models import ExportJob
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'model', 'format', 'user', 'status', 'rows', 'created', 'finished_at', 'download']
+    list_filter = ['status', 'format', 'model']
+    list_select_related = ['user']
+    readonly_fields = ['error']
+    exclude = ['query', 'columns']
+    list_per_page = 25
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if request.user.is_superuser:
+            return qs
+        return qs.filter(user=request.user)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def download(self, obj):
+        if obj.status != ExportJob.DONE:
+            return '-'
+        return format_html('<a href="{}">{}</a>', reverse('common:export_download', args=[obj.pk]), obj.file_name)
+
+    download.short_description = 'Файл'
@@ -0,0 +1,136 @@
+"""
+Бенчмарки админки и API: задержка и количество SQL-запросов на каждый эндпоинт.
+
+Запросы выполняются тестовым клиентом Django в текущем процессе на реальной БД,
+поэтому результаты сравнимы только между прогонами на одном и том же наборе данных.
+Изменяющие запросы (не GET) выполняются в транзакции, которая откатывается, - прогон не меняет данные.
+"""
+import json
+import statistics
+import time
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+
+from django.contrib import admin
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, NoReverseMatch
+
+from apps.products.models import Product, Variation
+from apps.promotions.models import PriceChangeBatch
+from apps.reviews.models import Review
+
+
+Target = namedtuple('Target', ['name', 'method', 'url', 'data'])
+
+# Прирост, меньше которого изменение задержки считается шумом, мс
+MIN_LATENCY_DELTA_MS = 1.0
+
+
+def admin_targets():
+    """Список объектов и страница редактирования первого объекта для каждой зарегистрированной ModelAdmin."""
+    targets = []
+    for model in sorted(admin.site._registry, key=lambda model: model._meta.label):
+        opts = model._meta
+        prefix = f'admin:{opts.app_label}_{opts.model_name}'
+        try:
+            targets.append(Target(f'admin.{opts.label_lower}.changelist', 'get', reverse(f'{prefix}_changelist'), None))
+        except NoReverseMatch:
+            continue
+        pk = model._default_manager.order_by('pk').values_list('pk', flat=True).first()
+        if pk is not None:
+            targets.append(Target(f'admin.{opts.label_lower}.change', 'get', reverse(f'{prefix}_change', args=[pk]), None))
+    return targets
+
+
+def api_targets():
+    targets = [Target('api.products.catalog', 'get', reverse('products:catalog'), None)]
+
+    product_id = Variation.objects.order_by('product_id').values_list('product_id', flat=True).first()
+    if product_id is not None:
+        targets += [
+            Target(
+                'api.products.get_variations', 'get',
+                reverse('products:get_variations_for_product', args=[product_id]), None,
+            ),
+            Target('api.products.search_variations', 'get', reverse('products:search_variations'),
+                   {'product': product_id}),
+        ]
+    targets += [
+        Target('api.products.search', 'get', reverse('products:search_products'), None),
+        Target('api.products.search_term', 'get', reverse('products:search_products'), {'term': 'а', 'page': 2}),
+    ]
+
+    # Товар с наибольшим числом отзывов - худший случай для листинга
+    product_id = Product.objects.order_by('-rating_count', 'pk').values_list('pk', flat=True).first()
+    if product_id is not None:
+        url = reverse('reviews:product_reviews', args=[product_id])
+        targets += [
+            Target('api.reviews.helpful', 'get', url, None),
+            Target('api.reviews.newest', 'get', url, {'sort': 'newest'}),
+        ]
+
+    review_id = Review.objects.filter(status=Review.APPROVED).order_by('pk').values_list('pk', flat=True).first()
+    if review_id is not None:
+        targets.append(Target('api.reviews.vote', 'post', reverse('reviews:vote_review', args=[review_id]),
+                              {'helpful': '1'}))
+
+    # Пробная переоценка всего каталога - одна агрегация по всем вариациям
+    targets.append(Target('api.promotions.reprice_dry_run', 'post', reverse('promotions:reprice_variations'), {
+        'filters': json.dumps({'price__gte': 0}), 'mode': PriceChangeBatch.PERCENT, 'value': '-10',
+        'rounding': PriceChangeBatch.ROUND_99, 'dry_run': '1',
+    }))
+    return targets
+
+
+@contextmanager
+def rolled_back():
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def measure(client, target, repeat, warmup):
+    request = getattr(client, target.method)
+    isolation = nullcontext if target.method == 'get' else rolled_back
+    for _ in range(warmup):
+        with isolation():
+            request(target.url, target.data)
+
+    timings = []
+    for _ in range(repeat):
+        with isolation(), CaptureQueriesContext(connection) as queries:
+            started_at = time.perf_counter()
+            response = request(target.url, target.data)
+            timings.append((time.perf_counter() - started_at) * 1000)
+
+    timings.sort()
+    return {
+        'url': target.url,
+        'method': target.method.upper(),
+        'status': response.status_code,
+        'queries': len(queries),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'min_ms': round(timings[0], 3),
+    }
+
+
+def compare(baseline, results, threshold):
+    """
+    Регрессии относительно сохраненного прогона: рост медианы больше чем на threshold (доля),
+    любой рост числа запросов и смена кода ответа.
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['queries'] > before['queries']:
+            regressions.append(f'{name}: запросов {before["queries"]} -> {result["queries"]}')
+        delta = result['median_ms'] - before['median_ms']
+        if delta > MIN_LATENCY_DELTA_MS and delta > before['median_ms'] * threshold:
+            regressions.append(f'{name}: медиана {before["median_ms"]:.1f} -> {result["median_ms"]:.1f} мс')
+        if result['status'] != before['status']:
+            regressions.append(f'{name}: код ответа {before["status"]} -> {result["status"]}')
+    return regressions
@@ -0,0 +1,329 @@
+"""
+Генератор синтетических данных для нагрузочного тестирования.
+
+Все случайные решения принимаются генераторами random.Random, засеянными от (seed, этап, номер чанка),
+поэтому содержимое каждого чанка определяется только профилем и seed. При нескольких процессах
+чанки вставляются в произвольном порядке, и может отличаться только нумерация первичных ключей.
+Ссылки на справочники и ранее созданные строки выбираются из списков id в памяти, вставка идет
+через bulk_create чанками.
+"""
+import random
+from array import array
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+
+from apps.customer_collections.models import Cart, CartItem
+from apps.orders.models import Order, OrderItem
+from apps.payment.models import Payment
+from apps.products.models import (
+    Product, Variation, CoffeeAttribute, TeaAttribute, AccessoryAttribute,
+    TeaCategory, AccessoryType, Aroma, Additive, Country, Manufacturer
+)
+from apps.products import reference
+from apps.products.price_history import record_price_changes
+from apps.reviews.models import Rating, Review
+
+User = get_user_model()
+
+
+PROFILES = {
+    'small': {
+        'users': 500, 'products': 2_000, 'variations_per_product': 3, 'orders': 2_000,
+        'countries': 30, 'manufacturers': 50,
+    },
+    'medium': {
+        'users': 20_000, 'products': 100_000, 'variations_per_product': 4, 'orders': 100_000,
+        'countries': 60, 'manufacturers': 500,
+    },
+    'large': {
+        'users': 200_000, 'products': 1_000_000, 'variations_per_product': 5, 'orders': 1_000_000,
+        'countries': 100, 'manufacturers': 2_000,
+    },
+}
+
+CHUNK_SIZE = 5_000
+PASSWORD = 'test1234'
+
+TEA_CATEGORIES = ['Зеленый чай', 'Черный чай', 'Травяной чай', 'Пуэр', 'Белый чай', 'Улун']
+ACCESSORY_TYPES = ['Чашки и кружки', 'Чайники', 'Кофемолки', 'Турки', 'Заварники']
+AROMAS = [
+    'Шоколадный', 'Ванильный', 'Карамельный', 'Ореховый', 'Цитрусовый', 'Цветочный', 'Фруктовый', 'Пряный',
+    'Медовый', 'Древесный', 'Землистый', 'Травяной', 'Мятный', 'Лавандовый', 'Розовый',
+]
+ADDITIVES = [
+    'Корица молотая', 'Кардамон зерна', 'Имбирь сушеный', 'Ваниль стручки', 'Гвоздика бутоны',
+    'Цедра апельсина сушеная', 'Лепестки розы сушеные', 'Жасмин цветки', 'Мята сушеная', 'Кокосовая стружка',
+]
+NAME_WORDS = {
+    'tea': (['Нефритовый', 'Лунный', 'Весенний', 'Тихий', 'Небесный'], ['Бриз', 'Дракон', 'Лотос', 'Сад', 'Путь']),
+    'coffee': (['Золотой', 'Горный', 'Северный', 'Королевский', 'Янтарный'], ['Рассвет', 'Феникс', 'Титан', 'Гром']),
+    'accessory': (['Классический', 'Стальной', 'Фарфоровый', 'Матовый'], ['Мастер', 'Стиль', 'Силуэт', 'Шарм']),
+}
+WEIGHTS = [50, 100, 250, 500, 1000]
+PIECES = [1, 5, 10, 20, 50]
+STATUSES = [status for status, _ in Order.STATUSES]
+
+# Массивы id, загруженные в родительском процессе. Рабочие процессы создаются через fork
+# и наследуют их без сериализации
+shared = {}
+
+
+def rng_for(seed, stage, chunk):
+    return random.Random(f'{seed}:{stage}:{chunk}')
+
+
+def faker_for(seed, stage, chunk):
+    fake = Faker('ru_RU')
+    fake.seed_instance(f'{seed}:{stage}:{chunk}')
+    return fake
+
+
+def chunks(total, size=CHUNK_SIZE):
+    return [(number, start, min(size, total - start)) for number, start in enumerate(range(0, total, size))]
+
+
+def create_references(profile, seed):
+    fake = faker_for(seed, 'references', 0)
+    countries = {fake.unique.country() for _ in range(profile['countries'])}
+    manufacturers = {fake.unique.company() for _ in range(profile['manufacturers'])}
+
+    for model, names in (
+        (Country, countries), (Manufacturer, manufacturers), (Aroma, AROMAS), (Additive, ADDITIVES),
+    ):
+        model.objects.bulk_create([model(name=name) for name in names], ignore_conflicts=True)
+    # У категорий и типов нет уникального индекса - создаем только недостающие
+    for model, names in ((TeaCategory, TEA_CATEGORIES), (AccessoryType, ACCESSORY_TYPES)):
+        existing = set(model.objects.filter(name__in=names).values_list('name', flat=True))
+        model.objects.bulk_create([model(name=name) for name in names if name not in existing])
+
+    # bulk_create не отправляет сигналы - сбрасываем кеш справочников сами
+    reference.invalidate()
+    return {
+        'countries': list(reference.get_names(Country)),
+        'manufacturers': list(reference.get_names(Manufacturer)),
+        'aromas': list(reference.get_names(Aroma)),
+        'additives': list(reference.get_names(Additive)),
+        'tea_categories': list(reference.get_names(TeaCategory)),
+        'accessory_types': list(reference.get_names(AccessoryType)),
+    }
+
+
+def generate_products(task):
+    seed, number, start, count, variations_per_product, refs = task
+    rng = rng_for(seed, 'products', number)
+    fake = faker_for(seed, 'products', number)
+    descriptions = [fake.text(max_nb_chars=150) for _ in range(200)]
+    cities = [fake.city() for _ in range(50)]
+
+    products = []
+    for i in range(count):
+        product_type = rng.choice(Product.PRODUCT_TYPES)[0]
+        adjectives, nouns = NAME_WORDS[product_type]
+        products.append(Product(
+            name=f'{rng.choice(adjectives)} {rng.choice(nouns)} #{start + i}',
+            description=rng.choice(descriptions),
+            product_type=product_type,
+            manufacturer_id=rng.choice(refs['manufacturers']),
+            country_id=rng.choice(refs['countries']),
+            region=rng.choice(cities) if rng.random() < 0.3 else None,
+        ))
+
+    with transaction.atomic():
+        products = Product.objects.bulk_create(products)
+
+        coffee, tea, accessories, variations = [], [], [], []
+        coffee_aromas, coffee_additives, tea_aromas, tea_additives = [], [], [], []
+        for product in products:
+            if product.product_type == 'coffee':
+                arabica = rng.randint(0, 100)
+                robusta = rng.randint(0, 100 - arabica)
+                coffee.append(CoffeeAttribute(
+                    product_id=product.pk,
+                    coffee_type=rng.choice(CoffeeAttribute.COFFEE_TYPES)[0],
+                    roast=rng.choice(CoffeeAttribute.ROASTS)[0],
+                    q_grading=Decimal(rng.randint(7000, 9000)) / 100,
+                    arabica_percent=arabica,
+                    robusta_percent=robusta,
+                    liberica_percent=100 - arabica - robusta,
+                ))
+            elif product.product_type == 'tea':
+                tea.append(TeaAttribute(
+                    product_id=product.pk,
+                    tea_type=rng.choice(TeaAttribute.TEA_TYPES)[0],
+                    category_id=rng.choice(refs['tea_categories']),
+                ))
+            else:
+                accessories.append(AccessoryAttribute(
+                    product_id=product.pk,
+                    accessory_type_id=rng.choice(refs['accessory_types']),
+                    volume=Decimal(rng.randint(50, 200)) / 100,
+                ))
+
+            pairs = rng.sample([(w, p) for w in WEIGHTS for p in PIECES], variations_per_product)
+            for weight, pieces in pairs:
+                variations.append(Variation(
+                    product_id=product.pk,
+                    price=Decimal(rng.randint(10_000, 200_000)) / 100,
+                    weight=weight,
+                    pieces=pieces,
+                    text_description_of_count=f'{pieces} шт по {weight} гр',
+                    stock=rng.randint(0, 100),
+                ))
+
+        for attr in CoffeeAttribute.objects.bulk_create(coffee):
+            coffee_aromas += [(attr.pk, a) for a in rng.sample(refs['aromas'], rng.randint(1, 3))]
+            coffee_additives += [(attr.pk, a) for a in rng.sample(refs['additives'], rng.randint(0, 2))]
+        for attr in TeaAttribute.objects.bulk_create(tea):
+            tea_aromas += [(attr.pk, a) for a in rng.sample(refs['aromas'], rng.randint(1, 3))]
+            tea_additives += [(attr.pk, a) for a in rng.sample(refs['additives'], rng.randint(0, 2))]
+        AccessoryAttribute.objects.bulk_create(accessories)
+        Variation.objects.bulk_create(variations, batch_size=CHUNK_SIZE)
+        record_price_changes(Variation.objects.filter(product__in=[product.pk for product in products]))
+
+        for through, owner, target, pairs in (
+            (CoffeeAttribute.aromas.through, 'coffeeattribute_id', 'aroma_id', coffee_aromas),
+            (CoffeeAttribute.additives.through, 'coffeeattribute_id', 'additive_id', coffee_additives),
+            (TeaAttribute.aromas.through, 'teaattribute_id', 'aroma_id', tea_aromas),
+            (TeaAttribute.additives.through, 'teaattribute_id', 'additive_id', tea_additives),
+        ):
+            through.objects.bulk_create(
+                [through(**{owner: owner_id, target: target_id}) for owner_id, target_id in pairs],
+                batch_size=CHUNK_SIZE,
+            )
+    return len(products), len(variations)
+
+
+def load_shared_ids():
+    shared['product_ids'] = array('q', Product.objects.order_by('id').values_list('id', flat=True).iterator())
+    shared['variation_ids'] = array('q')
+    shared['variation_cents'] = array('q')
+    for variation_id, price in Variation.objects.order_by('id').values_list('id', 'price').iterator():
+        shared['variation_ids'].append(variation_id)
+        shared['variation_cents'].append(int(price * 100))
+
+
+def load_shared_user_ids(seed):
+    shared['user_ids'] = array('q', User.objects.filter(
+        username__startswith=f'user_{seed}_'
+    ).order_by('id').values_list('id', flat=True).iterator())
+
+
+def generate_users(task):
+    seed, number, start, count, password_hash = task
+    rng = rng_for(seed, 'users', number)
+    fake = faker_for(seed, 'users', number)
+    first_names = [fake.first_name() for _ in range(100)]
+    last_names = [fake.last_name() for _ in range(100)]
+    product_ids = shared['product_ids']
+    variation_ids = shared['variation_ids']
+
+    users = [
+        User(
+            username=f'user_{seed}_{start + i}',
+            email=f'user_{seed}_{start + i}@example.com',
+            first_name=rng.choice(first_names),
+            last_name=rng.choice(last_names),
+            # Хеш пароля посчитан один раз на весь набор: PBKDF2 на каждого пользователя - самая долгая часть
+            password=password_hash,
+        )
+        for i in range(count)
+    ]
+
+    with transaction.atomic():
+        users = User.objects.bulk_create(users)
+
+        carts, cart_variations = [], []
+        ratings = []
+        for user in users:
+            if rng.random() < 0.3:
+                carts.append(Cart(user_id=user.pk))
+                cart_variations.append(
+                    [variation_ids[rng.randrange(len(variation_ids))] for _ in range(rng.randint(1, 5))]
+                )
+            if rng.random() < 0.2:
+                for product_index in {rng.randrange(len(product_ids)) for _ in range(rng.randint(1, 3))}:
+                    ratings.append(Rating(product_id=product_ids[product_index], user_id=user.pk,
+                                          score=rng.choices([1, 2, 3, 4, 5], weights=[1, 1, 2, 4, 6])[0]))
+
+        cart_items = []
+        for cart, variations in zip(Cart.objects.bulk_create(carts), cart_variations):
+            cart_items += [
+                CartItem(cart_id=cart.pk, variation_id=variation_id, quantity=rng.randint(1, 3))
+                for variation_id in set(variations)
+            ]
+        CartItem.objects.bulk_create(cart_items, batch_size=CHUNK_SIZE)
+
+        reviews = []
+        for rating in Rating.objects.bulk_create(ratings, batch_size=CHUNK_SIZE):
+            if rng.random() < 0.4:
+                reviews.append(Review(
+                    rating_id=rating.pk,
+                    product_id=rating.product_id,
+                    text=fake.text(max_nb_chars=300) if rng.random() < 0.1 else rng.choice(last_names),
+                    status=rng.choices([Review.APPROVED, Review.PENDING, Review.REJECTED], weights=[8, 1, 1])[0],
+                ))
+        Review.objects.bulk_create(reviews, batch_size=CHUNK_SIZE)
+    return len(users)
+
+
+def generate_orders(task):
+    seed, number, start, count = task
+    rng = rng_for(seed, 'orders', number)
+    fake = faker_for(seed, 'orders', number)
+    phones = [fake.phone_number() for _ in range(100)]
+    variation_ids = shared['variation_ids']
+    variation_cents = shared['variation_cents']
+    user_ids = shared['user_ids']
+    now = timezone.now()
+
+    orders, order_lines = [], []
+    for i in range(count):
+        user_id = user_ids[rng.randrange(len(user_ids))]
+        orders.append(Order(
+            user_id=user_id,
+            first_name=f'Имя{user_id}',
+            last_name=f'Фамилия{user_id}',
+            email=f'customer{user_id}@example.com',
+            phone=rng.choice(phones),
+            paid=rng.random() < 0.7,
+            status=rng.choice(STATUSES),
+        ))
+        order_lines.append([rng.randrange(len(variation_ids)) for _ in range(rng.randint(1, 5))])
+
+    with transaction.atomic():
+        orders = Order.objects.bulk_create(orders)
+
+        items, payments, created = [], [], []
+        for i, (order, lines) in enumerate(zip(orders, order_lines)):
+            total = 0
+            for index in set(lines):
+                quantity = rng.randint(1, 3)
+                total += variation_cents[index] * quantity
+                items.append(OrderItem(
+                    order_id=order.pk, variation_id=variation_ids[index],
+                    price=Decimal(variation_cents[index]) / 100, quantity=quantity,
+                ))
+            if order.paid:
+                payments.append(Payment(
+                    order_id=order.pk, provider='synthetic',
+                    provider_reference=f'syn_{seed}_{start + i}', amount=Decimal(total) / 100,
+                ))
+            created.append((order.pk, now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))))
+        OrderItem.objects.bulk_create(items, batch_size=CHUNK_SIZE)
+        Payment.objects.bulk_create(payments, batch_size=CHUNK_SIZE)
+
+        # auto_now_add не дает задать дату при вставке - разносим заказы по году отдельным проходом
+        Order.objects.bulk_update(
+            [Order(pk=pk, created=moment) for pk, moment in created], ['created'], batch_size=1000
+        )
+    return len(orders)
+
+
+def hash_password():
+    return make_password(PASSWORD)
@@ -0,0 +1,226 @@
+"""
+Выгрузка списков админки в CSV и XLSX.
+
+ExportAdminMixin добавляет действия выгрузки. Действие получает queryset changelist'а, то есть с учетом
+фильтров и поиска, а при "выбрать все" - весь отфильтрованный список, не только текущую страницу.
+Строки читаются через values_list(...).iterator(chunk_size): связанные поля приходят JOIN'ами одного
+запроса, объекты моделей не создаются, и в памяти одновременно находится только один чанк.
+
+До EXPORT_SYNC_MAX_ROWS строк CSV отдается сразу потоковым ответом. Большие выгрузки и XLSX
+(формат zip, его нельзя отдавать по частям) ставятся в очередь ExportJob: запрос сериализуется,
+команда run_export_jobs пишет файл в EXPORT_DIR, скачать его можно по ссылке из сообщения.
+
+Запрос хранится как pickle объекта Query - это внутренний формат Django, и после обновления Django
+старые задания могут не загрузиться (упадут с ошибкой). Перед обновлением дождитесь пустой очереди.
+Задание, чей воркер умер, через EXPORT_STALE_MINUTES возвращается в очередь, но не больше
+EXPORT_MAX_ATTEMPTS раз - иначе помечается ошибкой.
+"""
+import csv
+import datetime
+import pickle
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib import admin, messages
+from django.db import close_old_connections
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
+
+from .models import ExportJob
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+def export_dir():
+    path = Path(settings.EXPORT_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def cell_value(value):
+    # XLSX не хранит часовой пояс - выгружаем локальное время, как его показывает админка
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def iter_rows(queryset, columns, chunk_size=None):
+    paths = [path for _, path in columns]
+    rows = queryset.prefetch_related(None).values_list(*paths).iterator(
+        chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE
+    )
+    for row in rows:
+        yield [cell_value(value) for value in row]
+
+
+class Echo:
+    """Файлоподобный объект для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(Echo())
+    # BOM - чтобы Excel открыл UTF-8 с кириллицей без мастера импорта
+    yield '﻿' + writer.writerow([header for header, _ in columns])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_csv(path, columns, rows):
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        for count, line in enumerate(csv_lines(columns, rows)):
+            file.write(line)
+    return count
+
+
+def write_xlsx(path, columns, rows):
+    # write_only: строки сразу сбрасываются во временный файл, а не держатся в памяти листом
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append([header for header, _ in columns])
+    count = 0
+    for count, row in enumerate(rows, 1):
+        sheet.append(row)
+    workbook.save(path)
+    return count
+
+
+WRITERS = {ExportJob.CSV: write_csv, ExportJob.XLSX: write_xlsx}
+
+
+def export_file_name(model, export_format):
+    return f'{model._meta.model_name}-{timezone.localtime():%Y%m%d-%H%M%S}.{export_format}'
+
+
+def streaming_csv_response(queryset, columns):
+    response = StreamingHttpResponse(csv_lines(columns, iter_rows(queryset, columns)), content_type='text/csv')
+    file_name = export_file_name(queryset.model, ExportJob.CSV)
+    response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+    return response
+
+
+def enqueue_export(user, queryset, columns, export_format):
+    return ExportJob.objects.create(
+        user=user,
+        model=queryset.model._meta.label_lower,
+        format=export_format,
+        query=pickle.dumps(queryset.prefetch_related(None).query),
+        columns=[list(column) for column in columns],
+    )
+
+
+def run_export_job(job):
+    """Выполняет задание, если его еще не взял другой воркер. Возвращает True, если задание выполнено здесь."""
+    claimed = ExportJob.objects.filter(pk=job.pk, status=ExportJob.PENDING).update(
+        status=ExportJob.RUNNING, started_at=timezone.now(), attempts=F('attempts') + 1
+    )
+    if not claimed:
+        return False
+
+    model = apps.get_model(job.model)
+    queryset = model.objects.all()
+    queryset.query = pickle.loads(job.query)
+    file_name = f'{job.pk}-{export_file_name(model, job.format)}'
+    path = export_dir() / file_name
+    try:
+        rows = WRITERS[job.format](path, job.columns, iter_rows(queryset, job.columns))
+    except Exception as e:
+        path.unlink(missing_ok=True)
+        ExportJob.objects.filter(pk=job.pk).update(
+            status=ExportJob.FAILED, error=str(e), finished_at=timezone.now()
+        )
+        raise
+    ExportJob.objects.filter(pk=job.pk).update(
+        status=ExportJob.DONE, rows=rows, file_name=file_name, finished_at=timezone.now()
+    )
+    return True
+
+
+def reclaim_stale_exports(now=None):
+    """Задания в статусе running дольше EXPORT_STALE_MINUTES - воркер умер: возвращаем в очередь или сдаемся."""
+    now = now or timezone.now()
+    stale = ExportJob.objects.filter(
+        status=ExportJob.RUNNING, started_at__lt=now - datetime.timedelta(minutes=settings.EXPORT_STALE_MINUTES)
+    )
+    failed = stale.filter(attempts__gte=settings.EXPORT_MAX_ATTEMPTS).update(
+        status=ExportJob.FAILED, error='Воркер не завершил выгрузку', finished_at=now
+    )
+    retried = stale.update(status=ExportJob.PENDING, started_at=None)
+    return retried, failed
+
+
+def run_pending_exports():
+    reclaim_stale_exports()
+    done = 0
+    for job in ExportJob.objects.filter(status=ExportJob.PENDING).order_by('created'):
+        close_old_connections()
+        try:
+            done += run_export_job(job)
+        except Exception:
+            # Ошибка записана в задание, остальные задания выполняются дальше
+            continue
+    return done
+
+
+def delete_expired_exports():
+    expired_before = timezone.now() - datetime.timedelta(hours=settings.EXPORT_RETENTION_HOURS)
+    # Выполняющееся задание не трогаем: воркер еще пишет файл и обновит строку
+    expired = ExportJob.objects.filter(created__lt=expired_before).exclude(status=ExportJob.RUNNING)
+    for file_name in expired.exclude(file_name='').values_list('file_name', flat=True):
+        (export_dir() / file_name).unlink(missing_ok=True)
+    return expired.delete()[0]
+
+
+def export_path(job):
+    path = export_dir() / job.file_name
+    return path if job.status == ExportJob.DONE and job.file_name and path.is_file() else None
+
+
+class ExportAdminMixin:
+    """
+    Действия выгрузки для ModelAdmin. export_columns - [(заголовок, путь values_list), ...],
+    например ('Товар', 'variation__product__name').
+    """
+
+    export_columns = ()
+    actions = ['export_csv', 'export_xlsx']
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        if openpyxl is None:
+            actions.pop('export_xlsx', None)
+        return actions
+
+    def get_export_columns(self, request):
+        return self.export_columns
+
+    def export(self, request, queryset, export_format):
+        columns = self.get_export_columns(request)
+        if export_format == ExportJob.CSV and queryset.count() <= settings.EXPORT_SYNC_MAX_ROWS:
+            return streaming_csv_response(queryset, columns)
+
+        job = enqueue_export(request.user, queryset, columns, export_format)
+        url = reverse('common:export_download', args=[job.pk])
+        self.message_user(
+            request,
+            format_html('Выгрузка поставлена в очередь, файл будет доступен по <a href="{}">ссылке</a>', url),
+            messages.INFO,
+        )
+
+    @admin.action(description='Выгрузить в CSV')
+    def export_csv(self, request, queryset):
+        return self.export(request, queryset, ExportJob.CSV)
+
+    @admin.action(description='Выгрузить в XLSX (в фоне)')
+    def export_xlsx(self, request, queryset):
+        return self.export(request, queryset, ExportJob.XLSX)
@@ -0,0 +1,120 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from apps.products.models import Product
+
+
+# Режимы соединений и переменные окружения, которые prod.py превращает в настройки БД
+MODES = {
+    'pool': {'DATABASE_POOL': '1'},
+    'persistent': {'DATABASE_POOL': '0', 'DATABASE_CONN_MAX_AGE': '60'},
+    'none': {'DATABASE_POOL': '0', 'DATABASE_CONN_MAX_AGE': '0'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность запросов к PostgreSQL с пулом соединений, '
+        'с постоянными соединениями и с новым соединением на запрос. '
+        'Запускать с --settings=config.settings.prod и переменными POSTGRES_*'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Количество параллельных потоков')
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на поток')
+        parser.add_argument('--path', help='URL запроса, по умолчанию - каталог')
+        parser.add_argument('--mode', choices=sorted(MODES),
+                            help='Замерить один режим в текущем процессе (используется внутри команды)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Бенчмарк рассчитан на PostgreSQL: запустите с --settings=config.settings.prod')
+
+        if options['mode']:
+            result = self.measure(options['path'] or reverse('products:catalog'), options['threads'],
+                                  options['requests'])
+            self.stdout.write(json.dumps(result))
+            return
+
+        call_command('migrate', verbosity=0)
+        if not Product.objects.exists():
+            call_command('generate_dataset', profile='small', stdout=self.stdout)
+        connection.close()
+
+        # Каждый режим - в отдельном процессе: настройки пула читаются один раз при создании соединения
+        results = {}
+        for mode, env in MODES.items():
+            command = [
+                sys.executable, sys.argv[0], 'benchmark_db_pool', '--mode', mode,
+                '--threads', str(options['threads']), '--requests', str(options['requests']),
+            ]
+            if options['path']:
+                command += ['--path', options['path']]
+            process = subprocess.run(
+                command, env={**os.environ, **env, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE},
+                capture_output=True, text=True,
+            )
+            if process.returncode:
+                raise CommandError(f'Режим {mode} завершился с ошибкой:\n{process.stderr}')
+            results[mode] = json.loads(process.stdout.strip().splitlines()[-1])
+
+        self.stdout.write(f'{"режим":<12} {"запр/с":>10} {"p50, мс":>10} {"p95, мс":>10} {"ошибок":>8}')
+        for mode, result in results.items():
+            self.stdout.write(
+                f'{mode:<12} {result["rps"]:>10.1f} {result["p50_ms"]:>10.2f} {result["p95_ms"]:>10.2f} '
+                f'{result["errors"]:>8}'
+            )
+
+    def measure(self, path, threads, requests):
+        handler = WSGIHandler()
+        environ = RequestFactory().get(path).environ
+        timings = []
+        errors = []
+        lock = threading.Lock()
+
+        def start_response(status, headers, exc_info=None):
+            pass
+
+        def worker():
+            local_timings, local_errors = [], 0
+            for _ in range(requests):
+                started_at = time.perf_counter()
+                # Полный цикл WSGI: request_started/request_finished закрывают или возвращают соединение в пул
+                response = handler(dict(environ), start_response)
+                response.close()
+                local_timings.append((time.perf_counter() - started_at) * 1000)
+                local_errors += response.status_code >= 400
+            with lock:
+                timings.extend(local_timings)
+                errors.append(local_errors)
+
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            pool = [threading.Thread(target=worker) for _ in range(threads)]
+            started_at = time.perf_counter()
+            for thread in pool:
+                thread.start()
+            for thread in pool:
+                thread.join()
+            duration = time.perf_counter() - started_at
+
+        timings.sort()
+        return {
+            'rps': len(timings) / duration,
+            'p50_ms': statistics.median(timings),
+            'p95_ms': timings[int(len(timings) * 0.95) - 1],
+            'errors': sum(errors),
+        }
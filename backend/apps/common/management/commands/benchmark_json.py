@@ -0,0 +1,64 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import JsonResponse
+
+from apps.common import compression
+from apps.common.responses import FastJsonResponse
+from apps.products.models import Variation
+from apps.products.views import CATALOG_MAX_PAGE_SIZE, build_catalog_page
+from apps.promotions.pricing import get_effective_prices
+
+
+def median_ms(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started_at) * 1000)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает сериализацию больших ответов API через JsonResponse (DjangoJSONEncoder) '
+        'и FastJsonResponse (orjson), а также размер и время сжатия gzip и brotli'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--variations', type=int, default=5000, help='Вариаций в ответе со списком вариаций')
+        parser.add_argument('--repeat', type=int, default=20, help='Количество замеров')
+
+    def handle(self, *args, **options):
+        variations = list(
+            Variation.objects.values('id', 'text_description_of_count', 'price')[:options['variations']]
+        )
+        if not variations:
+            raise CommandError('Нет вариаций: сначала запустите generate_dataset')
+        prices = get_effective_prices(variation['id'] for variation in variations)
+        for variation in variations:
+            variation['effective_price'] = prices[variation['id']].price
+
+        payloads = {
+            f'variations ({len(variations)})': {'variations': variations, 'success': True},
+            f'catalog (page_size={CATALOG_MAX_PAGE_SIZE})': build_catalog_page('', None, 1, CATALOG_MAX_PAGE_SIZE)[0],
+        }
+        encodings = ['gzip'] + (['br'] if compression.brotli is not None else [])
+        repeat = options['repeat']
+
+        for name, payload in payloads.items():
+            django_ms = median_ms(lambda: JsonResponse(payload), repeat)
+            fast_ms = median_ms(lambda: FastJsonResponse(payload), repeat)
+            content = FastJsonResponse(payload).content
+            self.stdout.write(
+                f'{name}: {len(content) / 1024:.0f} КБ, JsonResponse {django_ms:.2f} мс, '
+                f'FastJsonResponse {fast_ms:.2f} мс (x{django_ms / fast_ms:.1f})'
+            )
+            for encoding in encodings:
+                compressed = compression.compress(content, encoding)
+                compress_ms = median_ms(lambda: compression.compress(content, encoding), repeat)
+                self.stdout.write(
+                    f'  {encoding:<5} {len(compressed) / 1024:>7.0f} КБ ({len(compressed) / len(content):.0%}), '
+                    f'{compress_ms:.2f} мс'
+                )
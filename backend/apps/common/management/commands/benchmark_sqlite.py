@@ -0,0 +1,153 @@
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from apps.customer_collections.models import Cart, CartItem
+from apps.products.models import Variation
+from apps.products.views import catalog
+
+
+MODES = ('default', 'tuned')
+
+
+def write_cart(rng, cart_ids, variation_ids):
+    cart_id, variation_id = rng.choice(cart_ids), rng.choice(variation_ids)
+    with transaction.atomic():
+        item, created = CartItem.objects.get_or_create(cart_id=cart_id, variation_id=variation_id)
+        if not created:
+            CartItem.objects.filter(pk=item.pk).update(quantity=F('quantity') + 1)
+
+
+def read_catalog(rng, request_factory, path, pages):
+    response = catalog(request_factory.get(path, {'page': rng.randint(1, pages)}))
+    if response.status_code != 200:
+        raise OperationalError(f'catalog returned {response.status_code}')
+
+
+def run_worker(args):
+    role, seed, deadline, cart_ids, variation_ids, pages = args
+    rng = random.Random(seed)
+    request_factory = RequestFactory()
+    path = reverse('products:catalog')
+    done, errors, latencies = 0, 0, []
+    while time.monotonic() < deadline:
+        started_at = time.perf_counter()
+        try:
+            if role == 'writer':
+                write_cart(rng, cart_ids, variation_ids)
+            else:
+                read_catalog(rng, request_factory, path, pages)
+            done += 1
+            latencies.append((time.perf_counter() - started_at) * 1000)
+        except OperationalError:
+            # "database is locked": транзакция не дождалась блокировки
+            errors += 1
+    connections.close_all()
+    return role, done, errors, latencies
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает параллельную запись в корзины и чтение каталога на SQLite '
+        'с настройками по умолчанию и с WAL/BEGIN IMMEDIATE (SQLITE_TUNING)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help='Процессов, пишущих в корзины')
+        parser.add_argument('--readers', type=int, default=4, help='Процессов, читающих каталог')
+        parser.add_argument('--duration', type=float, default=10, help='Длительность замера каждого режима, с')
+        parser.add_argument('--mode', choices=MODES, help='Замерить один режим в текущем процессе (используется внутри команды)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Бенчмарк рассчитан на SQLite')
+
+        if options['mode']:
+            self.stdout.write(json.dumps(self.measure(options)))
+            return
+
+        source = str(settings.DATABASES['default']['NAME'])
+        connection.close()
+        results = {}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for mode in MODES:
+                # Каждый режим работает на свежей копии базы: journal_mode=WAL сохраняется в файле
+                path = os.path.join(tmp_dir, f'{mode}.sqlite3')
+                with sqlite3.connect(source) as src, sqlite3.connect(path) as dst:
+                    src.backup(dst)
+                command = [
+                    sys.executable, sys.argv[0], 'benchmark_sqlite', '--mode', mode,
+                    '--writers', str(options['writers']), '--readers', str(options['readers']),
+                    '--duration', str(options['duration']),
+                ]
+                env = {
+                    **os.environ,
+                    'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE,
+                    'SQLITE_PATH': path,
+                    'SQLITE_TUNING': '1' if mode == 'tuned' else '0',
+                }
+                process = subprocess.run(command, env=env, capture_output=True, text=True)
+                if process.returncode:
+                    raise CommandError(f'Режим {mode} завершился с ошибкой:\n{process.stderr}')
+                results[mode] = json.loads(process.stdout.strip().splitlines()[-1])
+
+        self.stdout.write(
+            f'{"режим":<8} {"journal":<8} {"записей/с":>10} {"ошибок":>7} {"p95 зап., мс":>13} '
+            f'{"чтений/с":>10} {"ошибок":>7} {"p95 чт., мс":>12}'
+        )
+        for mode, result in results.items():
+            writer, reader = result['writer'], result['reader']
+            self.stdout.write(
+                f'{mode:<8} {result["journal_mode"]:<8} {writer["rate"]:>10.1f} {writer["errors"]:>7} '
+                f'{writer["p95_ms"]:>13.1f} {reader["rate"]:>10.1f} {reader["errors"]:>7} {reader["p95_ms"]:>12.1f}'
+            )
+
+    def measure(self, options):
+        with connection.cursor() as cursor:
+            if not settings.SQLITE_TUNING:
+                # Копия могла унаследовать WAL от исходной базы - возвращаем режим SQLite по умолчанию
+                cursor.execute('PRAGMA journal_mode=DELETE')
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+
+        cart_ids = list(Cart.objects.values_list('pk', flat=True)[:1000])
+        variation_ids = list(Variation.objects.values_list('pk', flat=True)[:10_000])
+        if not cart_ids or not variation_ids:
+            raise CommandError('Нужны корзины и вариации: сначала запустите generate_dataset')
+        pages = max(1, min(100, Variation.objects.count() // 100))
+        connections.close_all()
+
+        deadline = time.monotonic() + options['duration']
+        tasks = [
+            ('writer', number, deadline, cart_ids, variation_ids, pages) for number in range(options['writers'])
+        ] + [
+            ('reader', number, deadline, cart_ids, variation_ids, pages) for number in range(options['readers'])
+        ]
+        result = {'journal_mode': journal_mode}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            with multiprocessing.get_context('fork').Pool(len(tasks)) as pool:
+                outcomes = pool.map(run_worker, tasks)
+
+        for role in ('writer', 'reader'):
+            done = sum(outcome[1] for outcome in outcomes if outcome[0] == role)
+            latencies = sorted(latency for outcome in outcomes if outcome[0] == role for latency in outcome[3])
+            result[role] = {
+                'rate': done / options['duration'],
+                'errors': sum(outcome[2] for outcome in outcomes if outcome[0] == role),
+                'p95_ms': latencies[int(len(latencies) * 0.95) - 1] if latencies else 0,
+            }
+        return result
@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = 'Показывает статистику пула соединений PostgreSQL и соединения приложения на стороне сервера'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--exercise', type=int, default=0,
+                            help='Перед выводом выполнить столько параллельных SELECT 1 через пул')
+        parser.add_argument('--watch', type=float, help='Повторять вывод с этим интервалом в секундах')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'postgresql':
+            raise CommandError(f'База {options["database"]} не PostgreSQL ({connection.vendor})')
+
+        if options['exercise']:
+            self.exercise(options['database'], options['exercise'])
+
+        while True:
+            self.report(connection)
+            if not options['watch']:
+                break
+            time.sleep(options['watch'])
+
+    def exercise(self, alias, count):
+        def query(_):
+            try:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            finally:
+                # Соединение потока возвращается в пул, как в конце HTTP-запроса
+                connections[alias].close()
+
+        with ThreadPoolExecutor(max_workers=min(count, 32)) as executor:
+            list(executor.map(query, range(count)))
+
+    def report(self, connection):
+        pool = connection.pool
+        if pool is None:
+            self.stdout.write(f'Пул не настроен, CONN_MAX_AGE={connection.settings_dict["CONN_MAX_AGE"]}')
+        else:
+            # Статистика пула этого процесса; у каждого воркера gunicorn свой пул
+            stats = pool.get_stats()
+            self.stdout.write(f'Пул {pool.name}: min_size={pool.min_size} max_size={pool.max_size}')
+            for key in sorted(stats):
+                self.stdout.write(f'  {key}: {stats[key]}')
+
+        # Соединения всех процессов приложения видны только на стороне сервера
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT application_name, state, count(*) FROM pg_stat_activity '
+                'WHERE datname = current_database() AND pid <> pg_backend_pid() '
+                'GROUP BY application_name, state ORDER BY 3 DESC'
+            )
+            rows = cursor.fetchall()
+            cursor.execute('SHOW max_connections')
+            max_connections = cursor.fetchone()[0]
+        if pool is not None:
+            connection.close()
+
+        self.stdout.write(f'Соединения с базой (max_connections={max_connections}):')
+        for application_name, state, count in rows:
+            self.stdout.write(f'  {application_name or "-"} {state or "-"}: {count}')
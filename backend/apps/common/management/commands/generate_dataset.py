@@ -0,0 +1,100 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from apps.common import datagen
+from apps.promotions.pricing import refresh_effective_prices
+from apps.reviews.aggregates import rebuild_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Генерирует синтетический набор данных заданного размера для нагрузочного тестирования'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=sorted(datagen.PROFILES), default='small', help='Профиль размера')
+        parser.add_argument('--seed', type=int, default=42, help='Seed генератора')
+        parser.add_argument('--workers', type=int, default=1, help='Количество процессов')
+        parser.add_argument('--users', type=int, help='Переопределить количество пользователей профиля')
+        parser.add_argument('--products', type=int, help='Переопределить количество товаров профиля')
+        parser.add_argument('--variations-per-product', type=int, help='Переопределить количество вариаций товара')
+        parser.add_argument('--orders', type=int, help='Переопределить количество заказов профиля')
+        parser.add_argument('--no-effective-prices', action='store_true',
+                            help='Не пересчитывать таблицу эффективных цен после генерации')
+
+    def handle(self, *args, **options):
+        profile = dict(datagen.PROFILES[options['profile']])
+        for key in ('users', 'products', 'variations_per_product', 'orders'):
+            if options[key] is not None:
+                profile[key] = options[key]
+        if not 1 <= profile['variations_per_product'] <= len(datagen.WEIGHTS) * len(datagen.PIECES):
+            raise CommandError('Недопустимое количество вариаций на товар')
+        if profile['users'] < 1 and profile['orders']:
+            raise CommandError('Для заказов нужен хотя бы один пользователь')
+
+        self.verbosity = options['verbosity']
+        seed = options['seed']
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            # SQLite допускает одного писателя - процессы только ждали бы блокировку друг друга
+            self.stdout.write(self.style.WARNING('SQLite не поддерживает параллельную запись, используется 1 процесс'))
+            workers = 1
+
+        self.stdout.write(f'Профиль {options["profile"]}: {profile}, seed={seed}, процессов: {workers}')
+        started_at = time.monotonic()
+
+        stage_started_at = time.monotonic()
+        refs = datagen.create_references(profile, seed)
+        password_hash = datagen.hash_password()
+        self.report('Справочники', stage_started_at)
+
+        self.run_stage('Товары', datagen.generate_products, [
+            (seed, number, start, count, profile['variations_per_product'], refs)
+            for number, start, count in datagen.chunks(profile['products'], datagen.CHUNK_SIZE // 5)
+        ], workers)
+
+        datagen.load_shared_ids()
+        self.run_stage('Пользователи', datagen.generate_users, [
+            (seed, number, start, count, password_hash)
+            for number, start, count in datagen.chunks(profile['users'])
+        ], workers)
+
+        datagen.load_shared_user_ids(seed)
+        self.run_stage('Заказы', datagen.generate_orders, [
+            (seed, number, start, count)
+            for number, start, count in datagen.chunks(profile['orders'], datagen.CHUNK_SIZE // 5)
+        ], workers)
+
+        stage_started_at = time.monotonic()
+        rebuild_aggregates()
+        self.report('Агрегаты рейтингов', stage_started_at)
+
+        if not options['no_effective_prices']:
+            stage_started_at = time.monotonic()
+            refresh_effective_prices()
+            self.report('Эффективные цены', stage_started_at)
+
+        self.stdout.write(self.style.SUCCESS(f'Готово за {time.monotonic() - started_at:.1f} с'))
+
+    def run_stage(self, stage, func, tasks, workers):
+        started_at = time.monotonic()
+        if workers > 1:
+            # fork: рабочие процессы наследуют загруженные массивы id, а открытые соединения
+            # закрываем заранее, чтобы каждый процесс открыл собственное
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(workers) as pool:
+                for done, _ in enumerate(pool.imap_unordered(func, tasks), 1):
+                    self.progress(stage, done, len(tasks))
+        else:
+            for done, task in enumerate(tasks, 1):
+                func(task)
+                self.progress(stage, done, len(tasks))
+        self.report(stage, started_at)
+
+    def progress(self, stage, done, total):
+        if self.verbosity > 1:
+            self.stdout.write(f'  {stage}: {done}/{total}')
+
+    def report(self, stage, started_at):
+        self.stdout.write(f'{stage}: {time.monotonic() - started_at:.2f} с')
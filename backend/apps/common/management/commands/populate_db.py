@@ -9,6 +9,7 @@ from apps.products.models import (
     Product, Variation, CoffeeAttribute, TeaAttribute, AccessoryAttribute,
     TeaCategory, AccessoryType, Aroma, Additive, Country, Manufacturer
 )
+from apps.products.reference import get_names
 from apps.orders.models import Order, OrderItem
 from apps.customer_collections.models import Cart, CartItem, Wishlist, WishlistItem
 
@@ -333,12 +334,13 @@ class Command(BaseCommand):
         self.stdout.write(f'Создаем {count} товаров...')
         products = []
 
-        tea_category_ids = list(TeaCategory.objects.values_list('id', flat=True))
-        accessory_type_ids = list(AccessoryType.objects.values_list('id', flat=True))
-        # country_ids = list(Country.objects.values_list('id', flat=True))
-        # manufacturer_ids = list(Manufacturer.objects.values_list('id', flat=True))
-        # aroma_ids = list(Aroma.objects.values_list('id', flat=True))
-        # additive_ids = list(Additive.objects.values_list('id', flat=True))
+        # id справочников - из кеша в памяти, без ORDER BY RANDOM() на каждый товар
+        tea_category_ids = list(get_names(TeaCategory))
+        accessory_type_ids = list(get_names(AccessoryType))
+        country_ids = list(get_names(Country))
+        manufacturer_ids = list(get_names(Manufacturer))
+        aroma_ids = list(get_names(Aroma))
+        additive_ids = list(get_names(Additive))
 
         PRODUCT_TYPES = ['tea', 'coffee', 'accessory']
 
@@ -360,8 +362,8 @@ class Command(BaseCommand):
                 description=fake.text(max_nb_chars=150),
                 product_type=product_type,
                 available=True,
-                manufacturer=Manufacturer.objects.order_by('?').first(),
-                country=Country.objects.order_by('?').first(),
+                manufacturer_id=random.choice(manufacturer_ids),
+                country_id=random.choice(country_ids),
                 region=fake.city() if random.choice([True, False, False]) else None
             )
 
@@ -381,9 +383,9 @@ class Command(BaseCommand):
                 )
 
                 # Добавляем связи ManyToMany
-                aromas = Aroma.objects.order_by('?')[:random.randint(1, 3)]
+                aromas = random.sample(aroma_ids, min(random.randint(1, 3), len(aroma_ids)))
                 coffee_attr.aromas.set(aromas)
-                additives = Additive.objects.order_by('?')[:random.randint(0, 2)]
+                additives = random.sample(additive_ids, min(random.randint(0, 2), len(additive_ids)))
                 coffee_attr.additives.set(additives)
 
                 coffee_attr.arabica_percentage = Arabica_percentage
@@ -396,9 +398,9 @@ class Command(BaseCommand):
                     tea_type=random.choice(tea_types),
                     category_id=random.choice(tea_category_ids)
                 )
-                aromas = Aroma.objects.order_by('?')[:random.randint(1, 3)]
+                aromas = random.sample(aroma_ids, min(random.randint(1, 3), len(aroma_ids)))
                 tea_attr.aromas.set(aromas)
-                additives = Additive.objects.order_by('?')[:random.randint(0, 2)]
+                additives = random.sample(additive_ids, min(random.randint(0, 2), len(additive_ids)))
                 tea_attr.additives.set(additives)
 
             else:
@@ -0,0 +1,105 @@
+import json
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from apps.common import benchmarks
+from apps.common.datagen import PROFILES
+from apps.orders.models import Order
+from apps.products.models import Product, Variation
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Замеряет задержку и количество запросов для страниц админки и API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', choices=sorted(PROFILES),
+                            help='Сгенерировать набор данных этого профиля, если каталог пуст')
+        parser.add_argument('--repeat', type=int, default=10, help='Количество замеров на эндпоинт')
+        parser.add_argument('--warmup', type=int, default=2, help='Количество прогревочных запросов')
+        parser.add_argument('--filter', help='Регулярное выражение для имен эндпоинтов')
+        parser.add_argument('--username', default='benchmark_admin',
+                            help='Суперпользователь, от имени которого выполняются запросы; '
+                                 'если его нет, создается на время прогона и удаляется')
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+        parser.add_argument('--compare', help='JSON предыдущего прогона для поиска регрессий')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Допустимый относительный рост медианы задержки')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть не меньше 1')
+        if options['warmup'] < 0:
+            raise CommandError('--warmup не может быть отрицательным')
+
+        if options['dataset'] and not Product.objects.exists():
+            call_command('generate_dataset', profile=options['dataset'], stdout=self.stdout)
+
+        user = User.objects.filter(username=options['username']).first()
+        temporary = user is None
+        if temporary:
+            # Суперпользователь без пароля живет только на время прогона
+            user = User.objects.create_superuser(options['username'], f'{options["username"]}@example.com', None)
+        elif not user.is_superuser:
+            raise CommandError(f'Пользователь {user.username} не суперпользователь')
+
+        # Адрес вне INTERNAL_IPS, чтобы debug toolbar не встраивался в ответы и не искажал замеры
+        client = Client(REMOTE_ADDR='192.0.2.1')
+        client.force_login(user)
+        try:
+            results = self.measure_targets(client, options)
+        finally:
+            client.logout()
+            if temporary:
+                user.delete()
+
+        report = {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'database': settings.DATABASES['default']['ENGINE'],
+                'products': Product.objects.count(),
+                'variations': Variation.objects.count(),
+                'orders': Order.objects.count(),
+                'repeat': options['repeat'],
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результаты записаны в {options["output"]}')
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = benchmarks.compare(baseline['results'], results, options['threshold'])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(self.style.ERROR(regression))
+                raise CommandError(f'Найдено регрессий: {len(regressions)}')
+            self.stdout.write(self.style.SUCCESS('Регрессий относительно базового прогона нет'))
+
+    def measure_targets(self, client, options):
+        targets = benchmarks.admin_targets() + benchmarks.api_targets()
+        if options['filter']:
+            pattern = re.compile(options['filter'])
+            targets = [target for target in targets if pattern.search(target.name)]
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for target in targets:
+                result = benchmarks.measure(client, target, options['repeat'], options['warmup'])
+                results[target.name] = result
+                self.stdout.write(
+                    f'{target.name:<60} {result["status"]} {result["queries"]:>4} запр. '
+                    f'{result["median_ms"]:>9.1f} мс (p95 {result["p95_ms"]:.1f})'
+                )
+        return results
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from apps.common.exports import run_pending_exports, delete_expired_exports
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые выгрузки из админки и удаляет просроченные файлы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Работать постоянно, проверяя очередь каждые interval секунд')
+        parser.add_argument('--interval', type=float, default=5, help='Пауза между проверками в режиме --loop, секунд')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            started_at = time.monotonic()
+            done = run_pending_exports()
+            deleted = delete_expired_exports()
+            if done or deleted:
+                self.stdout.write(
+                    f'{timezone.now():%Y-%m-%d %H:%M:%S}: выгрузок {done}, удалено просроченных {deleted} '
+                    f'за {time.monotonic() - started_at:.3f} с'
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,32 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Копирует основной файл SQLite в файлы реплик (имитация репликации с задержкой)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Повторять копирование')
+        parser.add_argument('--interval', type=float, default=2, help='Интервал между копированиями, с')
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Команда нужна только для SQLite')
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены: задайте SQLITE_REPLICAS')
+
+        while True:
+            started_at = time.monotonic()
+            with sqlite3.connect(primary['NAME']) as source:
+                for alias in settings.DATABASE_REPLICAS:
+                    # backup() дает согласованный снимок даже при параллельной записи в основную базу
+                    with sqlite3.connect(settings.DATABASES[alias]['NAME']) as target:
+                        source.backup(target)
+            self.stdout.write(f'Реплики обновлены за {time.monotonic() - started_at:.2f} с')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,168 @@
+"""
+Метрики в формате Prometheus: задержка запросов, SQL, обращения к кешу и бизнес-показатели.
+
+Под gunicorn каждый воркер пишет значения в mmap-файлы каталога PROMETHEUS_MULTIPROC_DIR,
+а /metrics собирает их через MultiProcessCollector. Без этой переменной окружения
+используется обычный реестр процесса (runserver, management-команды).
+"""
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.models import Count, Q
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils import timezone
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+from prometheus_client.core import GaugeMetricFamily
+
+from apps.orders.models import Order
+from apps.products.models import Variation
+from .middleware import collect_request_queries
+
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Время обработки запроса', ['view', 'method'],
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries', 'Количество SQL-запросов на запрос', ['view', 'method'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_duration_seconds', 'Суммарное время SQL-запросов на запрос', ['view', 'method'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Обращения к кешу', ['alias', 'namespace', 'result'],
+)
+
+BUSINESS_METRICS_CACHE_KEY = 'metrics:business'
+
+# Метод приходит от клиента - ограничиваем набор значений метки
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+def record_cache_access(namespace, hit, alias='default'):
+    CACHE_REQUESTS.labels(alias, namespace, 'hit' if hit else 'miss').inc()
+
+
+class BusinessCollector:
+    """Бизнес-показатели считаются при сборе метрик и кешируются на METRICS_BUSINESS_TTL секунд."""
+
+    def collect(self):
+        values = cache.get(BUSINESS_METRICS_CACHE_KEY)
+        if values is None:
+            values = self.compute()
+            cache.set(BUSINESS_METRICS_CACHE_KEY, values, settings.METRICS_BUSINESS_TTL)
+
+        orders = GaugeMetricFamily('shop_orders_created', 'Заказы, созданные за последний час', labels=['paid'])
+        orders.add_metric(['true'], values['orders_paid'])
+        orders.add_metric(['false'], values['orders_unpaid'])
+        yield orders
+        yield GaugeMetricFamily(
+            'shop_low_stock_variations', 'Доступные вариации с остатком ниже порога', value=values['low_stock'],
+        )
+
+    def describe(self):
+        # Без describe() регистрация в реестре вызвала бы collect() и запросы к БД
+        return []
+
+    def compute(self):
+        orders = Order.objects.filter(created__gte=timezone.now() - timedelta(hours=1)).aggregate(
+            orders_paid=Count('pk', filter=Q(paid=True)),
+            orders_unpaid=Count('pk', filter=Q(paid=False)),
+        )
+        return {
+            **orders,
+            'low_stock': Variation.objects.filter(available=True, stock__lt=settings.METRICS_LOW_STOCK_THRESHOLD).count(),
+        }
+
+
+class CacheHitRatioCollector:
+    """Доля попаданий по каждому кешу, посчитанная из счетчиков cache_requests_total всех процессов."""
+
+    def __init__(self, source):
+        self.source = source
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        totals = {}
+        for metric in self.source.collect():
+            for sample in metric.samples:
+                if sample.name != 'cache_requests_total':
+                    continue
+                key = (sample.labels['alias'], sample.labels['namespace'])
+                hits, requests = totals.get(key, (0, 0))
+                if sample.labels['result'] == 'hit':
+                    hits += sample.value
+                totals[key] = (hits, requests + sample.value)
+
+        ratio = GaugeMetricFamily('cache_hit_ratio', 'Доля попаданий в кеш', labels=['alias', 'namespace'])
+        for labels, (hits, requests) in sorted(totals.items()):
+            ratio.add_metric(labels, hits / requests if requests else 0)
+        yield ratio
+
+
+_registry = None
+
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+            registry = CollectorRegistry()
+            source = multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+            source = CACHE_REQUESTS
+        registry.register(BusinessCollector())
+        registry.register(CacheHitRatioCollector(source))
+        _registry = registry
+    return _registry
+
+
+def metrics_view(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+class MetricsMiddleware:
+    """
+    Гистограммы задержки, количества и времени SQL-запросов по имени URL и методу.
+    Дочерние метрики с метками кешируются, чтобы на запрос приходилось только три observe().
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.children = {}
+
+    def __call__(self, request):
+        started_at = time.perf_counter()
+        with collect_request_queries(request) as collector:
+            response = self.get_response(request)
+        duration = time.perf_counter() - started_at
+
+        match = request.resolver_match
+        key = (
+            match.view_name if match else 'unmatched',
+            request.method if request.method in METHODS else 'other',
+        )
+        children = self.children.get(key)
+        if children is None:
+            children = self.children[key] = (
+                REQUEST_LATENCY.labels(*key), REQUEST_QUERIES.labels(*key), REQUEST_DB_TIME.labels(*key),
+            )
+        latency, queries, db_time = children
+        latency.observe(duration)
+        queries.observe(collector.count)
+        db_time.observe(collector.duration)
+        return response
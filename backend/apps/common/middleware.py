@@ -0,0 +1,114 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('apps.common.performance')
+
+# Списки плейсхолдеров разной длины (IN (%s, %s, ...)) приводятся к одному шаблону
+PLACEHOLDERS_RE = re.compile(r'%s(?:\s*,\s*%s)+')
+
+
+def sql_template(sql):
+    return PLACEHOLDERS_RE.sub('%s, ...', sql)
+
+
+class QueryCollector:
+    """execute_wrapper, считающий запросы, их суммарное время и повторы одинаковых шаблонов SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.templates = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started_at
+            self.count += 1
+            self.templates[sql_template(sql)] += 1
+
+    def duplicates(self, threshold):
+        return [(template, count) for template, count in self.templates.most_common() if count >= threshold]
+
+
+@contextmanager
+def collect_queries(collector=None):
+    collector = collector or QueryCollector()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(collector))
+        yield collector
+
+
+@contextmanager
+def collect_request_queries(request):
+    """Один сборщик на запрос: если его уже установил внешний middleware, переиспользуем его."""
+    collector = getattr(request, 'query_collector', None)
+    if collector is not None:
+        yield collector
+        return
+    with collect_queries() as collector:
+        request.query_collector = collector
+        yield collector
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Считает SQL-запросы и время БД на запрос, отдает их в заголовке Server-Timing
+    и логирует запросы, вышедшие за бюджет, и повторяющиеся шаблоны SQL (признак N+1).
+    При PERFORMANCE_INSTRUMENTATION = False исключается из цепочки при старте.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.query_budget = settings.PERFORMANCE_QUERY_BUDGET
+        self.time_budget_ms = settings.PERFORMANCE_TIME_BUDGET_MS
+        self.budgets = settings.PERFORMANCE_BUDGETS
+        self.duplicate_threshold = settings.PERFORMANCE_DUPLICATE_QUERY_THRESHOLD
+
+    def __call__(self, request):
+        started_at = time.perf_counter()
+        with collect_request_queries(request) as collector:
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started_at) * 1000
+        db_ms = collector.duration * 1000
+
+        timing = (
+            f'db;dur={db_ms:.1f};desc="{collector.count} queries", '
+            f'app;dur={total_ms - db_ms:.1f}, total;dur={total_ms:.1f}'
+        )
+        if response.has_header('Server-Timing'):
+            timing = f'{response["Server-Timing"]}, {timing}'
+        response['Server-Timing'] = timing
+
+        self.check_budget(request, collector, total_ms, db_ms)
+        return response
+
+    def check_budget(self, request, collector, total_ms, db_ms):
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        budget = self.budgets.get(view_name, {})
+        query_budget = budget.get('queries', self.query_budget)
+        time_budget_ms = budget.get('time_ms', self.time_budget_ms)
+
+        if collector.count > query_budget or total_ms > time_budget_ms:
+            logger.warning(
+                'Превышен бюджет: %s %s (%s) - %d запросов (бюджет %d), %.1f мс (бюджет %d), из них БД %.1f мс',
+                request.method, request.path, view_name, collector.count, query_budget,
+                total_ms, time_budget_ms, db_ms,
+            )
+        for template, count in collector.duplicates(self.duplicate_threshold):
+            logger.warning(
+                'Возможный N+1: %s %s (%s) - шаблон выполнен %d раз: %s',
+                request.method, request.path, view_name, count, template[:500],
+            )
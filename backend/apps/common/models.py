@@ -1,3 +1,51 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class ExportJob(models.Model):
+    """
+    Фоновая выгрузка списка из админки (apps/common/exports.py). Запрос changelist с фильтрами
+    и поиском сохраняется сериализованным и выполняется командой run_export_jobs.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    CSV = 'csv'
+    XLSX = 'xlsx'
+
+    FORMATS = (
+        (CSV, 'CSV'),
+        (XLSX, 'XLSX'),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='export_jobs')
+    model = models.CharField(max_length=100, help_text='app_label.model_name')
+    format = models.CharField(max_length=10, choices=FORMATS, default=CSV)
+    # pickle объекта Query: не переживает обновление Django - задания из очереди нужно выполнить до обновления
+    query = models.BinaryField(editable=False)
+    columns = models.JSONField(default=list, help_text='[[заголовок, поле], ...]')
+    status = models.CharField(max_length=20, choices=STATUSES, default=PENDING)
+    rows = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    file_name = models.CharField(max_length=200, blank=True)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = [models.Index(fields=['status', 'created'])]
+
+    def __str__(self):
+        return f'{self.model} ({self.get_format_display()}) #{self.pk}'
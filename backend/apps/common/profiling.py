@@ -0,0 +1,204 @@
+"""
+Профилирование отдельных запросов по требованию персонала.
+
+Запрос с заголовком X-Profile или параметром ?_profile= выполняется под cProfile (результат в формате pstats)
+или под сэмплирующим профилировщиком (результат в формате speedscope, https://www.speedscope.app).
+Файлы складываются в PROFILING_DIR, старые удаляются по PROFILING_RETENTION_HOURS и PROFILING_MAX_FILES.
+"""
+import cProfile
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import reverse
+from django.utils import timezone
+
+
+CPROFILE = 'cprofile'
+SAMPLING = 'sampling'
+MODES = {CPROFILE: '.prof', SAMPLING: '.speedscope.json'}
+
+PROFILE_PARAM = '_profile'
+
+ARTIFACT_NAME_RE = re.compile(r'^[\w.-]+$')
+
+# В процессе одновременно профилируется только один запрос: cProfile не допускает вложенных сессий,
+# а сэмплер с несколькими целями искажал бы результаты друг друга
+_lock = threading.Lock()
+
+
+def profiling_dir():
+    return Path(settings.PROFILING_DIR)
+
+
+def artifact_path(name):
+    """Путь к артефакту по имени файла или None, если имя некорректно или файла нет."""
+    if not ARTIFACT_NAME_RE.match(name) or not name.endswith(tuple(MODES.values())):
+        return None
+    path = profiling_dir() / name
+    return path if path.is_file() else None
+
+
+def list_artifacts():
+    paths = [path for path in profiling_dir().glob('*') if path.name.endswith(tuple(MODES.values()))]
+    return sorted(paths, key=lambda path: path.stat().st_mtime, reverse=True)
+
+
+def cleanup_artifacts():
+    cutoff = time.time() - settings.PROFILING_RETENTION_HOURS * 3600
+    for number, path in enumerate(list_artifacts()):
+        if number >= settings.PROFILING_MAX_FILES or path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+
+
+class Sampler:
+    """
+    Фоновый поток, который с заданным интервалом снимает стек потока запроса через sys._current_frames().
+    Реальная частота ограничена sys.getswitchinterval(): поток сэмплера ждет GIL.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames = {}
+        self.samples = []
+        self.weights = []
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop_event.set()
+        self.thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def run(self):
+        last = time.perf_counter()
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                self.samples.append(self.stack(frame))
+                self.weights.append((now - last) * 1000)
+            last = now
+
+    def stack(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            index = self.frames.get(key)
+            if index is None:
+                index = self.frames[key] = len(self.frames)
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def speedscope(self, name):
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'apps.common.profiling',
+            'activeProfileIndex': 0,
+            'shared': {
+                'frames': [
+                    {'name': frame_name, 'file': file, 'line': line}
+                    for frame_name, file, line in sorted(self.frames, key=self.frames.get)
+                ],
+            },
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': self.duration * 1000,
+                'samples': self.samples,
+                'weights': self.weights,
+            }],
+        }
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует запросы персонала, помеченные заголовком X-Profile или параметром _profile
+    (значение - cprofile или sampling, пустое - PROFILING_DEFAULT_MODE).
+    Ссылка на скачивание результата возвращается в заголовке X-Profile-Url.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.headers.get('X-Profile', request.GET.get(PROFILE_PARAM))
+        if mode is None or not request.user.is_staff:
+            return self.get_response(request)
+        if PROFILE_PARAM in request.GET:
+            # Убираем параметр до представления: changelist админки счел бы его фильтром
+            query = request.GET.copy()
+            del query[PROFILE_PARAM]
+            request.GET = query
+            request.META['QUERY_STRING'] = query.urlencode()
+
+        mode = mode or settings.PROFILING_DEFAULT_MODE
+        if mode not in MODES:
+            response = self.get_response(request)
+            response['X-Profile-Error'] = f'unknown mode, expected one of: {", ".join(MODES)}'
+            return response
+        if not _lock.acquire(blocking=False):
+            response = self.get_response(request)
+            response['X-Profile-Error'] = 'another request is being profiled'
+            return response
+
+        try:
+            if mode == CPROFILE:
+                response, write = self.run_cprofile(request)
+            else:
+                response, write = self.run_sampling(request)
+        finally:
+            _lock.release()
+
+        name = self.artifact_name(request, mode)
+        profiling_dir().mkdir(parents=True, exist_ok=True)
+        write(profiling_dir() / name)
+        cleanup_artifacts()
+        response['X-Profile-Url'] = request.build_absolute_uri(reverse('common:profile_download', args=[name]))
+        return response
+
+    def run_cprofile(self, request):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        return response, profiler.dump_stats
+
+    def run_sampling(self, request):
+        sampler = Sampler(threading.get_ident(), settings.PROFILING_SAMPLING_INTERVAL_MS / 1000)
+        with sampler:
+            response = self.get_response(request)
+        title = f'{request.method} {request.get_full_path()}'
+
+        def write(path):
+            with open(path, 'w', encoding='utf-8') as output:
+                json.dump(sampler.speedscope(title), output)
+
+        return response, write
+
+    def artifact_name(self, request, mode):
+        match = request.resolver_match
+        view_name = re.sub(r'[^\w-]+', '_', match.view_name if match else 'unmatched')
+        return f'{timezone.now():%Y%m%d-%H%M%S}-{view_name}-{uuid.uuid4().hex[:8]}{MODES[mode]}'
@@ -0,0 +1,122 @@
+"""
+Маршрутизация чтения каталога на реплики.
+
+Чтения моделей каталога и отзывов (и предрассчитанной таблицы эффективных цен) распределяются
+по DATABASE_REPLICAS по кругу. Вариации - исключение: в них хранятся остатки, и отставшая реплика
+дала бы продать то, чего уже нет, поэтому они всегда читаются с основной базы.
+На основную базу чтение идет, если:
+  - клиент недавно писал (кука от ReplicaPinningMiddleware) или уже писал в этом запросе;
+  - код выполняется внутри транзакции на основной базе (оформление заказа, остатки, формы админки);
+  - код явно обернут в use_primary().
+Корзины, заказы, платежи и промокоды всегда читаются с основной базы.
+"""
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+PRIMARY = DEFAULT_DB_ALIAS
+
+REPLICATED_APPS = {'products', 'reviews'}
+REPLICATED_MODELS = {'promotions.effectiveprice'}
+PRIMARY_ONLY_MODELS = {'products.variation'}
+
+PIN_COOKIE = 'primary_pin'
+
+# Закрепление на весь запрос: кука недавней записи или запись в этом запросе
+_pinned = ContextVar('replica_pinned', default=False)
+# Закрепление блока use_primary(). Отдельно от _pinned: выход из блока не должен
+# отменять закрепление от записи, сделанной внутри него
+_primary_scope = ContextVar('replica_primary_scope', default=False)
+
+
+@contextmanager
+def use_primary():
+    token = _primary_scope.set(True)
+    try:
+        yield
+    finally:
+        _primary_scope.reset(token)
+
+
+def pin_to_primary():
+    """Остаток запроса читает с основной базы - вызывается при первой записи."""
+    _pinned.set(True)
+
+
+def is_replicated(model):
+    label = model._meta.label_lower
+    if label in PRIMARY_ONLY_MODELS:
+        return False
+    return model._meta.app_label in REPLICATED_APPS or label in REPLICATED_MODELS
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.replicas = list(settings.DATABASE_REPLICAS)
+        self.cycle = itertools.cycle(self.replicas)
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas or not is_replicated(model):
+            return None
+        if _pinned.get() or _primary_scope.get() or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return next(self.cycle)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит репликацией с основной базы
+        return db == PRIMARY
+
+
+class ReplicaPinningMiddleware:
+    """
+    Чтение своих записей: после запроса, записавшего в основную базу, чтения этого клиента
+    REPLICA_PIN_SECONDS идут на основную базу, пока реплики догоняют.
+    """
+
+    WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.pin_seconds = settings.REPLICA_PIN_SECONDS
+
+    def __call__(self, request):
+        try:
+            pinned = float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        token = _pinned.set(pinned)
+        state = {'written': False}
+
+        def detect_write(execute, sql, params, many, context):
+            if not state['written'] and sql.lstrip()[:7].upper().startswith(self.WRITE_PREFIXES):
+                state['written'] = True
+                pin_to_primary()
+            return execute(sql, params, many, context)
+
+        try:
+            with connections[PRIMARY].execute_wrapper(detect_write):
+                response = self.get_response(request)
+        finally:
+            _pinned.reset(token)
+
+        if state['written']:
+            response.set_cookie(
+                PIN_COOKIE, str(time.time() + self.pin_seconds),
+                max_age=self.pin_seconds, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,172 @@
+"""
+Кеш с инвалидацией по тегам поверх стандартного cache-бэкенда Django.
+
+У каждого тега есть версия - отметка времени (time.time_ns) последней инвалидации, хранимая в том же кеше.
+Запись хранит версии своих тегов на момент вычисления и считается промахом, если хотя бы одна
+из них изменилась. Инвалидация тега - одна запись в кеш, без поиска зависимых ключей,
+поэтому схема одинаково работает на locmem, файловом кеше и Redis.
+
+get_or_compute защищает горячие ключи от одновременного пересчета (single-flight): пересчитывает
+один вызывающий, взявший блокировку в общем кеше, остальные получают устаревшее значение или
+недолго ждут нового. Истечение срока дополнительно наступает вероятностно раньше (XFetch),
+так что популярный ключ обычно обновляется до того, как станет промахом.
+"""
+import math
+import random
+import time
+import uuid
+from collections import namedtuple
+
+from django.core.cache import caches
+from django.db import transaction
+
+from .metrics import record_cache_access
+
+
+CATALOG_TAG = 'catalog'
+PRICES_TAG = 'prices'
+
+TAG_PREFIX = 'tag:'
+LOCK_PREFIX = 'lock:'
+
+# Сколько устаревшая запись хранится после логического истечения, чтобы отдавать ее во время пересчета
+STALE_GRACE = 60
+# Время жизни блокировки пересчета: если вычисляющий процесс упал, ключ освободится сам
+LOCK_TIMEOUT = 30
+# Сколько ждут результата другого процесса, когда устаревшего значения нет
+WAIT_TIMEOUT = 2.0
+WAIT_INTERVAL = 0.02
+# Параметр XFetch: больше - раньше начинается упреждающий пересчет
+XFETCH_BETA = 1.0
+
+HIT, MISS, STALE, WAITED = 'HIT', 'MISS', 'STALE', 'WAITED'
+
+CachedEntry = namedtuple('CachedEntry', ['value', 'versions', 'expires_at', 'delta'])
+
+
+def tag(kind, pk):
+    return f'{kind}:{pk}'
+
+
+def tag_versions(cache, tags, default=None):
+    """
+    Текущие версии тегов. Отсутствующие создаются с версией default (по умолчанию - сейчас):
+    версия-время, а не счетчик, чтобы вытесненный и созданный заново тег не совпал со старой записью.
+    """
+    keys = [TAG_PREFIX + name for name in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = default or time.time_ns()
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+            versions[key] = version
+    return {key[len(TAG_PREFIX):]: version for key, version in versions.items()}
+
+
+def is_current(cache, entry):
+    return tag_versions(cache, entry.versions) == entry.versions
+
+
+def should_recompute(entry, now=None, beta=XFETCH_BETA):
+    """
+    XFetch: запись считается истекшей с вероятностью, растущей к expires_at,
+    тем раньше, чем дольше ее пересчет (delta).
+    """
+    now = now or time.time()
+    return now - entry.delta * beta * math.log(1 - random.random()) >= entry.expires_at
+
+
+def get_cached(key, namespace, alias='default'):
+    """Значение по ключу или None, если записи нет, она истекла или хотя бы один ее тег инвалидирован."""
+    cache = caches[alias]
+    entry = cache.get(key)
+    if entry is not None and (entry.expires_at <= time.time() or not is_current(cache, entry)):
+        entry = None
+    record_cache_access(namespace, entry is not None, alias)
+    return entry.value if entry is not None else None
+
+
+def set_cached(key, value, tags, started_at, timeout, alias='default'):
+    """
+    Сохраняет значение с версиями тегов. started_at - time.time_ns() до чтения данных из БД:
+    если какой-то тег инвалидирован позже, значение могло устареть и не кешируется.
+    """
+    cache = caches[alias]
+    versions = tag_versions(cache, set(tags), default=started_at)
+    if any(version > started_at for version in versions.values()):
+        return False
+    now = time.time()
+    delta = max(now - started_at / 1e9, 0)
+    cache.set(key, CachedEntry(value, versions, now + timeout, delta), timeout + STALE_GRACE)
+    return True
+
+
+def _compute(key, build, alias):
+    started_at = time.time_ns()
+    value, tags, timeout = build()
+    set_cached(key, value, tags, started_at, timeout, alias)
+    return value
+
+
+def get_or_compute(key, namespace, build, alias='default'):
+    """
+    Значение из кеша или результат build() -> (value, tags, timeout), пересчитанный одним вызывающим.
+    Возвращает (value, status), status - HIT, MISS (пересчитали сами), STALE (отдали устаревшее,
+    пока пересчитывает другой) или WAITED (дождались чужого пересчета).
+    """
+    cache = caches[alias]
+    entry = cache.get(key)
+    current = entry is not None and is_current(cache, entry)
+    if current and not should_recompute(entry):
+        record_cache_access(namespace, True, alias)
+        return entry.value, HIT
+
+    lock_key = LOCK_PREFIX + key
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, LOCK_TIMEOUT):
+        try:
+            # Пока мы читали запись, другой вызывающий мог успеть пересчитать ключ и снять блокировку
+            fresh = cache.get(key)
+            if (
+                fresh is not None and (entry is None or fresh.expires_at != entry.expires_at)
+                and fresh.expires_at > time.time() and is_current(cache, fresh)
+            ):
+                record_cache_access(namespace, True, alias)
+                return fresh.value, WAITED
+            record_cache_access(namespace, False, alias)
+            return _compute(key, build, alias), MISS
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    # Пересчитывает другой процесс. Истекшую по времени запись можно отдать сразу,
+    # а инвалидированную тегами - нельзя: в ней заведомо старые данные
+    if current:
+        record_cache_access(namespace, True, alias)
+        return entry.value, STALE
+
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry.expires_at > time.time() and is_current(cache, entry):
+            record_cache_access(namespace, True, alias)
+            return entry.value, WAITED
+
+    # Не дождались - считаем сами, чтобы не отдавать ошибку
+    record_cache_access(namespace, False, alias)
+    return _compute(key, build, alias), MISS
+
+
+def invalidate_tags(*tags, alias='default'):
+    """Инвалидирует теги после коммита текущей транзакции, чтобы кеш не заполнился старыми данными."""
+    tags = set(tags)
+    if not tags:
+        return
+
+    def invalidate():
+        version = time.time_ns()
+        caches[alias].set_many({TAG_PREFIX + name: version for name in tags}, None)
+
+    transaction.on_commit(invalidate)
@@ -1,3 +1,139 @@
-from django.test import TestCase
+import datetime
+import threading
+import time
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from apps.common import exports, routers, tagged_cache
+from apps.common.models import ExportJob
+from apps.products.models import Product, Variation
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'single-flight-tests'}})
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.computations = 0
+        self.lock = threading.Lock()
+
+    def build(self):
+        with self.lock:
+            self.computations += 1
+        time.sleep(0.2)
+        return {'value': 42}, ['product:1'], 60
+
+    def fire(self, callers):
+        barrier = threading.Barrier(callers)
+        results = []
+
+        def call():
+            barrier.wait()
+            results.append(tagged_cache.get_or_compute('catalog:hot', 'catalog', self.build))
+
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_misses_compute_once(self):
+        results = self.fire(100)
+
+        self.assertEqual(self.computations, 1)
+        self.assertEqual(len(results), 100)
+        self.assertTrue(all(value == {'value': 42} for value, _ in results))
+        self.assertEqual(sum(status == tagged_cache.MISS for _, status in results), 1)
+
+    def test_expired_entry_is_served_stale_while_recomputing(self):
+        self.fire(1)
+        entry = cache.get('catalog:hot')
+        cache.set('catalog:hot', entry._replace(expires_at=time.time() - 1), 60)
+
+        results = self.fire(100)
+
+        self.assertEqual(self.computations, 2)
+        self.assertEqual(sum(status == tagged_cache.MISS for _, status in results), 1)
+        self.assertEqual(sum(status == tagged_cache.STALE for _, status in results), 99)
+
+    def test_invalidated_entry_is_not_served(self):
+        self.fire(1)
+        # То же, что делает invalidate_tags после коммита
+        cache.set(tagged_cache.TAG_PREFIX + 'product:1', time.time_ns(), None)
+
+        results = self.fire(10)
+
+        self.assertEqual(self.computations, 2)
+        self.assertNotIn(tagged_cache.STALE, [status for _, status in results])
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        token = routers._pinned.set(False)
+        self.addCleanup(routers._pinned.reset, token)
+
+    def test_catalog_reads_go_to_replica(self):
+        self.assertEqual(self.router.db_for_read(Product), 'replica_1')
+
+    def test_variations_always_read_from_primary(self):
+        # Остатки не читаются с отстающей реплики
+        self.assertIsNone(self.router.db_for_read(Variation))
+
+    def test_use_primary_is_scoped(self):
+        with routers.use_primary():
+            self.assertEqual(self.router.db_for_read(Product), routers.PRIMARY)
+        self.assertEqual(self.router.db_for_read(Product), 'replica_1')
+
+    def test_write_inside_use_primary_pins_rest_of_request(self):
+        with routers.use_primary():
+            routers.pin_to_primary()
+        self.assertEqual(self.router.db_for_read(Product), routers.PRIMARY)
+
+
+@override_settings(EXPORT_STALE_MINUTES=60, EXPORT_MAX_ATTEMPTS=3, EXPORT_RETENTION_HOURS=24)
+class ExportJobLifecycleTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('exporter')
+        self.now = timezone.now()
+
+    def create_job(self, status, started_minutes_ago=None, attempts=1, created_hours_ago=0):
+        job = ExportJob.objects.create(user=self.user, model='products.product', query=b'', status=status,
+                                       attempts=attempts)
+        started_at = None
+        if started_minutes_ago is not None:
+            started_at = self.now - datetime.timedelta(minutes=started_minutes_ago)
+        ExportJob.objects.filter(pk=job.pk).update(
+            started_at=started_at, created=self.now - datetime.timedelta(hours=created_hours_ago)
+        )
+        return job
+
+    def status(self, job):
+        job.refresh_from_db()
+        return job.status
+
+    def test_stale_running_job_is_requeued(self):
+        stale = self.create_job(ExportJob.RUNNING, started_minutes_ago=90)
+        fresh = self.create_job(ExportJob.RUNNING, started_minutes_ago=10)
+        self.assertEqual(exports.reclaim_stale_exports(self.now), (1, 0))
+        self.assertEqual(self.status(stale), ExportJob.PENDING)
+        self.assertEqual(self.status(fresh), ExportJob.RUNNING)
+
+    def test_stale_job_fails_after_max_attempts(self):
+        job = self.create_job(ExportJob.RUNNING, started_minutes_ago=90, attempts=3)
+        self.assertEqual(exports.reclaim_stale_exports(self.now), (0, 1))
+        self.assertEqual(self.status(job), ExportJob.FAILED)
+        self.assertTrue(job.error)
+
+    def test_expiry_keeps_running_jobs(self):
+        running = self.create_job(ExportJob.RUNNING, started_minutes_ago=10, created_hours_ago=48)
+        done = self.create_job(ExportJob.DONE, created_hours_ago=48)
+        recent = self.create_job(ExportJob.DONE, created_hours_ago=1)
+        self.assertEqual(exports.delete_expired_exports(), 1)
+        self.assertFalse(ExportJob.objects.filter(pk=done.pk).exists())
+        self.assertEqual(ExportJob.objects.filter(pk__in=[running.pk, recent.pk]).count(), 2)
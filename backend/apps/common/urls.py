@@ -0,0 +1,13 @@
+from django.urls import path
+from .views import (
+    profile_list, profile_download, export_download
+)
+
+
+app_name = 'common'
+
+urlpatterns = [
+    path('profiles/', profile_list, name='profile_list'),
+    path('profiles/<str:name>/', profile_download, name='profile_download'),
+    path('exports/<int:pk>/', export_download, name='export_download'),
+]
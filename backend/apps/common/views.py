@@ -1,3 +1,47 @@
-from django.shortcuts import render
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import reverse
+from django.views.decorators.http import require_GET
 
-# Create your views here.
+from .exports import export_path
+from .models import ExportJob
+from .profiling import artifact_path, list_artifacts
+from .responses import FastJsonResponse
+
+
+@staff_member_required
+@require_GET
+def profile_list(request):
+    profiles = [
+        {
+            'name': path.name,
+            'size': path.stat().st_size,
+            'url': request.build_absolute_uri(reverse('common:profile_download', args=[path.name])),
+        }
+        for path in list_artifacts()
+    ]
+    return FastJsonResponse({'profiles': profiles, 'success': True})
+
+
+@staff_member_required
+@require_GET
+def profile_download(request, name):
+    path = artifact_path(name)
+    if path is None:
+        raise Http404('Профиль не найден')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+
+
+@staff_member_required
+@require_GET
+def export_download(request, pk):
+    job = get_object_or_404(ExportJob, pk=pk)
+    if job.user_id != request.user.pk and not request.user.is_superuser:
+        raise Http404('Выгрузка не найдена')
+    path = export_path(job)
+    if path is None:
+        messages.info(request, f'{job}: {job.get_status_display().lower()}')
+        return redirect('admin:common_exportjob_changelist')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
@@ -2,13 +2,17 @@ from django.contrib import admin
 from django.urls.base import reverse
 from django.utils.html import format_html
 
+from apps.common.exports import ExportAdminMixin
+from apps.promotions.pricing import price_cart
 from .models import Cart, CartItem, Wishlist, WishlistItem
+from apps.products.forms import VariationItemFormSet
 from .forms import CartItemForm, CartForm, WishlistForm
 
 
 class CartItemInline(admin.TabularInline):
     model = CartItem
     form = CartItemForm
+    formset = VariationItemFormSet
     extra = 0
     fields = ['product', 'variation', 'quantity', 'added_at']
     readonly_fields = ['added_at']
@@ -19,9 +23,6 @@ class CartItemInline(admin.TabularInline):
         qs = qs.select_related('variation__product')
         return qs
 
-    class Media:
-        js = ('admin/js/cart_item_inline.js',)
-
 
 class WishlistItemInline(admin.TabularInline):
     model = WishlistItem
@@ -37,7 +38,7 @@ class CartAdmin(admin.ModelAdmin):
     list_display = ['id', 'owner_info', 'items_count', 'created', 'updated']
     list_filter = ['created', 'updated']
     search_fields = ['user__username', 'owner_info']
-    readonly_fields = ['created', 'updated', 'items_count']
+    readonly_fields = ['created', 'updated', 'items_count', 'total_price']
     autocomplete_fields = ['user']
     list_per_page = 25
 
@@ -63,15 +64,30 @@ class CartAdmin(admin.ModelAdmin):
 
     items_count.short_description = 'products in cart'
 
+    def total_price(self, obj):
+        if not obj.pk:
+            return '-'
+        cart = price_cart(obj.items.values_list('variation_id', 'quantity'))
+        if cart['discount']:
+            return f"{cart['total']} ₽ ({cart['subtotal']} ₽ - {cart['discount']} ₽, {cart['cart_promotion']})"
+        return f"{cart['total']} ₽"
+
+    total_price.short_description = 'total with promotions'
+
 
 @admin.register(CartItem)
-class CartItemAdmin(admin.ModelAdmin):
+class CartItemAdmin(ExportAdminMixin, admin.ModelAdmin):
     list_display = ['owner_info', 'variation_info', 'quantity', 'added_at']
     list_filter = ['added_at', 'variation__product__product_type']
     search_fields = ['cart__user__username', 'variation__product__name', 'variation__text_description_of_count']
     date_hierarchy = 'added_at'
     list_select_related = ['cart__user', 'variation__product']
     list_per_page = 25
+    export_columns = [
+        ('Корзина', 'cart_id'), ('Пользователь', 'cart__user__username'), ('Сессия', 'cart__session_key'),
+        ('Товар', 'variation__product__name'), ('Вариация', 'variation__text_description_of_count'),
+        ('Количество', 'quantity'), ('Добавлен', 'added_at'),
+    ]
 
     def variation_info(self, obj):
         return f"{obj.variation.product.name} | {obj.variation.text_description_of_count}"
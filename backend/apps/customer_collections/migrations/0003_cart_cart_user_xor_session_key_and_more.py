@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fix_owners(apps, schema_editor):
+    """
+    Прежний валидатор пропускал корзины и избранное с обоими владельцами или без владельца.
+    Пользователь важнее сессии - ключ сессии у таких строк сбрасывается; строки без владельца
+    никому не доступны и удаляются вместе с позициями.
+    """
+    for model_name in ('Cart', 'Wishlist'):
+        model = apps.get_model('customer_collections', model_name)
+        model.objects.filter(user__isnull=False).exclude(session_key__isnull=True).update(session_key=None)
+        model.objects.filter(user__isnull=True).filter(
+            models.Q(session_key__isnull=True) | models.Q(session_key='')
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_collections', '0002_wishlist_session_key_alter_wishlist_user'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(fix_owners, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('user__isnull', False), models.Q(('session_key__isnull', False), models.Q(('session_key', ''), _negated=True), _negated=True)), models.Q(('user__isnull', True), ('session_key__isnull', False), models.Q(('session_key', ''), _negated=True)), _connector='OR'), name='cart_user_xor_session_key', violation_error_message='Exactly one of user or session_key must be set.'),
+        ),
+        migrations.AddConstraint(
+            model_name='wishlist',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('user__isnull', False), models.Q(('session_key__isnull', False), models.Q(('session_key', ''), _negated=True), _negated=True)), models.Q(('user__isnull', True), ('session_key__isnull', False), models.Q(('session_key', ''), _negated=True)), _connector='OR'), name='wishlist_user_xor_session_key', violation_error_message='Exactly one of user or session_key must be set.'),
+        ),
+    ]
@@ -6,6 +6,16 @@ from .validators import validate_only_one_field_used
 User = get_user_model()
 
 
+def user_xor_session_key(name):
+    """Владелец корзины или избранного - либо пользователь, либо сессия (пустая строка - не сессия)."""
+    has_session = models.Q(session_key__isnull=False) & ~models.Q(session_key='')
+    return models.CheckConstraint(
+        condition=(models.Q(user__isnull=False) & ~has_session) | (models.Q(user__isnull=True) & has_session),
+        name=name,
+        violation_error_message='Exactly one of user or session_key must be set.',
+    )
+
+
 class Cart(models.Model):
     user = models.OneToOneField(
         User,
@@ -18,6 +28,9 @@ class Cart(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [user_xor_session_key('cart_user_xor_session_key')]
+
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
@@ -41,6 +54,9 @@ class Wishlist(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [user_xor_session_key('wishlist_user_xor_session_key')]
+
 
 class WishlistItem(models.Model):
     wishlist = models.ForeignKey(Wishlist, on_delete=models.CASCADE, related_name='items')
@@ -1,10 +1,12 @@
 from django.db.models import signals
 from django.dispatch import receiver
 
-from .models import Wishlist
+from .models import Cart, Wishlist
 from .validators import validate_only_one_field_used
 
 
+# Правило закреплено ограничением user_xor_session_key в БД, сигнал дает понятную ошибку до INSERT
+@receiver(signals.pre_save, sender=Cart)
 @receiver(signals.pre_save, sender=Wishlist)
 def cart_pre_save(sender, instance, **kwargs):
-    validate_only_one_field_used(instance, 'user', 'session_key')
\ No newline at end of file
+    validate_only_one_field_used(instance, 'user', 'session_key')
@@ -2,13 +2,16 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 
+from apps.common.exports import ExportAdminMixin
 from .models import Order, OrderItem
+from apps.products.forms import VariationItemFormSet
 from .forms import OrderItemForm
 
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     form = OrderItemForm
+    formset = VariationItemFormSet
     extra = 0
     readonly_fields = ['total_price', 'price']
     fields = ['product', 'variation', 'price', 'quantity', 'total_price']
@@ -30,12 +33,9 @@ class OrderItemInline(admin.TabularInline):
 
     total_price.short_description = 'Сумма'
 
-    class Media:
-        js = ('admin/js/order_item_inline.js',)
-
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(ExportAdminMixin, admin.ModelAdmin):
     list_display = [
         'id', 'user', 'full_name', 'status', 'paid',
         'total_items', 'total_amount', 'created'
@@ -46,6 +46,10 @@ class OrderAdmin(admin.ModelAdmin):
     readonly_fields = ['created', 'updated', 'total_items', 'total_amount']
     date_hierarchy = 'created'
     list_per_page = 25
+    export_columns = [
+        ('ID', 'id'), ('Пользователь', 'user__username'), ('Имя', 'first_name'), ('Фамилия', 'last_name'),
+        ('Email', 'email'), ('Телефон', 'phone'), ('Статус', 'status'), ('Оплачен', 'paid'), ('Создан', 'created'),
+    ]
 
 
 
@@ -89,12 +93,16 @@ class OrderAdmin(admin.ModelAdmin):
 
 
 @admin.register(OrderItem)
-class OrderItemAdmin(admin.ModelAdmin):
+class OrderItemAdmin(ExportAdminMixin, admin.ModelAdmin):
     list_display = ['order_link', 'variation', 'price', 'quantity', 'total_price']
     list_filter = ['order__created', 'variation__product__product_type']
     search_fields = ['order__first_name', 'order__last_name', 'variation__product__name']
     readonly_fields = ['price', 'total_price']
     list_select_related = ['order', 'variation__product']
+    export_columns = [
+        ('Заказ', 'order_id'), ('Дата заказа', 'order__created'), ('Товар', 'variation__product__name'),
+        ('Вариация', 'variation__text_description_of_count'), ('Цена', 'price'), ('Количество', 'quantity'),
+    ]
 
     def order_link(self, obj):
         url = reverse('admin:orders_order_change', args=[obj.order.pk])
@@ -1,3 +1,23 @@
 from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html
 
-# Register your models here.
+from .models import Payment
+
+
+@admin.register(Payment)
+class PaymentAdmin(admin.ModelAdmin):
+    list_display = ['provider_reference', 'provider', 'order_link', 'amount', 'created']
+    list_filter = ['provider', 'created']
+    search_fields = ['provider_reference', 'order__id']
+    readonly_fields = ['created']
+    date_hierarchy = 'created'
+    list_select_related = ['order']
+    raw_id_fields = ['order']
+    list_per_page = 25
+
+    def order_link(self, obj):
+        url = reverse('admin:orders_order_change', args=[obj.order.pk])
+        return format_html('<a href="{}">Заказ #{}</a>', url, obj.order.pk)
+
+    order_link.short_description = 'Заказ'
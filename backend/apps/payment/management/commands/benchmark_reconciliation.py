@@ -0,0 +1,75 @@
+import csv
+import os
+import random
+import resource
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.payment.reconciliation import read_settlements, build_settlement_index, reconcile, write_report
+
+
+class Command(BaseCommand):
+    help = 'Бенчмарк сверки платежей на синтетических данных (без обращения к БД)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Количество строк в файле расчетов')
+        parser.add_argument('--mismatch-rate', type=float, default=0.01, help='Доля расхождений каждого вида')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        rate = options['mismatch_rate']
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'settlements.csv')
+
+            started_at = time.monotonic()
+            self.write_settlements(path, rows, rate, random.Random(options['seed']))
+            self.report('Генерация файла', started_at)
+
+            started_at = time.monotonic()
+            with open(path, newline='', encoding='utf-8') as settlement_file:
+                index = build_settlement_index(read_settlements(settlement_file))
+            self.report(f'Индекс {len(index)} расчетов', started_at)
+
+            started_at = time.monotonic()
+            orders = self.iter_orders(rows, random.Random(options['seed']))
+            with open(os.devnull, 'w') as devnull:
+                counts = write_report(reconcile(index, orders), devnull)
+            self.report('Сверка', started_at)
+
+        for kind, count in sorted(counts.items()):
+            self.stdout.write(f'  {kind}: {count}')
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(self.style.SUCCESS(f'Пиковое потребление памяти: {peak_mb:.0f} MB'))
+
+    def report(self, stage, started_at):
+        self.stdout.write(f'{stage}: {time.monotonic() - started_at:.2f} с')
+
+    def synthetic_rows(self, rows, rnd):
+        # Один и тот же генератор с тем же seed дает согласованные расчеты и заказы
+        for order_id in range(1, rows + 1):
+            roll = rnd.random()
+            cents = rnd.randint(10_000, 500_000)
+            yield order_id, f'pay_{order_id:012d}', cents, roll
+
+    def write_settlements(self, path, rows, rate, rnd):
+        with open(path, 'w', newline='', encoding='utf-8') as settlement_file:
+            writer = csv.writer(settlement_file)
+            writer.writerow(['reference', 'amount'])
+            for order_id, reference, cents, roll in self.synthetic_rows(rows, rnd):
+                if roll < rate:
+                    # оплачен, но расчета нет
+                    continue
+                elif roll < 2 * rate:
+                    cents += 100
+                elif roll < 3 * rate:
+                    reference = f'orphan_{order_id:012d}'
+                writer.writerow([reference, f'{cents / 100:.2f}'])
+
+    def iter_orders(self, rows, rnd):
+        # Все заказы оплачены и с верной суммой: расхождения вносятся только в файл расчетов
+        for order_id, reference, cents, _ in self.synthetic_rows(rows, rnd):
+            yield order_id, True, reference, cents
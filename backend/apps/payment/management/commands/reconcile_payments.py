@@ -0,0 +1,68 @@
+import sys
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.payment.reconciliation import (
+    read_settlements, build_settlement_index, iter_day_orders, resolve_references, reconcile, write_report
+)
+
+
+class Command(BaseCommand):
+    help = 'Сверяет файл расчетов платежного провайдера с оплаченными заказами за день'
+
+    def add_arguments(self, parser):
+        parser.add_argument('settlement_file', help='CSV-файл расчетов провайдера')
+        parser.add_argument('--date', help='День сверки в формате YYYY-MM-DD (по умолчанию вчера)')
+        parser.add_argument('--output', help='Файл для отчета о расхождениях (по умолчанию stdout)')
+        parser.add_argument('--reference-column', default='reference', help='Колонка с идентификатором платежа')
+        parser.add_argument('--amount-column', default='amount', help='Колонка с суммой')
+        parser.add_argument('--delimiter', default=',', help='Разделитель CSV')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Размер чанка при чтении заказов')
+
+    def handle(self, *args, **options):
+        day = self.get_day(options['date'])
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        end = start + timedelta(days=1)
+
+        started_at = time.monotonic()
+        try:
+            with open(options['settlement_file'], newline='', encoding='utf-8') as settlement_file:
+                index = build_settlement_index(read_settlements(
+                    settlement_file,
+                    reference_column=options['reference_column'],
+                    amount_column=options['amount_column'],
+                    delimiter=options['delimiter'],
+                ))
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        settlements_count = len(index)
+        self.stderr.write(f'Загружено {settlements_count} расчетов за {time.monotonic() - started_at:.1f} с')
+
+        mismatches = reconcile(
+            index,
+            iter_day_orders(start, end, chunk_size=options['chunk_size']),
+            resolve_unmatched=lambda references: resolve_references(references, chunk_size=options['chunk_size']),
+        )
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as report_file:
+                counts = write_report(mismatches, report_file)
+        else:
+            counts = write_report(mismatches, sys.stdout)
+
+        self.stderr.write(f'Сверка за {day} завершена за {time.monotonic() - started_at:.1f} с')
+        if not counts:
+            self.stderr.write(self.style.SUCCESS('Расхождений не найдено.'))
+        for kind, count in sorted(counts.items()):
+            self.stderr.write(self.style.WARNING(f'{kind}: {count}'))
+
+    def get_day(self, value):
+        if not value:
+            return timezone.localdate() - timedelta(days=1)
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError('Дата должна быть в формате YYYY-MM-DD')
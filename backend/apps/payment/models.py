@@ -1,3 +1,15 @@
 from django.db import models
 
-# Create your models here.
+
+class Payment(models.Model):
+    order = models.OneToOneField('orders.Order', on_delete=models.PROTECT, related_name='payment')
+    provider = models.CharField(max_length=50)
+    provider_reference = models.CharField(max_length=100, unique=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ('-created',)
+
+    def __str__(self):
+        return f'{self.provider}: {self.provider_reference}'
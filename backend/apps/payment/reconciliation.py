@@ -0,0 +1,123 @@
+import csv
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum
+
+from apps.orders.models import Order, OrderItem
+
+
+PAID_WITHOUT_SETTLEMENT = 'paid_without_settlement'
+SETTLEMENT_WITHOUT_ORDER = 'settlement_without_order'
+SETTLEMENT_FOR_UNPAID_ORDER = 'settlement_for_unpaid_order'
+AMOUNT_MISMATCH = 'amount_mismatch'
+
+REPORT_HEADER = ['kind', 'order_id', 'reference', 'order_total', 'settled_amount']
+
+
+def to_cents(value):
+    # Суммы храним в копейках: int в индексе заметно легче Decimal
+    return int((Decimal(value) * 100).to_integral_value())
+
+
+def from_cents(cents):
+    if cents is None:
+        return ''
+    return str((Decimal(cents) / 100).quantize(Decimal('0.01')))
+
+
+def read_settlements(file, reference_column='reference', amount_column='amount', delimiter=','):
+    """Построчно читает файл расчетов провайдера, не загружая его в память целиком."""
+    reader = csv.DictReader(file, delimiter=delimiter)
+    for line_number, row in enumerate(reader, start=2):
+        reference = (row.get(reference_column) or '').strip()
+        try:
+            cents = to_cents(row[amount_column])
+        except (KeyError, TypeError, InvalidOperation):
+            raise ValueError(f'Line {line_number}: invalid amount {row.get(amount_column)!r}')
+        if reference:
+            yield reference, cents
+
+
+def build_settlement_index(settlements):
+    """Хеш-индекс reference -> сумма в копейках. Частичные расчеты по одному reference суммируются."""
+    index = {}
+    for reference, cents in settlements:
+        index[reference] = index.get(reference, 0) + cents
+    return index
+
+
+def order_totals_queryset():
+    items_total = OrderItem.objects.filter(
+        order=OuterRef('pk')
+    ).values('order').annotate(
+        total=Sum(F('price') * F('quantity'))
+    ).values('total')
+
+    return Order.objects.annotate(
+        total=Subquery(items_total, output_field=DecimalField(max_digits=12, decimal_places=2))
+    ).order_by().values_list('id', 'paid', 'payment__provider_reference', 'total')
+
+
+def iter_day_orders(start, end, chunk_size=2000):
+    rows = order_totals_queryset().filter(created__gte=start, created__lt=end)
+    for order_id, paid, reference, total in rows.iterator(chunk_size=chunk_size):
+        yield order_id, paid, reference, to_cents(total or 0)
+
+
+def resolve_references(references, chunk_size=2000):
+    """Заказы других дней, на которые ссылаются оставшиеся строки расчетов."""
+    references = list(references)
+    for i in range(0, len(references), chunk_size):
+        rows = order_totals_queryset().filter(payment__provider_reference__in=references[i:i + chunk_size])
+        for order_id, paid, reference, total in rows:
+            yield order_id, paid, reference, to_cents(total or 0)
+
+
+def _compare(order_id, paid, reference, total, settled):
+    if not paid:
+        return SETTLEMENT_FOR_UNPAID_ORDER, order_id, reference, total, settled
+    if settled != total:
+        return AMOUNT_MISMATCH, order_id, reference, total, settled
+    return None
+
+
+def reconcile(index, orders, resolve_unmatched=None):
+    """
+    Hash join заказов с индексом расчетов.
+
+    orders - итерируемый поток (order_id, paid, reference, total_cents). Индекс
+    расходуется по ходу: сопоставленные reference удаляются, поэтому после прохода
+    в нем остаются только расчеты без заказа за этот день.
+    """
+    for order_id, paid, reference, total in orders:
+        settled = index.pop(reference, None) if reference else None
+        if settled is None:
+            if paid:
+                yield PAID_WITHOUT_SETTLEMENT, order_id, reference, total, None
+            continue
+        mismatch = _compare(order_id, paid, reference, total, settled)
+        if mismatch:
+            yield mismatch
+
+    if resolve_unmatched is not None and index:
+        for order_id, paid, reference, total in resolve_unmatched(index.keys()):
+            settled = index.pop(reference, None)
+            if settled is None:
+                continue
+            mismatch = _compare(order_id, paid, reference, total, settled)
+            if mismatch:
+                yield mismatch
+
+    for reference, settled in index.items():
+        yield SETTLEMENT_WITHOUT_ORDER, None, reference, None, settled
+
+
+def write_report(mismatches, file):
+    """Пишет отчет потоком и возвращает количество расхождений по видам."""
+    writer = csv.writer(file)
+    writer.writerow(REPORT_HEADER)
+    counts = {}
+    for kind, order_id, reference, total, settled in mismatches:
+        writer.writerow([kind, order_id or '', reference or '', from_cents(total), from_cents(settled)])
+        counts[kind] = counts.get(kind, 0) + 1
+    return counts
@@ -1,3 +1,144 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import os
+import tempfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from apps.orders.models import Order, OrderItem
+from apps.payment.models import Payment
+from apps.payment.reconciliation import (
+    AMOUNT_MISMATCH, PAID_WITHOUT_SETTLEMENT, SETTLEMENT_FOR_UNPAID_ORDER, SETTLEMENT_WITHOUT_ORDER,
+    build_settlement_index, read_settlements, reconcile,
+)
+from apps.products.models import Variation
+from apps.products.tests import create_product
+
+User = get_user_model()
+
+
+def settlements(*rows):
+    lines = ['reference,amount', *(f'{reference},{amount}' for reference, amount in rows)]
+    return build_settlement_index(read_settlements(io.StringIO('\n'.join(lines))))
+
+
+class ReconcileTests(SimpleTestCase):
+    def test_kinds_of_mismatches(self):
+        index = settlements(
+            ('pay_1', '100.00'),
+            ('pay_2', '250.00'),
+            ('pay_4', '10.00'),
+            ('orphan', '5.00'),
+        )
+        orders = [
+            (1, True, 'pay_1', 10000),
+            (2, True, 'pay_2', 20000),
+            (3, True, 'pay_3', 30000),
+            (4, False, 'pay_4', 1000),
+            (5, False, None, 500),
+        ]
+        self.assertEqual(sorted(reconcile(index, orders)), sorted([
+            (AMOUNT_MISMATCH, 2, 'pay_2', 20000, 25000),
+            (PAID_WITHOUT_SETTLEMENT, 3, 'pay_3', 30000, None),
+            (SETTLEMENT_FOR_UNPAID_ORDER, 4, 'pay_4', 1000, 1000),
+            (SETTLEMENT_WITHOUT_ORDER, None, 'orphan', None, 500),
+        ]))
+
+    def test_duplicate_rows_are_summed(self):
+        # Частичные расчеты сходятся с заказом, повторное списание - нет
+        index = settlements(('pay_1', '60.00'), ('pay_1', '40.00'), ('pay_2', '50.00'), ('pay_2', '50.00'))
+        orders = [(1, True, 'pay_1', 10000), (2, True, 'pay_2', 5000)]
+        self.assertEqual(list(reconcile(index, orders)), [(AMOUNT_MISMATCH, 2, 'pay_2', 5000, 10000)])
+
+    def test_settlements_for_other_days_are_resolved(self):
+        index = settlements(('pay_1', '100.00'), ('pay_old', '70.00'), ('orphan', '5.00'))
+        resolved = []
+
+        def resolve_unmatched(references):
+            resolved.extend(sorted(references))
+            return [(9, True, 'pay_old', 7000)]
+
+        self.assertEqual(list(reconcile(index, [(1, True, 'pay_1', 10000)], resolve_unmatched)), [
+            (SETTLEMENT_WITHOUT_ORDER, None, 'orphan', None, 500),
+        ])
+        self.assertEqual(resolved, ['orphan', 'pay_old'])
+
+    def test_invalid_amount_reports_line(self):
+        with self.assertRaisesMessage(ValueError, 'Line 3'):
+            settlements(('pay_1', '1.00'), ('pay_2', 'abc'))
+
+    def test_rows_without_reference_are_skipped(self):
+        self.assertEqual(settlements(('', '1.00'), ('pay_1', '2.00')), {'pay_1': 200})
+
+
+class ReconcilePaymentsCommandTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = datetime.date(2026, 3, 10)
+        cls.user = User.objects.create(username='buyer')
+        cls.variation = Variation.objects.create(
+            product=create_product('Пуэр'), price=Decimal('100.00'), weight=100, pieces=1,
+            text_description_of_count='1 шт',
+        )
+        cls.matched = cls.create_order('pay_matched', quantity=2)
+        cls.missing = cls.create_order('pay_missing')
+        cls.mismatched = cls.create_order('pay_mismatch', quantity=3)
+        cls.unpaid = cls.create_order('pay_unpaid', paid=False)
+        cls.previous_day = cls.create_order('pay_previous', days_before=1)
+
+    @classmethod
+    def create_order(cls, reference, quantity=1, paid=True, days_before=0):
+        order = Order.objects.create(
+            user=cls.user, first_name='Иван', last_name='Петров', email='buyer@example.com',
+            phone='+7 900 000 00 00', paid=paid,
+        )
+        created = timezone.make_aware(datetime.datetime.combine(cls.day, datetime.time(12)))
+        Order.objects.filter(pk=order.pk).update(created=created - datetime.timedelta(days=days_before))
+        OrderItem.objects.create(order=order, variation=cls.variation, price=Decimal('100.00'), quantity=quantity)
+        Payment.objects.create(
+            order=order, provider='test', provider_reference=reference, amount=Decimal(100 * quantity)
+        )
+        return order
+
+    def reconcile(self, rows):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            settlement_path = os.path.join(tmp_dir, 'settlements.csv')
+            report_path = os.path.join(tmp_dir, 'report.csv')
+            with open(settlement_path, 'w', newline='', encoding='utf-8') as settlement_file:
+                writer = csv.writer(settlement_file)
+                writer.writerow(['reference', 'amount'])
+                writer.writerows(rows)
+            call_command('reconcile_payments', settlement_path, date=self.day.isoformat(), output=report_path,
+                         stderr=io.StringIO())
+            with open(report_path, newline='', encoding='utf-8') as report_file:
+                return sorted(
+                    (row['kind'], row['order_id'], row['reference'], row['order_total'], row['settled_amount'])
+                    for row in csv.DictReader(report_file)
+                )
+
+    def test_report(self):
+        report = self.reconcile([
+            ('pay_matched', '120.00'),
+            ('pay_matched', '80.00'),
+            ('pay_mismatch', '299.00'),
+            ('pay_unpaid', '100.00'),
+            ('pay_previous', '100.00'),
+            ('pay_unknown', '15.50'),
+        ])
+        self.assertEqual(report, sorted([
+            (AMOUNT_MISMATCH, str(self.mismatched.pk), 'pay_mismatch', '300.00', '299.00'),
+            (PAID_WITHOUT_SETTLEMENT, str(self.missing.pk), 'pay_missing', '100.00', ''),
+            (SETTLEMENT_FOR_UNPAID_ORDER, str(self.unpaid.pk), 'pay_unpaid', '100.00', '100.00'),
+            (SETTLEMENT_WITHOUT_ORDER, '', 'pay_unknown', '', '15.50'),
+        ]))
+
+    def test_clean_day(self):
+        report = self.reconcile([
+            ('pay_matched', '200.00'), ('pay_missing', '100.00'), ('pay_mismatch', '300.00'),
+        ])
+        self.assertEqual(report, [])
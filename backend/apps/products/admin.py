@@ -1,14 +1,19 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
 from django.urls.conf import path
 from django.utils.html import format_html
 from django.urls import reverse
 from rangefilter.filters import NumericRangeFilterBuilder
 
+from apps.common.exports import ExportAdminMixin
+from apps.promotions.forms import RepriceForm
+from apps.promotions.price_changes import preview_price_change, reprice_now
 from .filters import AromaFilter, AdditiveFilter, ManufacturerFilter, CountryFilter, TeaCategoryFilter, StockFilter
 from .forms import CoffeeAttributeForm, CoffeeAttributeInlineForm
 from .models import (
     Product, Variation, CoffeeAttribute, TeaAttribute, AccessoryAttribute,
-    TeaCategory, AccessoryType, Aroma, Additive, Country, Manufacturer
+    TeaCategory, AccessoryType, Aroma, Additive, Country, Manufacturer, VariationPriceHistory
 )
 
 
@@ -179,6 +184,7 @@ class ProductAdmin(admin.ModelAdmin):
         'country',
         'variations_count',
         'total_stock',
+        'rating_info',
         'available',
     ]
     list_filter = [
@@ -233,12 +239,18 @@ class ProductAdmin(admin.ModelAdmin):
     def total_stock(self, obj):
         return sum(v.stock for v in obj.variations.all())
 
+    def rating_info(self, obj):
+        if not obj.rating_count:
+            return '-'
+        return f'{obj.rating_average}★ ({obj.rating_count})'
+
     variations_count.short_description = 'Variations'
     total_stock.short_description = 'Total stock'
+    rating_info.short_description = 'Rating'
 
 
 @admin.register(Variation)
-class VariationAdmin(admin.ModelAdmin):
+class VariationAdmin(ExportAdminMixin, admin.ModelAdmin):
     list_display = [
         'product_link', 'text_description_of_count', 'price',
         'stock', 'available', 'stock_status'
@@ -248,6 +260,11 @@ class VariationAdmin(admin.ModelAdmin):
     list_editable = ['price', 'stock', 'available']
     list_select_related = ['product']
     list_per_page = 50
+    actions = [*ExportAdminMixin.actions, 'reprice']
+    export_columns = [
+        ('ID', 'id'), ('Товар', 'product__name'), ('Тип', 'product__product_type'),
+        ('Вариация', 'text_description_of_count'), ('Цена', 'price'), ('Остаток', 'stock'), ('Доступна', 'available'),
+    ]
 
     def product_link(self, obj):
         url = reverse('admin:products_product_change', args=[obj.product.pk])
@@ -272,6 +289,36 @@ class VariationAdmin(admin.ModelAdmin):
 
     stock_status.short_description = 'Статус склада'
 
+    @admin.action(description='Переоценить', permissions=['change'])
+    def reprice(self, request, queryset):
+        # Промежуточная страница: форма -> предпросмотр итогов -> применение одним UPDATE
+        form = RepriceForm(request.POST if 'mode' in request.POST else None)
+        preview = None
+        if form.is_valid():
+            batch = form.instance
+            if 'apply' in request.POST:
+                batch = reprice_now(batch, queryset, user=request.user)
+                url = reverse('admin:promotions_pricechangebatch_change', args=[batch.pk])
+                self.message_user(
+                    request,
+                    format_html('<a href="{}">{}</a>: изменено {} цен', url, batch, batch.affected_count),
+                    messages.SUCCESS,
+                )
+                return None
+            preview = preview_price_change(queryset, batch.mode, batch.value, batch.rounding)
+
+        return TemplateResponse(request, 'admin/products/variation/reprice.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Переоценка вариаций',
+            'opts': self.model._meta,
+            'form': form,
+            'preview': preview,
+            'count': preview['count'] if preview else queryset.count(),
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across', '0'),
+        })
+
 
 @admin.register(CoffeeAttribute)
 class CoffeeAttributeAdmin(admin.ModelAdmin):
@@ -348,3 +395,25 @@ class AccessoryAttributeAdmin(admin.ModelAdmin):
     list_display = ['product', 'accessory_type', 'volume']
     list_filter = ['accessory_type']
     search_fields = ['product__name']
+
+
+@admin.register(VariationPriceHistory)
+class VariationPriceHistoryAdmin(admin.ModelAdmin):
+    list_display = ['variation', 'product_name', 'price', 'valid_from', 'valid_to']
+    list_filter = ['valid_from', 'valid_to']
+    search_fields = ['variation__product__name']
+    list_select_related = ['variation__product']
+    raw_id_fields = ['variation']
+    date_hierarchy = 'valid_from'
+    list_per_page = 50
+
+    def product_name(self, obj):
+        return obj.variation.product.name
+
+    product_name.short_description = 'Товар'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
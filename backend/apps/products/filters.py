@@ -1,28 +1,60 @@
-from admin_auto_filters.filters import AutocompleteFilter
+from admin_auto_filters.filters import AutocompleteFilter, AutocompleteSelect
+from django import forms
 from django.contrib.admin.filters import SimpleListFilter
 
+from .reference import get_names
 
-class AromaFilter(AutocompleteFilter):
+
+class ReferenceAutocompleteSelect(AutocompleteSelect):
+    """Подпись выбранного значения берется из кеша справочников, а не отдельным запросом к БД."""
+
+    def optgroups(self, name, value, attr=None):
+        default = (None, [], 0)
+        if not self.is_required and not self.allow_multiple_selected:
+            default[1].append(self.create_option(name, '', '', False, 0))
+        names = get_names(self.field.remote_field.model)
+        selected = {str(v) for v in value if str(v) not in self.choices.field.empty_values}
+        for pk in selected:
+            if pk.isdigit() and int(pk) in names:
+                default[1].append(self.create_option(name, int(pk), names[int(pk)], True, len(default[1])))
+        return [default]
+
+
+class ReferenceChoiceField(forms.ModelChoiceField):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        widget = self.widget
+        self.widget = ReferenceAutocompleteSelect(
+            widget.field, widget.admin_site, attrs=widget.attrs, using=widget.db, custom_url=widget.custom_url,
+        )
+        self.widget.choices = self.choices
+
+
+class ReferenceAutocompleteFilter(AutocompleteFilter):
+    form_field = ReferenceChoiceField
+
+
+class AromaFilter(ReferenceAutocompleteFilter):
     title = 'Aromas'
     field_name = 'aromas'
 
 
-class AdditiveFilter(AutocompleteFilter):
+class AdditiveFilter(ReferenceAutocompleteFilter):
     title = 'Additives'
     field_name = 'additives'
 
 
-class ManufacturerFilter(AutocompleteFilter):
+class ManufacturerFilter(ReferenceAutocompleteFilter):
     title = 'Manufacturer'
     field_name = 'manufacturer'
 
 
-class CountryFilter(AutocompleteFilter):
+class CountryFilter(ReferenceAutocompleteFilter):
     title = 'Country'
     field_name = 'country'
 
 
-class TeaCategoryFilter(AutocompleteFilter):
+class TeaCategoryFilter(ReferenceAutocompleteFilter):
     title = 'Tea category'
     field_name = 'category'
 
@@ -1,8 +1,10 @@
 from django import forms
 from django.core.exceptions import ValidationError
+from django.forms.models import BaseInlineFormSet
 
-from .models import CoffeeAttribute
+from .models import CoffeeAttribute, Product, Variation
 from .validators import validate_percentage_sum_equals_100
+from .widgets import RemoteSelect
 
 
 class CoffeeAttributeForm(forms.ModelForm):
@@ -41,3 +43,130 @@ class CoffeeAttributeInlineForm(forms.ModelForm):
             self.add_error('robusta_percent', e)
             self.add_error('liberica_percent', e)
         return cleaned_data
+
+
+def variation_label(variation):
+    return f'{variation.text_description_of_count} ({variation.price}₽)'
+
+
+class PrefetchedModelChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField, который берет объект из заранее загруженного словаря {pk: объект} вместо queryset.get()."""
+
+    prefetched = None
+
+    def __deepcopy__(self, memo):
+        result = super().__deepcopy__(memo)
+        result.prefetched = None
+        return result
+
+    def to_python(self, value):
+        if self.prefetched is None or value in self.empty_values or isinstance(value, self.queryset.model):
+            return super().to_python(value)
+        try:
+            return self.prefetched[int(value)]
+        except (KeyError, ValueError, TypeError):
+            raise ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value},
+            )
+
+
+class VariationItemForm(forms.ModelForm):
+    """
+    Основа форм строк корзины и заказа: товар и вариация выбираются поиском на сервере
+    (products:search_products, products:search_variations), а не списком всего каталога.
+    Подписи выбранных значений берутся из instance.variation - инлайн загружает его через
+    select_related('variation__product'), так что показ строки не делает запросов.
+    Проверку отправленных значений без запросов на строку обеспечивает VariationItemFormSet.
+    """
+
+    product = PrefetchedModelChoiceField(
+        queryset=Product.objects.all(),
+        required=False,
+        label='Товар',
+        widget=RemoteSelect('products:search_products', attrs={'style': 'width: 250px;'}),
+    )
+    variation = PrefetchedModelChoiceField(
+        queryset=Variation.objects.select_related('product'),
+        label='Вариация',
+        widget=RemoteSelect('products:search_variations', depends_on='product', attrs={'style': 'width: 250px;'}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if self.instance.pk and self.instance.variation_id:
+            variation = self.instance.variation
+            self.fields['product'].initial = variation.product_id
+            self.fields['product'].widget.labels[str(variation.product_id)] = str(variation.product)
+            self.fields['variation'].widget.labels[str(variation.pk)] = variation_label(variation)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        product = cleaned_data.get('product')
+        variation = cleaned_data.get('variation')
+
+        if product and not variation:
+            raise forms.ValidationError('Необходимо выбрать вариацию для товара')
+        # product вариации уже загружен вместе с ней - сравнение без запроса
+        if product and variation and variation.product_id != product.pk:
+            self.add_error('variation', 'Выбранная вариация не принадлежит выбранному товару')
+
+        return cleaned_data
+
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        # Существование вариации проверено загрузкой пачкой - без запроса ForeignKey.validate на каждую строку
+        if self.fields['variation'].prefetched is not None:
+            exclude.add('variation')
+        return exclude
+
+
+class VariationItemFormSet(BaseInlineFormSet):
+    """
+    Формсет строк с VariationItemForm: все отправленные вариации загружаются одним запросом
+    вместе с товарами (и еще одним - товары, выбранные без вариации), после чего поля строк
+    проверяются по этим словарям в памяти. Проверка 100 строк - те же два запроса, что и одной,
+    новые строки сохраняются одним bulk_create.
+    """
+
+    def full_clean(self):
+        if self.is_bound:
+            self.prefetch_choices()
+        super().full_clean()
+
+    def submitted_ids(self, name):
+        ids = set()
+        for form in self.forms:
+            value = form.data.get(form.add_prefix(name))
+            if value and str(value).isdigit():
+                ids.add(int(value))
+        return ids
+
+    def prefetch_choices(self):
+        variations = Variation.objects.select_related('product').in_bulk(self.submitted_ids('variation'))
+        products = {variation.product_id: variation.product for variation in variations.values()}
+        missing = self.submitted_ids('product') - products.keys()
+        if missing:
+            products.update(Product.objects.in_bulk(missing))
+
+        # При повторном показе формы с ошибками подписи тоже не требуют запросов
+        variation_labels = {str(pk): variation_label(variation) for pk, variation in variations.items()}
+        product_labels = {str(pk): str(product) for pk, product in products.items()}
+        for form in self.forms:
+            form.fields['variation'].prefetched = variations
+            form.fields['product'].prefetched = products
+            form.fields['variation'].widget.labels = variation_labels
+            form.fields['product'].widget.labels = product_labels
+
+    def save_new_objects(self, commit=True):
+        if not commit:
+            return super().save_new_objects(commit)
+        forms = [
+            form for form in self.extra_forms
+            if form.has_changed() and not (self.can_delete and self._should_delete_form(form))
+        ]
+        self.new_objects = [self.save_new(form, commit=False) for form in forms]
+        self.model.objects.bulk_create(self.new_objects)
+        for form in forms:
+            form.save_m2m()
+        return self.new_objects
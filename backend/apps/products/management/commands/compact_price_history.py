@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.products.price_history import COMPACT_CHUNK_SIZE, compact_price_history
+
+
+class Command(BaseCommand):
+    help = 'Сливает соседние интервалы истории цен с одинаковой ценой'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=COMPACT_CHUNK_SIZE,
+            help='Сколько вариаций обрабатывать в одной транзакции'
+        )
+
+    def handle(self, *args, **options):
+        started_at = time.monotonic()
+        deleted = compact_price_history(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено {deleted} лишних интервалов за {time.monotonic() - started_at:.1f} с'
+        ))
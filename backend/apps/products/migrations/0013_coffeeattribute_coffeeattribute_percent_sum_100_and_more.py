@@ -0,0 +1,62 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:43
+
+import django.db.models.expressions
+import django.db.models.lookups
+from django.db import migrations, models
+
+
+def fix_existing_rows(apps, schema_editor):
+    """
+    Строки, которые пропускал прежний валидатор, иначе не дадут добавить ограничения.
+    Доли кофе, не дающие в сумме 100, пересчитываются пропорционально (остаток - наибольшим дробным частям);
+    нулевой состав и неизвестный тип товара исправить автоматически нельзя - миграция останавливается со списком id.
+    """
+    Product = apps.get_model('products', 'Product')
+    CoffeeAttribute = apps.get_model('products', 'CoffeeAttribute')
+
+    bad_types = list(
+        Product.objects.exclude(product_type__in=['tea', 'coffee', 'accessory']).values_list('pk', flat=True)
+    )
+    fields = ('arabica_percent', 'robusta_percent', 'liberica_percent')
+    unfixable, fixed = [], []
+    for attribute in CoffeeAttribute.objects.all():
+        values = [getattr(attribute, field) for field in fields]
+        total = sum(values)
+        if total == 100:
+            continue
+        if total == 0:
+            unfixable.append(attribute.pk)
+            continue
+        shares = [value * 100 / total for value in values]
+        rounded = [int(share) for share in shares]
+        by_remainder = sorted(range(len(fields)), key=lambda index: shares[index] - rounded[index], reverse=True)
+        for index in by_remainder[:100 - sum(rounded)]:
+            rounded[index] += 1
+        for field, value in zip(fields, rounded):
+            setattr(attribute, field, value)
+        fixed.append(attribute)
+    if bad_types or unfixable:
+        raise RuntimeError(
+            'Исправьте данные перед миграцией: '
+            f'товары с неизвестным product_type {bad_types}, атрибуты кофе с нулевым составом {unfixable}'
+        )
+    CoffeeAttribute.objects.bulk_update(fixed, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_product_rating_1_product_rating_2_product_rating_3_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(fix_existing_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='coffeeattribute',
+            constraint=models.CheckConstraint(condition=django.db.models.lookups.Exact(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('arabica_percent'), '+', models.F('robusta_percent')), '+', models.F('liberica_percent')), 100), name='coffeeattribute_percent_sum_100', violation_error_message='Sum of percentages must equal 100%'),
+        ),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.CheckConstraint(condition=models.Q(('product_type__in', ['tea', 'coffee', 'accessory'])), name='product_type_valid', violation_error_message='Product type is not correct'),
+        ),
+    ]
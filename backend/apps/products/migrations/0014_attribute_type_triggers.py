@@ -0,0 +1,116 @@
+# Атрибуты товара должны соответствовать его типу: CoffeeAttribute - только у coffee и т.д.
+# Правило затрагивает две таблицы, поэтому выражено триггерами, а не CheckConstraint.
+#
+# Внимание, SQLite: Django меняет там большинство полей (AlterField, RemoveField, AddConstraint...)
+# пересозданием таблицы, и триггеры на ней молча пропадают. Если более поздняя миграция меняет
+# products_product или таблицы атрибутов, в нее нужно добавить такой же RunPython, создающий триггеры заново.
+# Пропажу триггеров ловит AttributeTypeTriggerTests (apps/products/tests.py).
+
+from django.db import migrations
+
+
+ATTRIBUTE_TABLES = {
+    'coffee': 'products_coffeeattribute',
+    'tea': 'products_teaattribute',
+    'accessory': 'products_accessoryattribute',
+}
+
+
+def sqlite_statements():
+    for product_type, table in ATTRIBUTE_TABLES.items():
+        for event in ('INSERT', 'UPDATE OF product_id'):
+            suffix = event.split()[0].lower()
+            yield f"""
+                CREATE TRIGGER {table}_type_{suffix} BEFORE {event} ON {table}
+                FOR EACH ROW WHEN (SELECT product_type FROM products_product WHERE id = NEW.product_id) <> '{product_type}'
+                BEGIN SELECT RAISE(ABORT, 'Product type does not match {product_type} attribute'); END
+            """
+    mismatches = ' OR '.join(
+        f"(NEW.product_type <> '{product_type}' AND EXISTS (SELECT 1 FROM {table} WHERE product_id = NEW.id))"
+        for product_type, table in ATTRIBUTE_TABLES.items()
+    )
+    yield f"""
+        CREATE TRIGGER products_product_attribute_type BEFORE UPDATE OF product_type ON products_product
+        FOR EACH ROW WHEN {mismatches}
+        BEGIN SELECT RAISE(ABORT, 'Product has an attribute of another type'); END
+    """
+
+
+def postgresql_statements():
+    # FOR SHARE: смена типа товара ждет завершения транзакции, добавляющей ему атрибут, и наоборот
+    yield """
+        CREATE FUNCTION products_check_attribute_type() RETURNS trigger AS $$
+        BEGIN
+            IF (SELECT product_type FROM products_product WHERE id = NEW.product_id FOR SHARE)
+                    IS DISTINCT FROM TG_ARGV[0] THEN
+                RAISE EXCEPTION 'Product % type does not match % attribute', NEW.product_id, TG_ARGV[0]
+                    USING ERRCODE = 'check_violation';
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """
+    for product_type, table in ATTRIBUTE_TABLES.items():
+        yield f"""
+            CREATE TRIGGER {table}_type BEFORE INSERT OR UPDATE OF product_id ON {table}
+            FOR EACH ROW EXECUTE FUNCTION products_check_attribute_type('{product_type}')
+        """
+    mismatches = ' OR '.join(
+        f"(NEW.product_type <> '{product_type}' AND EXISTS (SELECT 1 FROM {table} WHERE product_id = NEW.id))"
+        for product_type, table in ATTRIBUTE_TABLES.items()
+    )
+    yield f"""
+        CREATE FUNCTION products_check_product_type() RETURNS trigger AS $$
+        BEGIN
+            IF {mismatches} THEN
+                RAISE EXCEPTION 'Product % has an attribute of another type', NEW.id
+                    USING ERRCODE = 'check_violation';
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """
+    yield """
+        CREATE TRIGGER products_product_attribute_type BEFORE UPDATE OF product_type ON products_product
+        FOR EACH ROW WHEN (NEW.product_type IS DISTINCT FROM OLD.product_type)
+        EXECUTE FUNCTION products_check_product_type()
+    """
+
+
+def drop_statements(vendor):
+    if vendor == 'postgresql':
+        yield 'DROP FUNCTION IF EXISTS products_check_product_type() CASCADE'
+        yield 'DROP FUNCTION IF EXISTS products_check_attribute_type() CASCADE'
+        return
+    for table in ATTRIBUTE_TABLES.values():
+        yield f'DROP TRIGGER IF EXISTS {table}_type_insert'
+        yield f'DROP TRIGGER IF EXISTS {table}_type_update'
+    yield 'DROP TRIGGER IF EXISTS products_product_attribute_type'
+
+
+STATEMENTS = {'sqlite': sqlite_statements, 'postgresql': postgresql_statements}
+
+
+def create_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in STATEMENTS:
+        return
+    for statement in STATEMENTS[vendor]():
+        # params=None: иначе psycopg примет % в тексте RAISE за плейсхолдеры
+        schema_editor.execute(statement, params=None)
+
+
+def drop_triggers(apps, schema_editor):
+    for statement in drop_statements(schema_editor.connection.vendor):
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_coffeeattribute_coffeeattribute_percent_sum_100_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
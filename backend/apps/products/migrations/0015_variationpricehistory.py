@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0014_attribute_type_triggers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VariationPriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('valid_from', models.DateTimeField()),
+                ('valid_to', models.DateTimeField(blank=True, null=True)),
+                ('variation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='products.variation')),
+            ],
+            options={
+                'verbose_name_plural': 'variation price history',
+                'indexes': [models.Index(fields=['variation', 'valid_from'], name='products_va_variati_02be20_idx'), models.Index(fields=['valid_to'], name='products_va_valid_t_10d64b_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('valid_to__isnull', True)), fields=('variation',), name='variationpricehistory_one_open'), models.CheckConstraint(condition=models.Q(('valid_to__isnull', True), ('valid_to__gt', models.F('valid_from')), _connector='OR'), name='variationpricehistory_valid_range')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Текущие цены становятся открытыми интервалами истории. Более ранние цены неизвестны -
+# интервалы начинаются с момента миграции.
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill(apps, schema_editor):
+    connection = schema_editor.connection
+    quote = connection.ops.quote_name
+    history = apps.get_model('products', 'VariationPriceHistory')._meta.db_table
+    variations = apps.get_model('products', 'Variation')._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(history)} ({quote("variation_id")}, {quote("price")}, {quote("valid_from")}) '
+            f'SELECT {quote("id")}, {quote("price")}, %s FROM {quote(variations)}',
+            [connection.ops.adapt_datetimefield_value(timezone.now())],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_variationpricehistory'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
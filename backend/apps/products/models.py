@@ -1,6 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models import F
+from django.db.models.lookups import Exact
+
+from .validators import validate_product_correct_attribute
 
 
 User = get_user_model()
@@ -49,12 +54,45 @@ class Product(models.Model):
     product_type = models.CharField(max_length=20, choices=PRODUCT_TYPES)
     available = models.BooleanField(default=True)
 
+    # Агрегаты оценок, поддерживаются приложением reviews в транзакции с каждым изменением оценки
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         ordering = ('name',)
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(product_type__in=['tea', 'coffee', 'accessory']),
+                name='product_type_valid',
+                violation_error_message='Product type is not correct',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def clean(self):
+        # Сообщение для формы; bulk-операции и прямой save() останавливают ограничения и триггеры БД
+        try:
+            validate_product_correct_attribute(self)
+        except ValidationError as e:
+            raise ValidationError({'product_type': e.messages})
+
+    @property
+    def rating_average(self):
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 2)
+
+    @property
+    def rating_histogram(self):
+        return [self.rating_1, self.rating_2, self.rating_3, self.rating_4, self.rating_5]
+
 
 # class CoffeeComposition(models.Model):
 #     name = models.CharField(max_length=100, unique=True)
@@ -83,6 +121,16 @@ class CoffeeAttribute(models.Model):
     aromas = models.ManyToManyField(Aroma, related_name='coffee_attrs')
     additives = models.ManyToManyField(Additive, related_name='coffee_attrs')
 
+    class Meta:
+        constraints = [
+            # Поля неотрицательные (PositiveIntegerField), поэтому сумма 100 ограничивает и каждое значение
+            models.CheckConstraint(
+                condition=Exact(F('arabica_percent') + F('robusta_percent') + F('liberica_percent'), 100),
+                name='coffeeattribute_percent_sum_100',
+                violation_error_message='Sum of percentages must equal 100%',
+            ),
+        ]
+
     arabica_percent = models.PositiveIntegerField(validators=[MinValueValidator(0), MaxValueValidator(100)])
     robusta_percent = models.PositiveIntegerField(validators=[MinValueValidator(0), MaxValueValidator(100)])
     liberica_percent = models.PositiveIntegerField(validators=[MinValueValidator(0), MaxValueValidator(100)])
@@ -141,4 +189,37 @@ class Variation(models.Model):
 
     def __str__(self):
         return self.text_description_of_count
-        # return f'{self.product.name} | {self.text_description_of_count}'
\ No newline at end of file
+        # return f'{self.product.name} | {self.text_description_of_count}'
+
+
+class VariationPriceHistory(models.Model):
+    """
+    Интервал [valid_from, valid_to), в котором действовала цена вариации; открытый (valid_to пуст) - текущая цена.
+    Интервалы одной вариации не пересекаются, новый появляется только при смене цены (apps/products/price_history.py).
+    """
+
+    variation = models.ForeignKey(Variation, on_delete=models.CASCADE, related_name='price_history')
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    valid_from = models.DateTimeField()
+    valid_to = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'variation price history'
+        indexes = [
+            # Цена на момент: variation_id = X AND valid_from <= T ORDER BY valid_from DESC
+            models.Index(fields=['variation', 'valid_from']),
+            # Что менялось за период: закрытие интервала и есть смена цены
+            models.Index(fields=['valid_to']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['variation'], condition=models.Q(valid_to__isnull=True), name='variationpricehistory_one_open'
+            ),
+            models.CheckConstraint(
+                condition=models.Q(valid_to__isnull=True) | models.Q(valid_to__gt=F('valid_from')),
+                name='variationpricehistory_valid_range',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.variation_id}: {self.price} ({self.valid_from} - {self.valid_to or "..."})'
@@ -0,0 +1,126 @@
+"""
+История цен вариаций (VariationPriceHistory): непересекающиеся интервалы [valid_from, valid_to),
+открытый интервал - текущая цена.
+
+record_price_changes() вызывается после любого изменения цен - из сигнала Variation.post_save
+и после массовых UPDATE (apps/promotions/price_changes.py). Она работает с queryset целиком:
+новый интервал открывается только там, где цена действительно изменилась, строки в Python не поднимаются.
+"""
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Q, Subquery, Window
+from django.db.models.functions import Lag
+from django.utils import timezone
+
+from .models import Variation, VariationPriceHistory
+
+
+COMPACT_CHUNK_SIZE = 1000
+
+
+def lock_variations(ids):
+    """
+    SELECT ... FOR UPDATE по строкам вариаций, без передачи строк в Python. Без блокировки два параллельных
+    сохранения одной вариации оба не видят открытого интервала, и второй INSERT падает на
+    variationpricehistory_one_open. В SQLite FOR UPDATE не нужен: запись и так сериализована.
+    """
+    locked = Variation.objects.filter(pk__in=ids).select_for_update().order_by('pk').values('pk')
+    sql, params = locked.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COUNT(*) FROM ({sql}) locked', params)
+
+
+def record_price_changes(variations, now=None):
+    """Закрывает интервалы, чья цена разошлась с текущей, и открывает новые. Возвращает число открытых."""
+    now = now or timezone.now()
+    ids = variations.order_by().values('pk')
+    current_price = Subquery(Variation.objects.filter(pk=OuterRef('variation_id')).values('price')[:1])
+    outdated = VariationPriceHistory.objects.filter(variation_id__in=ids, valid_to__isnull=True).exclude(
+        price=current_price
+    )
+    ids_sql, params = ids.query.sql_with_params()
+    quote = connection.ops.quote_name
+    history_table = quote(VariationPriceHistory._meta.db_table)
+    variations_table = quote(Variation._meta.db_table)
+
+    with transaction.atomic():
+        lock_variations(ids)
+        # Интервал, открытый в этот же момент, никто не успел увидеть - удаляем вместо пустого [now, now)
+        outdated.filter(valid_from__gte=now).delete()
+        outdated.update(valid_to=now)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {history_table} ({quote("variation_id")}, {quote("price")}, {quote("valid_from")}) '
+                f'SELECT v.{quote("id")}, v.{quote("price")}, %s FROM {variations_table} v '
+                f'WHERE v.{quote("id")} IN ({ids_sql}) AND NOT EXISTS ('
+                f'SELECT 1 FROM {history_table} h WHERE h.{quote("variation_id")} = v.{quote("id")} '
+                f'AND h.{quote("valid_to")} IS NULL)',
+                [connection.ops.adapt_datetimefield_value(now), *params],
+            )
+            return cursor.rowcount
+
+
+def valid_at(at):
+    return Q(valid_from__lte=at) & (Q(valid_to__isnull=True) | Q(valid_to__gt=at))
+
+
+def price_at(variation_id, at):
+    return VariationPriceHistory.objects.filter(valid_at(at), variation_id=variation_id).order_by(
+        '-valid_from'
+    ).values_list('price', flat=True).first()
+
+
+def prices_at(variation_ids, at):
+    """{variation_id: цена} на момент at, одним запросом. Вариаций без истории на этот момент в словаре нет."""
+    return dict(VariationPriceHistory.objects.filter(valid_at(at), variation_id__in=variation_ids).values_list(
+        'variation_id', 'price'
+    ))
+
+
+def changed_between(start, end=None):
+    """Вариации, цена которых менялась в [start, end)."""
+    closed = VariationPriceHistory.objects.filter(valid_to__gte=start)
+    if end is not None:
+        closed = closed.filter(valid_to__lt=end)
+    return Variation.objects.filter(pk__in=closed.values('variation_id'))
+
+
+def compact_price_history(chunk_size=COMPACT_CHUNK_SIZE):
+    """
+    Сливает соседние интервалы с одинаковой ценой - они остаются, например, от пакета изменений,
+    откаченного к той же цене, или от двух изменений в один момент. Возвращает число удаленных строк.
+    """
+    by_variation = {'partition_by': F('variation_id'), 'order_by': F('valid_from').asc()}
+    mergeable = VariationPriceHistory.objects.annotate(
+        previous_price=Window(Lag('price'), **by_variation),
+        previous_to=Window(Lag('valid_to'), **by_variation),
+    ).filter(previous_price=F('price'), previous_to=F('valid_from'))
+    variation_ids = sorted(set(mergeable.values_list('variation_id', flat=True).iterator()))
+
+    deleted = 0
+    for start in range(0, len(variation_ids), chunk_size):
+        with transaction.atomic():
+            deleted += compact_variations(variation_ids[start:start + chunk_size])
+    return deleted
+
+
+def compact_variations(variation_ids):
+    rows = VariationPriceHistory.objects.select_for_update().filter(variation_id__in=variation_ids).order_by(
+        'variation_id', 'valid_from'
+    ).values_list('pk', 'variation_id', 'price', 'valid_from', 'valid_to')
+
+    redundant, extended = [], {}
+    kept = None
+    for pk, variation_id, price, valid_from, valid_to in rows:
+        if kept and kept['variation_id'] == variation_id and kept['price'] == price and kept['valid_to'] == valid_from:
+            redundant.append(pk)
+            kept['valid_to'] = extended[kept['pk']] = valid_to
+        else:
+            kept = {'pk': pk, 'variation_id': variation_id, 'price': price, 'valid_to': valid_to}
+
+    # Сначала удаление: продлеваемый интервал может стать открытым, а открытый у вариации только один
+    VariationPriceHistory.objects.filter(pk__in=redundant).delete()
+    VariationPriceHistory.objects.bulk_update(
+        [VariationPriceHistory(pk=pk, valid_to=valid_to) for pk, valid_to in extended.items()], ['valid_to']
+    )
+    return len(redundant)
@@ -0,0 +1,85 @@
+"""
+Кеш справочников каталога в памяти процесса.
+
+Страны, производители, ароматы, добавки, категории чая и типы аксессуаров меняются редко,
+а их названия нужны почти каждой странице, фильтру и выгрузке. Таблица целиком загружается
+в процесс как словари id -> название и название -> id и перечитывается, когда в общем кеше
+меняется ее версия - тег reference:<модель> из apps/common/tagged_cache.py. Версию повышают
+сигналы после коммита, поэтому изменение, сделанное в одном воркере, видят все остальные.
+Общий кеш опрашивается не чаще раза в REFERENCE_CHECK_INTERVAL секунд.
+"""
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from apps.common.routers import use_primary
+from apps.common.tagged_cache import tag, tag_versions, invalidate_tags
+from .models import Country, Manufacturer, Aroma, Additive, TeaCategory, AccessoryType
+
+
+REFERENCE_MODELS = (Country, Manufacturer, Aroma, Additive, TeaCategory, AccessoryType)
+
+ReferenceTable = namedtuple('ReferenceTable', ['version', 'names', 'ids', 'checked_at'])
+
+_tables = {}
+
+
+def version_tag(model):
+    return tag('reference', model._meta.model_name)
+
+
+def load_table(model, version, checked_at):
+    # С основной базы: реплика может еще не содержать изменение, о котором сообщила новая версия
+    with use_primary():
+        rows = list(model.objects.order_by('pk').values_list('pk', 'name'))
+    ids = {}
+    for pk, name in rows:
+        # У категорий чая и типов аксессуаров названия не уникальны - берем первую запись
+        ids.setdefault(name, pk)
+    return ReferenceTable(version, dict(rows), ids, checked_at)
+
+
+def get_table(model):
+    table = _tables.get(model)
+    now = time.monotonic()
+    if table is not None and now - table.checked_at < settings.REFERENCE_CHECK_INTERVAL:
+        return table
+
+    # Версия читается до данных: изменение, закоммиченное во время загрузки, перечитаем при следующей проверке
+    name = version_tag(model)
+    version = tag_versions(caches['default'], [name])[name]
+    if table is not None and table.version == version:
+        table = table._replace(checked_at=now)
+    else:
+        table = load_table(model, version, now)
+    _tables[model] = table
+    return table
+
+
+def get_names(model):
+    """{id: название} для справочника model."""
+    return get_table(model).names
+
+
+def get_ids(model):
+    """{название: id} для справочника model."""
+    return get_table(model).ids
+
+
+def invalidate(*models):
+    """
+    Сбрасывает кеш справочников после коммита во всех процессах. Сигналы вызывают его сами,
+    вручную - после bulk_create, update() и других операций без сигналов.
+    """
+    models = models or REFERENCE_MODELS
+    invalidate_tags(*(version_tag(model) for model in models))
+
+    def forget():
+        # Свой процесс перечитывает сразу, не дожидаясь REFERENCE_CHECK_INTERVAL
+        for model in models:
+            _tables.pop(model, None)
+
+    transaction.on_commit(forget)
@@ -1,8 +1,14 @@
 from django.db.models import signals
 from django.dispatch import receiver
 
-from .models import CoffeeAttribute, Product
-from .validators import validate_percentage_sum_equals_100, validate_product_correct_attribute
+from apps.common.tagged_cache import CATALOG_TAG, tag, invalidate_tags
+from . import reference
+from .price_history import record_price_changes
+from .models import (
+    Product, Variation, CoffeeAttribute, TeaAttribute, AccessoryAttribute,
+    TeaCategory, AccessoryType, Aroma, Additive, Country, Manufacturer
+)
+from .validators import validate_percentage_sum_equals_100
 
 
 @receiver(signals.pre_save, sender=CoffeeAttribute)
@@ -11,6 +17,84 @@ def coffee_attribute_pre_save(sender, instance, **kwargs):
         instance.arabica_percent, instance.robusta_percent, instance.liberica_percent
     )
 
+# Инвалидация тегового кеша каталога (apps/common/tagged_cache.py)
+
+# Поля, от которых зависит состав и порядок страниц каталога
+CATALOG_LIST_FIELDS = ('name', 'available', 'product_type', 'manufacturer_id')
+
+
 @receiver(signals.pre_save, sender=Product)
-def product_pre_save(sender, instance, **kwargs):
-    validate_product_correct_attribute(instance)
+def product_remember_list_fields(sender, instance, **kwargs):
+    instance._previous_list_fields = None
+    if instance.pk:
+        instance._previous_list_fields = Product.objects.filter(pk=instance.pk).values_list(
+            *CATALOG_LIST_FIELDS
+        ).first()
+
+
+@receiver(signals.post_save, sender=Product)
+def product_invalidate_cache(sender, instance, created, **kwargs):
+    tags = [tag('product', instance.pk)]
+    current = tuple(getattr(instance, field) for field in CATALOG_LIST_FIELDS)
+    if created or getattr(instance, '_previous_list_fields', None) != current:
+        tags.append(CATALOG_TAG)
+    invalidate_tags(*tags)
+
+
+@receiver(signals.post_delete, sender=Product)
+def product_deleted_invalidate_cache(sender, instance, **kwargs):
+    invalidate_tags(tag('product', instance.pk), CATALOG_TAG)
+
+
+@receiver(signals.pre_save, sender=Variation)
+def variation_remember_price(sender, instance, update_fields=None, **kwargs):
+    instance._previous_price = None
+    if instance.pk and (update_fields is None or 'price' in update_fields):
+        instance._previous_price = Variation.objects.filter(pk=instance.pk).values_list('price', flat=True).first()
+
+
+@receiver(signals.post_save, sender=Variation)
+def variation_record_price(sender, instance, created, update_fields=None, **kwargs):
+    # Сохранение без смены цены (остатки, описание) историю не трогает
+    if update_fields is not None and 'price' not in update_fields:
+        return
+    if created or getattr(instance, '_previous_price', None) != instance.price:
+        record_price_changes(Variation.objects.filter(pk=instance.pk))
+
+
+@receiver([signals.post_save, signals.post_delete], sender=Variation)
+def variation_invalidate_cache(sender, instance, **kwargs):
+    invalidate_tags(tag('variation', instance.pk), tag('product', instance.product_id))
+
+
+@receiver([signals.post_save, signals.post_delete], sender=CoffeeAttribute)
+@receiver([signals.post_save, signals.post_delete], sender=TeaAttribute)
+@receiver([signals.post_save, signals.post_delete], sender=AccessoryAttribute)
+def attribute_invalidate_cache(sender, instance, **kwargs):
+    invalidate_tags(tag('product', instance.product_id))
+
+
+@receiver(signals.m2m_changed, sender=CoffeeAttribute.aromas.through)
+@receiver(signals.m2m_changed, sender=CoffeeAttribute.additives.through)
+@receiver(signals.m2m_changed, sender=TeaAttribute.aromas.through)
+@receiver(signals.m2m_changed, sender=TeaAttribute.additives.through)
+def attribute_m2m_invalidate_cache(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_tags(tag('product', instance.product_id))
+    elif pk_set:
+        # Изменение со стороны аромата/добавки: model - класс атрибута, pk_set - затронутые атрибуты
+        product_ids = model.objects.filter(pk__in=pk_set).values_list('product_id', flat=True)
+        invalidate_tags(*(tag('product', product_id) for product_id in product_ids))
+
+
+@receiver([signals.post_save, signals.post_delete], sender=Manufacturer)
+@receiver([signals.post_save, signals.post_delete], sender=Country)
+@receiver([signals.post_save, signals.post_delete], sender=Aroma)
+@receiver([signals.post_save, signals.post_delete], sender=Additive)
+@receiver([signals.post_save, signals.post_delete], sender=TeaCategory)
+@receiver([signals.post_save, signals.post_delete], sender=AccessoryType)
+def reference_invalidate_cache(sender, instance, **kwargs):
+    invalidate_tags(tag(sender._meta.model_name, instance.pk))
+    reference.invalidate(sender)
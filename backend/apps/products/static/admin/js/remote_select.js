@@ -0,0 +1,49 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    // Поле той же строки инлайна: id_items-3-variation -> id_items-3-product
+    function siblingField(element, name) {
+        const prefix = element.id.slice(0, element.id.lastIndexOf('-') + 1);
+        return document.getElementById(prefix + name);
+    }
+
+    function initRemoteSelect(element) {
+        const dependsOn = element.dataset.dependsOn;
+        $(element).select2({
+            ajax: {
+                data: function(params) {
+                    const data = {term: params.term, page: params.page};
+                    if (dependsOn) {
+                        const parent = siblingField(element, dependsOn);
+                        data[dependsOn] = parent ? parent.value : '';
+                    }
+                    return data;
+                }
+            }
+        });
+
+        if (dependsOn) {
+            // Смена товара сбрасывает вариацию: старая ему не принадлежит
+            const parent = siblingField(element, dependsOn);
+            if (parent) {
+                $(parent).on('change', function() {
+                    $(element).val(null).trigger('change');
+                });
+            }
+        }
+    }
+
+    $(function() {
+        // Шаблон пустой строки (__prefix__) инициализируется после копирования, в formset:added
+        $('.admin-remote-select').not('[name*=__prefix__]').each(function() {
+            initRemoteSelect(this);
+        });
+    });
+
+    document.addEventListener('formset:added', function(event) {
+        $(event.target).find('.admin-remote-select').each(function() {
+            initRemoteSelect(this);
+        });
+    });
+}
@@ -1,3 +1,254 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.forms import inlineformset_factory
 from django.test import TestCase
 
-# Create your tests here.
+from apps.orders.forms import OrderItemForm
+from apps.orders.models import Order, OrderItem
+from apps.products.forms import VariationItemFormSet
+from apps.products.models import (
+    AccessoryAttribute, AccessoryType, CoffeeAttribute, Country, Manufacturer, Product, TeaAttribute, TeaCategory,
+    Variation, VariationPriceHistory,
+)
+from apps.products.price_history import changed_between, compact_price_history, price_at, record_price_changes
+
+User = get_user_model()
+
+OrderItemFormSet = inlineformset_factory(
+    Order, OrderItem, form=OrderItemForm, formset=VariationItemFormSet,
+    fields=['product', 'variation', 'price', 'quantity'], extra=0,
+)
+
+
+def create_product(name, product_type='tea'):
+    return Product.objects.create(
+        name=name, product_type=product_type,
+        manufacturer=Manufacturer.objects.get_or_create(name='Производитель')[0],
+        country=Country.objects.get_or_create(name='Китай')[0],
+    )
+
+
+class VariationItemFormSetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = create_product('Пуэр')
+        cls.other_product = create_product('Улун')
+        cls.variations = Variation.objects.bulk_create(
+            Variation(product=cls.product, price=Decimal(100 + i), weight=100, pieces=1,
+                      text_description_of_count=f'{i} шт')
+            for i in range(100)
+        )
+        cls.other_variation = Variation.objects.create(
+            product=cls.other_product, price=Decimal('50.00'), weight=50, pieces=1, text_description_of_count='1 шт'
+        )
+        cls.order = Order.objects.create(
+            user=User.objects.create(username='buyer'), first_name='Иван', last_name='Петров',
+            email='buyer@example.com', phone='+7 900 000 00 00',
+        )
+
+    def formset(self, rows):
+        data = {'items-TOTAL_FORMS': str(len(rows)), 'items-INITIAL_FORMS': '0'}
+        for index, (product, variation) in enumerate(rows):
+            data.update({
+                f'items-{index}-product': product.pk,
+                f'items-{index}-variation': variation.pk,
+                f'items-{index}-price': str(variation.price),
+                f'items-{index}-quantity': '1',
+            })
+        return OrderItemFormSet(data, instance=self.order, prefix='items')
+
+    def test_validation_queries_do_not_grow_with_rows(self):
+        for count in (1, 10, 100):
+            with self.subTest(rows=count):
+                formset = self.formset([(self.product, variation) for variation in self.variations[:count]])
+                # Вариации вместе с товарами - одним запросом на весь формсет
+                with self.assertNumQueries(1):
+                    self.assertTrue(formset.is_valid(), formset.errors)
+
+    def test_variation_of_another_product_is_rejected(self):
+        formset = self.formset([(self.product, self.variations[0]), (self.product, self.other_variation)])
+        self.assertFalse(formset.is_valid())
+        self.assertEqual(formset.errors[0], {})
+        self.assertIn('Выбранная вариация не принадлежит выбранному товару', formset.errors[1]['variation'])
+
+    def test_unknown_variation_is_rejected(self):
+        formset = self.formset([(self.product, self.variations[0])])
+        formset.data = {**formset.data, 'items-0-variation': '999999'}
+        self.assertFalse(formset.is_valid())
+        self.assertIn('variation', formset.errors[0])
+
+    def test_new_rows_are_saved_in_one_insert(self):
+        formset = self.formset([(self.product, variation) for variation in self.variations[:50]])
+        self.assertTrue(formset.is_valid(), formset.errors)
+        with self.assertNumQueries(1):
+            saved = formset.save()
+        self.assertEqual(len(saved), 50)
+        self.assertEqual(OrderItem.objects.filter(order=self.order).count(), 50)
+        self.assertEqual(
+            set(OrderItem.objects.filter(order=self.order).values_list('variation_id', flat=True)),
+            {variation.pk for variation in self.variations[:50]},
+        )
+
+
+
+class ProductAttributeTypeTests(TestCase):
+    def setUp(self):
+        self.product = create_product('Да Хун Пао')
+        TeaAttribute.objects.create(
+            product=self.product, tea_type=TeaAttribute.TEA_TYPES[0][0],
+            category=TeaCategory.objects.create(name='Улун'),
+        )
+
+    def test_type_change_is_reported_by_clean(self):
+        self.product.product_type = 'coffee'
+        with self.assertRaises(ValidationError) as context:
+            self.product.full_clean()
+        self.assertIn('product_type', context.exception.message_dict)
+
+    def test_type_change_is_rejected_by_database(self):
+        self.product.product_type = 'coffee'
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.product.save()
+
+
+class AttributeTypeTriggerTests(TestCase):
+    """
+    Триггеры из миграции 0014 должны пережить все последующие миграции: в SQLite пересоздание таблицы
+    (AlterField, AddConstraint...) молча удаляет их, и инвариант перестает проверяться.
+    """
+
+    ATTRIBUTE_TABLES = ['products_coffeeattribute', 'products_teaattribute', 'products_accessoryattribute']
+
+    def installed_triggers(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute("SELECT name, tbl_name FROM sqlite_master WHERE type = 'trigger'")
+            elif connection.vendor == 'postgresql':
+                cursor.execute('SELECT DISTINCT trigger_name, event_object_table FROM information_schema.triggers')
+            else:
+                self.skipTest(f'Триггеры для {connection.vendor} не создаются')
+            return set(cursor.fetchall())
+
+    def expected_triggers(self):
+        if connection.vendor == 'sqlite':
+            triggers = {(f'{table}_{suffix}', table) for table in self.ATTRIBUTE_TABLES
+                        for suffix in ('type_insert', 'type_update')}
+        else:
+            triggers = {(f'{table}_type', table) for table in self.ATTRIBUTE_TABLES}
+        return triggers | {('products_product_attribute_type', 'products_product')}
+
+    def test_triggers_exist_after_migrate(self):
+        self.assertLessEqual(self.expected_triggers(), self.installed_triggers())
+
+    def test_attribute_of_another_type_is_rejected(self):
+        tea = create_product('Пуэр')
+        category = TeaCategory.objects.create(name='Шу')
+        attributes = {
+            'coffee': lambda: CoffeeAttribute.objects.create(
+                product=tea, coffee_type='beans', roast='dark', arabica_percent=100, robusta_percent=0,
+                liberica_percent=0,
+            ),
+            'accessory': lambda: AccessoryAttribute.objects.create(
+                product=tea, accessory_type=AccessoryType.objects.create(name='Чайник'),
+            ),
+        }
+        for product_type, create in attributes.items():
+            with self.subTest(product_type=product_type), self.assertRaises(IntegrityError), transaction.atomic():
+                create()
+        TeaAttribute.objects.create(product=tea, tea_type=TeaAttribute.TEA_TYPES[0][0], category=category)
+
+
+class PriceHistoryTests(TestCase):
+    def setUp(self):
+        self.variation = Variation.objects.create(
+            product=create_product('Пуэр'), price=Decimal('100.00'), weight=100, pieces=1,
+            text_description_of_count='1 шт',
+        )
+        self.created = VariationPriceHistory.objects.get(variation=self.variation).valid_from
+        self.t1 = self.created + datetime.timedelta(hours=1)
+        self.t2 = self.created + datetime.timedelta(hours=2)
+
+    def history(self, variation=None):
+        return list(VariationPriceHistory.objects.filter(variation=variation or self.variation).order_by(
+            'valid_from'
+        ).values_list('price', 'valid_from', 'valid_to'))
+
+    def set_price(self, price, at, variation=None):
+        variations = Variation.objects.filter(pk=(variation or self.variation).pk)
+        variations.update(price=Decimal(price))
+        return record_price_changes(variations, at)
+
+    def test_save_without_price_change_keeps_history(self):
+        self.variation.stock = 5
+        self.variation.save()
+        self.variation.stock = 6
+        self.variation.save(update_fields=['stock'])
+        self.variation.price = Decimal('100')
+        self.variation.save()
+        self.assertEqual(self.history(), [(Decimal('100.00'), self.created, None)])
+
+        self.variation.price = Decimal('120.00')
+        self.variation.save()
+        history = self.history()
+        self.assertEqual(len(history), 2)
+        self.assertEqual(history[0][2], history[1][1])
+        self.assertEqual(history[1][0], Decimal('120.00'))
+        self.assertIsNone(history[1][2])
+
+    def test_unchanged_prices_open_nothing(self):
+        self.assertEqual(record_price_changes(Variation.objects.filter(pk=self.variation.pk), self.t1), 0)
+        self.assertEqual(len(self.history()), 1)
+
+    def test_interval_boundaries(self):
+        self.set_price('120.00', self.t1)
+        microsecond = datetime.timedelta(microseconds=1)
+        self.assertIsNone(price_at(self.variation.pk, self.created - microsecond))
+        self.assertEqual(price_at(self.variation.pk, self.created), Decimal('100.00'))
+        self.assertEqual(price_at(self.variation.pk, self.t1 - microsecond), Decimal('100.00'))
+        self.assertEqual(price_at(self.variation.pk, self.t1), Decimal('120.00'))
+        self.assertEqual(price_at(self.variation.pk, self.t2), Decimal('120.00'))
+
+        # [start, end): смена ровно в end в период не попадает, ровно в start - попадает
+        self.assertFalse(changed_between(self.created, self.t1).exists())
+        self.assertTrue(changed_between(self.created, self.t1 + microsecond).exists())
+        self.assertTrue(changed_between(self.t1).exists())
+        self.assertFalse(changed_between(self.t1 + microsecond).exists())
+
+    def test_change_at_same_moment_replaces_interval(self):
+        self.set_price('120.00', self.t1)
+        self.set_price('130.00', self.t1)
+        self.assertEqual(self.history(), [
+            (Decimal('100.00'), self.created, self.t1), (Decimal('130.00'), self.t1, None),
+        ])
+
+    def test_compaction_merges_adjacent_equal_prices(self):
+        other = Variation.objects.create(
+            product=self.variation.product, price=Decimal('50.00'), weight=50, pieces=1,
+            text_description_of_count='2 шт',
+        )
+        VariationPriceHistory.objects.all().delete()
+        t0, t3 = self.created, self.created + datetime.timedelta(hours=3)
+        intervals = [
+            (self.variation, '100.00', t0, self.t1),
+            (self.variation, '100.00', self.t1, self.t2),
+            (self.variation, '120.00', self.t2, t3),
+            (self.variation, '120.00', t3, None),
+            # Разрыв между интервалами - это не соседи, сливать нельзя
+            (other, '50.00', t0, self.t1),
+            (other, '50.00', self.t2, None),
+        ]
+        VariationPriceHistory.objects.bulk_create(
+            VariationPriceHistory(variation=variation, price=Decimal(price), valid_from=valid_from, valid_to=valid_to)
+            for variation, price, valid_from, valid_to in intervals
+        )
+
+        self.assertEqual(compact_price_history(chunk_size=1), 2)
+        self.assertEqual(self.history(), [
+            (Decimal('100.00'), t0, self.t2), (Decimal('120.00'), self.t2, None),
+        ])
+        self.assertEqual(len(self.history(other)), 2)
+        self.assertEqual(compact_price_history(), 0)
@@ -1,6 +1,6 @@
 from django.urls import path
 from .views import (
-    get_variations_for_product
+    get_variations_for_product, catalog, search_products, search_variations
 )
 
 
@@ -9,4 +9,7 @@ app_name = 'products'
 urlpatterns = [
     path('get-variations/<int:product_id>/',
          get_variations_for_product, name='get_variations_for_product'),
+    path('catalog/', catalog, name='catalog'),
+    path('search/', search_products, name='search_products'),
+    path('search-variations/', search_variations, name='search_variations'),
 ]
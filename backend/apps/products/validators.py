@@ -1,21 +1,36 @@
 from django.core.exceptions import ValidationError
 
 
+# Правила продублированы ограничениями и триггерами БД (Meta.constraints, миграция 0014),
+# которые действуют и для bulk_create/update(); здесь - понятные сообщения для форм
+# (validate_product_correct_attribute вызывается из Product.clean())
+
 def validate_percentage_sum_equals_100(arabica_variety, robusta_variety, liberica_variety):
-    if not all([arabica_variety, robusta_variety, liberica_variety]):
+    if None in (arabica_variety, robusta_variety, liberica_variety):
         return
     total_percentage = arabica_variety + robusta_variety + liberica_variety
     if total_percentage != 100:
         raise ValidationError("Sum of percentages must equal 100%")
 
 
+# Тип товара -> related_name атрибута этого типа
+ATTRIBUTE_RELATIONS = {
+    'coffee': 'coffee_attr',
+    'tea': 'tea_attr',
+    'accessory': 'accessory_attr',
+}
+
+
 def validate_product_correct_attribute(product_instance):
-    if product_instance.product_type not in ['coffee', 'tea', 'accessory']:
+    if product_instance.product_type not in ATTRIBUTE_RELATIONS:
         raise ValidationError('Product type is not correct')
-    if not product_instance.product_type == 'coffee' and hasattr(product_instance, 'coffee_attribute'):
-        raise ValidationError('Product with coffee type must have coffee attribute')
-    if not product_instance.product_type == 'tea' and hasattr(product_instance, 'tea_attribute'):
-        raise ValidationError('Product with tea type must not have tea attribute')
-    if not product_instance.product_type == 'accessory' and hasattr(product_instance, 'accessory_attribute'):
-        raise ValidationError('Product with accessory type must not have accessory attribute')
-
+    if product_instance.pk is None:
+        return
+    for product_type, relation in ATTRIBUTE_RELATIONS.items():
+        if product_type == product_instance.product_type:
+            continue
+        attribute_model = product_instance._meta.get_field(relation).related_model
+        if attribute_model.objects.filter(product_id=product_instance.pk).exists():
+            raise ValidationError(
+                f'Product with {product_instance.product_type} type must not have {product_type} attribute'
+            )
@@ -1,29 +1,186 @@
-from django.http import JsonResponse
+from urllib.parse import urlencode
+
+from django.core.paginator import Paginator
 from django.contrib.admin.views.decorators import staff_member_required
-from apps.products.models import Variation
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from apps.common.responses import FastJsonResponse
+from apps.common.tagged_cache import CATALOG_TAG, PRICES_TAG, tag, get_or_compute
+from apps.products.models import Product, Variation, Manufacturer, Country
+from apps.products.reference import get_names
+from apps.promotions.pricing import get_effective_prices
+
+
+CATALOG_PAGE_SIZE = 24
+CATALOG_MAX_PAGE_SIZE = 100
+CATALOG_CACHE_TIMEOUT = 5 * 60
+
+
+def cache_timeout(effective_prices, timeout=CATALOG_CACHE_TIMEOUT):
+    """Запись не должна пережить ближайшее начало или окончание акции у показанных цен."""
+    now = timezone.now()
+    for effective_price in effective_prices:
+        if effective_price.valid_until is not None:
+            timeout = min(timeout, max(int((effective_price.valid_until - now).total_seconds()), 1))
+    return timeout
+
+
+def cached_json(key, namespace, build):
+    """
+    Ответ из тегового кеша. build() возвращает (payload, tags, timeout) и при промахе
+    вызывается только в одном процессе, остальные ждут его результата.
+    """
+    payload, status = get_or_compute(key, namespace, build)
+    response = FastJsonResponse(payload)
+    response['X-Cache'] = status
+    return response
+
+
+def build_product_variations(product_id):
+    variations = Variation.objects.filter(
+        product_id=product_id
+    ).values(
+        'id', 'text_description_of_count', 'price'
+    )
+
+    variations = list(variations)
+    prices = get_effective_prices(variation['id'] for variation in variations)
+    for variation in variations:
+        variation['effective_price'] = prices[variation['id']].price
+
+    tags = [PRICES_TAG, tag('product', product_id), *(tag('variation', pk) for pk in prices)]
+    return {'variations': variations, 'success': True}, tags, cache_timeout(prices.values())
 
 
 @staff_member_required
 def get_variations_for_product(request, product_id):
     try:
-        variations = Variation.objects.filter(
-            product_id=product_id
-        ).select_related('product').values(
-            'id', 'text_description_of_count', 'price'
-        )
-
-        return JsonResponse({
-            'variations': list(variations),
-            'success': True
-        })
+        return cached_json(f'variations:{product_id}', 'variations', lambda: build_product_variations(product_id))
     except Exception as e:
-        return JsonResponse({
+        return FastJsonResponse({
             'variations': [],
             'success': False,
             'error': str(e)
         })
 
 
+SEARCH_PAGE_SIZE = 20
+
+
+def search_page(request, queryset, label):
+    """Страница результатов в формате select2: {'results': [{'id', 'text'}], 'pagination': {'more'}}."""
+    page = max(int_param(request, 'page', 1), 1)
+    start = (page - 1) * SEARCH_PAGE_SIZE
+    # Лишняя строка вместо COUNT(*) - признак следующей страницы
+    rows = list(queryset[start:start + SEARCH_PAGE_SIZE + 1])
+    return FastJsonResponse({
+        'results': [{'id': row['pk'], 'text': label(row)} for row in rows[:SEARCH_PAGE_SIZE]],
+        'pagination': {'more': len(rows) > SEARCH_PAGE_SIZE},
+    })
+
+
+@staff_member_required
+@require_GET
+def search_products(request):
+    products = Product.objects.order_by('name', 'pk').values('pk', 'name')
+    term = request.GET.get('term', '').strip()
+    if term:
+        products = products.filter(name__icontains=term)
+    return search_page(request, products, lambda row: row['name'])
+
+
+@staff_member_required
+@require_GET
+def search_variations(request):
+    product_id = int_param(request, 'product')
+    if product_id is None:
+        return FastJsonResponse({'results': [], 'pagination': {'more': False}})
+    variations = Variation.objects.filter(product_id=product_id).order_by('text_description_of_count', 'pk').values(
+        'pk', 'text_description_of_count', 'price'
+    )
+    term = request.GET.get('term', '').strip()
+    if term:
+        variations = variations.filter(text_description_of_count__icontains=term)
+    return search_page(
+        request, variations, lambda row: f"{row['text_description_of_count']} ({row['price']}₽)"
+    )
+
+
+def int_param(request, name, default=None):
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return default
+
+
+@require_GET
+def catalog(request):
+    params = {
+        'product_type': request.GET.get('product_type', '')[:20],
+        'manufacturer': int_param(request, 'manufacturer'),
+        'page': int_param(request, 'page', 1),
+        'page_size': max(min(int_param(request, 'page_size', CATALOG_PAGE_SIZE), CATALOG_MAX_PAGE_SIZE), 1),
+    }
+    key = f'catalog:{urlencode(params)}'
+    return cached_json(key, 'catalog', lambda: build_catalog_page(**params))
+
+
+def build_catalog_page(product_type, manufacturer, page, page_size):
+    # Названия производителей и стран - из кеша справочников, без JOIN
+    products = Product.objects.filter(available=True)
+    if product_type:
+        products = products.filter(product_type=product_type)
+    if manufacturer is not None:
+        products = products.filter(manufacturer_id=manufacturer)
+
+    page = Paginator(products, page_size).get_page(page)
+
+    variations = Variation.objects.filter(
+        product__in=[product.pk for product in page.object_list], available=True
+    ).values('id', 'product_id', 'text_description_of_count', 'price', 'stock')
+    variations = list(variations)
+    # Эффективные цены предрассчитаны - одно чтение на страницу вместо применения акций к каждой вариации
+    prices = get_effective_prices(variation['id'] for variation in variations)
+
+    variations_by_product = {}
+    for variation in variations:
+        effective_price = prices[variation['id']]
+        variation['effective_price'] = effective_price.price
+        variation['bundle'] = (
+            {'buy': effective_price.buy_quantity, 'pay': effective_price.pay_quantity}
+            if effective_price.buy_quantity else None
+        )
+        variations_by_product.setdefault(variation.pop('product_id'), []).append(variation)
+
+    manufacturers, countries = get_names(Manufacturer), get_names(Country)
+    payload = {
+        'products': [
+            {
+                'id': product.pk,
+                'name': product.name,
+                'product_type': product.product_type,
+                'manufacturer': manufacturers.get(product.manufacturer_id, ''),
+                'country': countries.get(product.country_id, ''),
+                'variations': variations_by_product.get(product.pk, []),
+            }
+            for product in page.object_list
+        ],
+        'page': page.number,
+        'num_pages': page.paginator.num_pages,
+        'count': page.paginator.count,
+    }
+    # Состав страницы зависит от всего списка товаров (CATALOG_TAG), содержимое - от показанных строк
+    tags = [CATALOG_TAG, PRICES_TAG]
+    for product in page.object_list:
+        tags += [
+            tag('product', product.pk),
+            tag('manufacturer', product.manufacturer_id),
+            tag('country', product.country_id),
+        ]
+    tags += [tag('variation', pk) for pk in prices]
+    return payload, tags, cache_timeout(prices.values())
+
 # class CoffeeAttributeAutocomplete(AutocompleteJsonView):
 #     model_admin = None  # using my final class; can get away with None as well
 #
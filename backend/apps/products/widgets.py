@@ -0,0 +1,62 @@
+from django import forms
+from django.urls import reverse
+
+
+class RemoteSelect(forms.Select):
+    """
+    Select2 с подгрузкой вариантов по мере ввода (admin/js/remote_select.js).
+
+    В HTML попадает только выбранный вариант, поэтому строка инлайна не содержит весь каталог.
+    Подпись выбранного значения берется из labels (форма заполняет их из уже загруженного instance),
+    и только при повторном показе формы с другим значением - одним запросом к queryset поля.
+    depends_on - имя соседнего поля той же строки, значение которого передается в поиск.
+    """
+
+    def __init__(self, url_name, depends_on=None, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+        self.depends_on = depends_on
+        self.labels = {}
+
+    def __deepcopy__(self, memo):
+        obj = super().__deepcopy__(memo)
+        obj.labels = {}
+        return obj
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs.setdefault('class', '')
+        attrs['class'] += ' admin-remote-select'
+        attrs['data-ajax--url'] = reverse(self.url_name)
+        attrs['data-ajax--cache'] = 'true'
+        attrs['data-ajax--delay'] = 250
+        attrs['data-theme'] = 'admin-autocomplete'
+        attrs['data-allow-clear'] = 'true'
+        attrs['data-placeholder'] = ''
+        if self.depends_on:
+            attrs['data-depends-on'] = self.depends_on
+        return attrs
+
+    def optgroups(self, name, value, attr=None):
+        selected = [str(v) for v in value if str(v) not in ('', 'None')]
+        options = [self.create_option(name, '', '', False, 0)]
+        missing = [pk for pk in selected if pk not in self.labels]
+        if missing and hasattr(self.choices, 'queryset'):
+            for obj in self.choices.queryset.filter(pk__in=[pk for pk in missing if pk.isdigit()]):
+                self.labels[str(obj.pk)] = self.choices.field.label_from_instance(obj)
+        for pk in selected:
+            if pk in self.labels:
+                options.append(self.create_option(name, pk, self.labels[pk], True, len(options)))
+        return [(None, options, 0)]
+
+    @property
+    def media(self):
+        return forms.Media(
+            js=(
+                'admin/js/vendor/jquery/jquery.js',
+                'admin/js/vendor/select2/select2.full.js',
+                'admin/js/jquery.init.js',
+                'admin/js/remote_select.js',
+            ),
+            css={'screen': ('admin/css/vendor/select2/select2.css', 'admin/css/autocomplete.css')},
+        )
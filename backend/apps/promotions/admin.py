@@ -1,3 +1,135 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-# Register your models here.
+from .models import Promotion, PriceChangeBatch, PriceChangeItem, PromoCode, PromoCodeRedemption
+from .price_changes import apply_price_change, rollback_price_change
+
+
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    list_display = ['name', 'kind', 'discount_info', 'targets_info', 'starts_at', 'ends_at', 'active']
+    list_filter = ['kind', 'active', 'product_type', 'starts_at']
+    search_fields = ['name']
+    list_editable = ['active']
+    autocomplete_fields = ['product', 'manufacturer', 'tea_category']
+    date_hierarchy = 'starts_at'
+    list_select_related = ['product', 'manufacturer', 'tea_category']
+    list_per_page = 25
+
+    fieldsets = (
+        ('Основная информация', {
+            'fields': ('name', 'kind', 'active', 'starts_at', 'ends_at')
+        }),
+        ('Скидка', {
+            'fields': ('value', 'buy_quantity', 'pay_quantity', 'min_cart_total')
+        }),
+        ('Условия', {
+            'fields': ('product', 'product_type', 'manufacturer', 'tea_category'),
+            'description': 'Пустые условия означают весь каталог'
+        }),
+    )
+
+    def discount_info(self, obj):
+        if obj.kind == Promotion.N_FOR_M:
+            return f'{obj.buy_quantity} по цене {obj.pay_quantity}'
+        if obj.kind in (Promotion.PERCENT, Promotion.CART_PERCENT):
+            return f'-{obj.value}%'
+        return f'-{obj.value} ₽'
+
+    def targets_info(self, obj):
+        targets = [
+            str(target) for target in
+            (obj.product, obj.get_product_type_display() if obj.product_type else None, obj.manufacturer,
+             obj.tea_category)
+            if target
+        ]
+        if obj.kind in Promotion.CART_KINDS:
+            return f'Корзина от {obj.min_cart_total} ₽'
+        return ', '.join(targets) or 'Весь каталог'
+
+    discount_info.short_description = 'Скидка'
+    targets_info.short_description = 'Условия'
+
+
+@admin.register(PriceChangeBatch)
+class PriceChangeBatchAdmin(admin.ModelAdmin):
+    list_display = ['name', 'mode', 'value', 'rounding', 'starts_at', 'ends_at', 'status', 'affected_count', 'created_by']
+    list_filter = ['status', 'mode', 'starts_at']
+    search_fields = ['name']
+    readonly_fields = ['status', 'affected_count', 'applied_at', 'rolled_back_at', 'created', 'created_by']
+    list_select_related = ['created_by']
+    date_hierarchy = 'starts_at'
+    actions = ['apply_now', 'rollback_now']
+    list_per_page = 25
+
+    fieldsets = (
+        ('Основная информация', {
+            'fields': ('name', 'mode', 'value', 'rounding', 'filters')
+        }),
+        ('Расписание', {
+            'fields': ('starts_at', 'ends_at')
+        }),
+        ('Статус', {
+            'fields': ('status', 'affected_count', 'applied_at', 'rolled_back_at', 'created', 'created_by'),
+            'classes': ('collapse',)
+        }),
+    )
+
+    def get_readonly_fields(self, request, obj=None):
+        # Примененный пакет уже записан в историю цен - менять его условия нельзя
+        if obj and obj.status != PriceChangeBatch.SCHEDULED:
+            return [field.name for field in self.model._meta.fields]
+        return self.readonly_fields
+
+    @admin.action(description='Применить сейчас')
+    def apply_now(self, request, queryset):
+        for batch in queryset.filter(status=PriceChangeBatch.SCHEDULED):
+            batch = apply_price_change(batch)
+            self.message_user(request, f'{batch}: изменено {batch.affected_count} цен', messages.SUCCESS)
+
+    @admin.action(description='Откатить сейчас')
+    def rollback_now(self, request, queryset):
+        for batch in queryset.filter(status=PriceChangeBatch.APPLIED):
+            rollback_price_change(batch)
+            self.message_user(request, f'{batch}: цены восстановлены', messages.SUCCESS)
+
+
+@admin.register(PriceChangeItem)
+class PriceChangeItemAdmin(admin.ModelAdmin):
+    list_display = ['batch', 'variation', 'old_price', 'new_price']
+    list_filter = ['batch__status']
+    search_fields = ['batch__name', 'variation__product__name']
+    list_select_related = ['batch', 'variation']
+    raw_id_fields = ['batch', 'variation']
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PromoCode)
+class PromoCodeAdmin(admin.ModelAdmin):
+    list_display = ['code', 'kind', 'value', 'usage_info', 'max_uses_per_user', 'starts_at', 'ends_at', 'active']
+    list_filter = ['kind', 'active']
+    search_fields = ['code']
+    list_editable = ['active']
+    readonly_fields = ['used_count', 'created', 'updated']
+    list_per_page = 25
+
+    def usage_info(self, obj):
+        return f'{obj.used_count} / {obj.max_uses or "∞"}'
+
+    usage_info.short_description = 'Использований'
+
+
+@admin.register(PromoCodeRedemption)
+class PromoCodeRedemptionAdmin(admin.ModelAdmin):
+    list_display = ['promo_code', 'user', 'order', 'created']
+    list_filter = ['created']
+    search_fields = ['promo_code__code', 'user__username']
+    date_hierarchy = 'created'
+    list_select_related = ['promo_code', 'user', 'order']
+    raw_id_fields = ['order', 'user']
+    list_per_page = 25
@@ -0,0 +1,36 @@
+from django import forms
+from django.utils import timezone
+
+from .models import PriceChangeBatch
+
+
+class RepriceForm(forms.ModelForm):
+    """Немедленная переоценка выбранных вариаций. Значение проверяется в PriceChangeBatch.clean()."""
+
+    class Meta:
+        model = PriceChangeBatch
+        fields = ['name', 'mode', 'value', 'rounding']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['name'].required = False
+        self.fields['rounding'].required = False
+
+    def clean_name(self):
+        return self.cleaned_data['name'] or f'Переоценка {timezone.localtime():%Y-%m-%d %H:%M}'
+
+    def clean_rounding(self):
+        return self.cleaned_data['rounding'] or PriceChangeBatch.NO_ROUNDING
+
+
+class RepriceApiForm(RepriceForm):
+    """То же для API: вариации задаются JSON-фильтром, пустой фильтр (весь каталог) не принимается."""
+
+    dry_run = forms.BooleanField(required=False)
+
+    class Meta(RepriceForm.Meta):
+        fields = [*RepriceForm.Meta.fields, 'filters']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['filters'].required = True
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.promotions.pricing import refresh_effective_prices, refresh_stale_effective_prices
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает таблицу эффективных цен вариаций с учетом действующих акций'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale', action='store_true',
+            help='Пересчитать только строки, у которых началась или закончилась акция (для запуска по cron)'
+        )
+
+    def handle(self, *args, **options):
+        started_at = time.monotonic()
+        if options['stale']:
+            count = refresh_stale_effective_prices()
+        else:
+            count = refresh_effective_prices()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано {count} эффективных цен за {time.monotonic() - started_at:.1f} с'
+        ))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from apps.promotions.price_changes import run_due_price_changes, next_price_change_at
+
+
+class Command(BaseCommand):
+    help = 'Применяет и откатывает запланированные изменения цен в момент их начала и окончания'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Работать постоянно, просыпаясь к ближайшему событию')
+        parser.add_argument(
+            '--interval', type=float, default=30,
+            help='Максимальная пауза между проверками в режиме --loop, секунд'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            started_at = time.monotonic()
+            applied, rolled_back = run_due_price_changes()
+            if applied or rolled_back:
+                self.stdout.write(
+                    f'{timezone.now():%Y-%m-%d %H:%M:%S}: применено {applied}, откачено {rolled_back} '
+                    f'за {time.monotonic() - started_at:.3f} с'
+                )
+            if not options['loop']:
+                break
+
+            # Спим до ближайшего начала/окончания, но не дольше interval - новые пакеты могут появиться в любой момент
+            sleep_for = options['interval']
+            next_at = next_price_change_at()
+            if next_at is not None:
+                sleep_for = min(sleep_for, max((next_at - timezone.now()).total_seconds(), 0))
+            time.sleep(sleep_for)
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:11
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('products', '0011_alter_product_country_alter_product_manufacturer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('kind', models.CharField(choices=[('percent', 'Скидка в процентах'), ('fixed', 'Фиксированная скидка'), ('n_for_m', 'N по цене M'), ('cart_percent', 'Скидка в процентах от суммы корзины'), ('cart_fixed', 'Фиксированная скидка от суммы корзины')], max_length=20)),
+                ('value', models.DecimalField(blank=True, decimal_places=2, help_text='Процент или сумма скидки', max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(0)])),
+                ('buy_quantity', models.PositiveIntegerField(blank=True, null=True, verbose_name='N (купить)')),
+                ('pay_quantity', models.PositiveIntegerField(blank=True, null=True, verbose_name='M (оплатить)')),
+                ('min_cart_total', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('product_type', models.CharField(blank=True, choices=[('tea', 'Чай'), ('coffee', 'Кофе'), ('accessory', 'Аксессуар')], max_length=20)),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('active', models.BooleanField(default=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('manufacturer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='products.manufacturer')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='products.product')),
+                ('tea_category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='products.teacategory')),
+            ],
+            options={
+                'ordering': ('-starts_at',),
+            },
+        ),
+        migrations.CreateModel(
+            name='EffectivePrice',
+            fields=[
+                ('variation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='effective_price', serialize=False, to='products.variation')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('buy_quantity', models.PositiveIntegerField(blank=True, null=True)),
+                ('pay_quantity', models.PositiveIntegerField(blank=True, null=True)),
+                ('valid_until', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('bundle_promotion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='promotions.promotion')),
+                ('promotion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='promotions.promotion')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='promotion',
+            index=models.Index(fields=['active', 'kind', 'ends_at'], name='promotions__active_d63ae6_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_alter_product_country_alter_product_manufacturer'),
+        ('promotions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceChangeBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('mode', models.CharField(choices=[('percent', 'Изменить на процент'), ('fixed', 'Изменить на сумму'), ('set', 'Установить цену')], max_length=20)),
+                ('value', models.DecimalField(decimal_places=2, help_text='Для процента и суммы - знаковое изменение, например -20 для скидки 20%', max_digits=10)),
+                ('filters', models.JSONField(blank=True, default=dict, help_text='Фильтр вариаций, например {"product__coffee_attr__roast": "dark"}')),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('scheduled', 'Запланировано'), ('applied', 'Применено'), ('rolled_back', 'Откачено'), ('skipped', 'Пропущено')], default='scheduled', max_length=20)),
+                ('affected_count', models.PositiveIntegerField(default=0)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+                ('rolled_back_at', models.DateTimeField(blank=True, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'price change batches',
+                'ordering': ('-starts_at',),
+                'indexes': [models.Index(fields=['status', 'starts_at'], name='promotions__status_e9bff5_idx'), models.Index(fields=['status', 'ends_at'], name='promotions__status_fa4bd8_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceChangeItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('new_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='promotions.pricechangebatch')),
+                ('variation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_change_items', to='products.variation')),
+            ],
+            options={
+                'unique_together': {('batch', 'variation')},
+            },
+        ),
+    ]
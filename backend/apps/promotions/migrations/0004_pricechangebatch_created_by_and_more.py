@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-19 18:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promotions', '0003_promocode_promocoderedemption_promocodeusage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricechangebatch',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='pricechangebatch',
+            name='rounding',
+            field=models.CharField(choices=[('none', 'До копеек'), ('ruble', 'До целых рублей'), ('end_9', 'Вверх до ...9 ₽'), ('end_99', 'Вверх до ...99 ₽')], default='none', max_length=20),
+        ),
+    ]
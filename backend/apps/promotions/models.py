@@ -1,3 +1,275 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import FieldError, ValidationError
+from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import Q
 
-# Create your models here.
+from apps.products.models import Product, Variation
+
+
+User = get_user_model()
+
+
+class Promotion(models.Model):
+    PERCENT = 'percent'
+    FIXED = 'fixed'
+    N_FOR_M = 'n_for_m'
+    CART_PERCENT = 'cart_percent'
+    CART_FIXED = 'cart_fixed'
+
+    KINDS = (
+        (PERCENT, 'Скидка в процентах'),
+        (FIXED, 'Фиксированная скидка'),
+        (N_FOR_M, 'N по цене M'),
+        (CART_PERCENT, 'Скидка в процентах от суммы корзины'),
+        (CART_FIXED, 'Фиксированная скидка от суммы корзины'),
+    )
+    ITEM_KINDS = (PERCENT, FIXED, N_FOR_M)
+    CART_KINDS = (CART_PERCENT, CART_FIXED)
+
+    name = models.CharField(max_length=200)
+    kind = models.CharField(max_length=20, choices=KINDS)
+    value = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True, validators=[MinValueValidator(0)],
+        help_text='Процент или сумма скидки'
+    )
+    buy_quantity = models.PositiveIntegerField('N (купить)', null=True, blank=True)
+    pay_quantity = models.PositiveIntegerField('M (оплатить)', null=True, blank=True)
+    min_cart_total = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    # Пустые условия означают "весь каталог", заполненные объединяются через И
+    product = models.ForeignKey(
+        'products.Product', on_delete=models.CASCADE, null=True, blank=True, related_name='promotions'
+    )
+    product_type = models.CharField(max_length=20, choices=Product.PRODUCT_TYPES, blank=True)
+    manufacturer = models.ForeignKey(
+        'products.Manufacturer', on_delete=models.CASCADE, null=True, blank=True, related_name='promotions'
+    )
+    tea_category = models.ForeignKey(
+        'products.TeaCategory', on_delete=models.CASCADE, null=True, blank=True, related_name='promotions'
+    )
+
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField(null=True, blank=True)
+    active = models.BooleanField(default=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ('-starts_at',)
+        indexes = [
+            models.Index(fields=['active', 'kind', 'ends_at']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValidationError({'ends_at': 'Окончание акции должно быть позже начала'})
+        if self.kind == self.N_FOR_M:
+            if not self.buy_quantity or not self.pay_quantity or self.pay_quantity >= self.buy_quantity:
+                raise ValidationError('Для акции N по цене M нужно указать N > M > 0')
+        elif self.value is None:
+            raise ValidationError({'value': 'Укажите размер скидки'})
+        if self.kind in (self.PERCENT, self.CART_PERCENT) and self.value > 100:
+            raise ValidationError({'value': 'Скидка не может превышать 100%'})
+        if self.kind in self.CART_KINDS:
+            if self.min_cart_total is None:
+                raise ValidationError({'min_cart_total': 'Укажите минимальную сумму корзины'})
+            if self.has_targets():
+                raise ValidationError('Скидка на корзину не может быть ограничена товарами')
+
+    def has_targets(self):
+        return bool(self.product_id or self.product_type or self.manufacturer_id or self.tea_category_id)
+
+    def variations_filter(self):
+        """Условие на Variation, под которое попадают товары акции."""
+        q = Q()
+        if self.product_id:
+            q &= Q(product_id=self.product_id)
+        if self.product_type:
+            q &= Q(product__product_type=self.product_type)
+        if self.manufacturer_id:
+            q &= Q(product__manufacturer_id=self.manufacturer_id)
+        if self.tea_category_id:
+            q &= Q(product__tea_attr__category_id=self.tea_category_id)
+        return q
+
+
+class EffectivePrice(models.Model):
+    variation = models.OneToOneField(
+        'products.Variation', on_delete=models.CASCADE, primary_key=True, related_name='effective_price'
+    )
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    promotion = models.ForeignKey(
+        Promotion, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    bundle_promotion = models.ForeignKey(
+        Promotion, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    buy_quantity = models.PositiveIntegerField(null=True, blank=True)
+    pay_quantity = models.PositiveIntegerField(null=True, blank=True)
+    # Момент, когда набор действующих акций для вариации изменится (начало или конец одной из них)
+    valid_until = models.DateTimeField(null=True, blank=True, db_index=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.variation_id}: {self.price}'
+
+
+class PriceChangeBatch(models.Model):
+    PERCENT = 'percent'
+    FIXED = 'fixed'
+    SET = 'set'
+
+    MODES = (
+        (PERCENT, 'Изменить на процент'),
+        (FIXED, 'Изменить на сумму'),
+        (SET, 'Установить цену'),
+    )
+
+    SCHEDULED = 'scheduled'
+    APPLIED = 'applied'
+    ROLLED_BACK = 'rolled_back'
+    SKIPPED = 'skipped'
+
+    STATUSES = (
+        (SCHEDULED, 'Запланировано'),
+        (APPLIED, 'Применено'),
+        (ROLLED_BACK, 'Откачено'),
+        (SKIPPED, 'Пропущено'),
+    )
+
+    NO_ROUNDING = 'none'
+    ROUND_RUBLE = 'ruble'
+    ROUND_9 = 'end_9'
+    ROUND_99 = 'end_99'
+
+    ROUNDINGS = (
+        (NO_ROUNDING, 'До копеек'),
+        (ROUND_RUBLE, 'До целых рублей'),
+        (ROUND_9, 'Вверх до ...9 ₽'),
+        (ROUND_99, 'Вверх до ...99 ₽'),
+    )
+
+    name = models.CharField(max_length=200)
+    mode = models.CharField(max_length=20, choices=MODES)
+    value = models.DecimalField(
+        max_digits=10, decimal_places=2,
+        help_text='Для процента и суммы - знаковое изменение, например -20 для скидки 20%'
+    )
+    rounding = models.CharField(max_length=20, choices=ROUNDINGS, default=NO_ROUNDING)
+    filters = models.JSONField(
+        default=dict, blank=True,
+        help_text='Фильтр вариаций, например {"product__coffee_attr__roast": "dark"}'
+    )
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUSES, default=SCHEDULED)
+    affected_count = models.PositiveIntegerField(default=0)
+    applied_at = models.DateTimeField(null=True, blank=True)
+    rolled_back_at = models.DateTimeField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        ordering = ('-starts_at',)
+        verbose_name_plural = 'price change batches'
+        indexes = [
+            models.Index(fields=['status', 'starts_at']),
+            models.Index(fields=['status', 'ends_at']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValidationError({'ends_at': 'Окончание должно быть позже начала'})
+        if not isinstance(self.filters, dict):
+            raise ValidationError({'filters': 'Фильтр должен быть JSON-объектом'})
+        try:
+            str(Variation.objects.filter(**self.filters).query)
+        except (FieldError, ValueError, TypeError) as e:
+            raise ValidationError({'filters': f'Некорректный фильтр: {e}'})
+        if self.mode == self.SET and self.value is not None and self.value < 0:
+            raise ValidationError({'value': 'Цена не может быть отрицательной'})
+        if self.mode == self.PERCENT and self.value is not None and self.value <= -100:
+            raise ValidationError({'value': 'Скидка должна быть меньше 100%'})
+
+    def variations(self):
+        return Variation.objects.filter(**self.filters)
+
+
+class PriceChangeItem(models.Model):
+    batch = models.ForeignKey(PriceChangeBatch, on_delete=models.CASCADE, related_name='items')
+    variation = models.ForeignKey('products.Variation', on_delete=models.CASCADE, related_name='price_change_items')
+    old_price = models.DecimalField(max_digits=10, decimal_places=2)
+    new_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        unique_together = ('batch', 'variation')
+
+
+class PromoCode(models.Model):
+    PERCENT = 'percent'
+    FIXED = 'fixed'
+
+    KINDS = (
+        (PERCENT, 'Скидка в процентах'),
+        (FIXED, 'Фиксированная скидка'),
+    )
+
+    code = models.CharField(max_length=50, unique=True)
+    kind = models.CharField(max_length=20, choices=KINDS)
+    value = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
+    min_cart_total = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_uses = models.PositiveIntegerField(null=True, blank=True, help_text='Пусто - без ограничений')
+    max_uses_per_user = models.PositiveIntegerField(null=True, blank=True, help_text='Пусто - без ограничений')
+    # Счетчик меняется только условным UPDATE, см. promo_codes.redeem_promo_code
+    used_count = models.PositiveIntegerField(default=0, editable=False)
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+    active = models.BooleanField(default=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ('-created',)
+
+    def __str__(self):
+        return self.code
+
+    def save(self, *args, **kwargs):
+        self.code = self.code.strip().upper()
+        super().save(*args, **kwargs)
+
+    def clean(self):
+        if self.kind == self.PERCENT and self.value is not None and self.value > 100:
+            raise ValidationError({'value': 'Скидка не может превышать 100%'})
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValidationError({'ends_at': 'Окончание должно быть позже начала'})
+
+
+class PromoCodeUsage(models.Model):
+    promo_code = models.ForeignKey(PromoCode, on_delete=models.CASCADE, related_name='usages')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='promo_code_usages')
+    used_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('promo_code', 'user')
+
+
+class PromoCodeRedemption(models.Model):
+    promo_code = models.ForeignKey(PromoCode, on_delete=models.PROTECT, related_name='redemptions')
+    user = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    order = models.ForeignKey(
+        'orders.Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='promo_code_redemptions'
+    )
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('-created',)
@@ -0,0 +1,203 @@
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import (
+    Avg, Case, Count, DecimalField, ExpressionWrapper, F, FloatField, Max, Min, OuterRef, Q, Subquery, Sum, Value,
+    When,
+)
+from django.db.models.functions import Ceil, Floor, Greatest, Round
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+
+from apps.common.tagged_cache import PRICES_TAG, invalidate_tags
+from apps.products.models import Variation
+from apps.products.price_history import record_price_changes
+from .models import EffectivePrice, PriceChangeBatch, PriceChangeItem
+
+
+PRICE_FIELD = DecimalField(max_digits=10, decimal_places=2)
+
+
+def round_to_ending(expression, step, function):
+    # Делитель - float: в SQLite целая цена, деленная на целое, делится нацело
+    quotient = ExpressionWrapper((expression + 1) / Value(float(step)), output_field=FloatField())
+    return function(quotient) * step - 1
+
+
+def rounded_price(expression, rounding, direction=0):
+    """
+    Округление идет в сторону изменения, чтобы не развернуть его: при повышении вверх (1343 -> 1349),
+    при снижении вниз (1343 -> 1339), без направления (SET) - к ближайшей. Психологические цены
+    оканчиваются на 9/99; если такой цены нет (50 -> 45 при ROUND_99 дало бы -1), цена остается без округления.
+    """
+    function = Ceil if direction > 0 else Floor if direction < 0 else Round
+    unrounded = Round(expression, 2)
+    if rounding == PriceChangeBatch.ROUND_RUBLE:
+        rounded = function(expression)
+    elif rounding == PriceChangeBatch.ROUND_9:
+        rounded = round_to_ending(expression, 10, function)
+    elif rounding == PriceChangeBatch.ROUND_99:
+        rounded = round_to_ending(expression, 100, function)
+    else:
+        return unrounded
+    return Case(When(GreaterThan(rounded, 0), then=rounded), default=unrounded, output_field=PRICE_FIELD)
+
+
+def new_price_expression(mode, value, rounding=PriceChangeBatch.NO_ROUNDING):
+    value = Decimal(value)
+    if mode == PriceChangeBatch.PERCENT:
+        # Множитель считается заранее - по той же причине, что и в round_to_ending
+        factor = Value((100 + value) / 100, output_field=DecimalField(max_digits=12, decimal_places=6))
+        expression = F('price') * factor
+    elif mode == PriceChangeBatch.FIXED:
+        expression = F('price') + Value(value, output_field=PRICE_FIELD)
+    else:
+        expression = Value(value, output_field=PRICE_FIELD)
+    direction = 0 if mode == PriceChangeBatch.SET else value
+    return Greatest(rounded_price(expression, rounding, direction), Value(Decimal(0)), output_field=PRICE_FIELD)
+
+
+def snapshot_prices(batch, variations):
+    """
+    INSERT ... SELECT: старые цены копируются в PriceChangeItem одним запросом,
+    не поднимая строки в Python.
+    """
+    variations_sql, params = variations.order_by().values('pk').query.sql_with_params()
+    quote = connection.ops.quote_name
+    items_table = quote(PriceChangeItem._meta.db_table)
+    variations_table = quote(Variation._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {items_table} ({quote("batch_id")}, {quote("variation_id")}, {quote("old_price")}) '
+            f'SELECT %s, v.{quote("id")}, v.{quote("price")} FROM {variations_table} v '
+            f'WHERE v.{quote("id")} IN ({variations_sql})',
+            [batch.pk, *params],
+        )
+        return cursor.rowcount
+
+
+def expire_effective_prices(variations):
+    # Эффективные цены считаются от базовой - помечаем их устаревшими в той же транзакции,
+    # читатели пересчитают нужные строки на лету, остальные - refresh_effective_prices --stale
+    invalidate_tags(PRICES_TAG)
+    return EffectivePrice.objects.filter(variation__in=variations).update(valid_until=timezone.now())
+
+
+def apply_price_change(batch, now=None, variations=None):
+    """variations - вместо batch.filters, для переоценки произвольного queryset (reprice_now)."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        batch = PriceChangeBatch.objects.select_for_update().get(pk=batch.pk)
+        if batch.status != PriceChangeBatch.SCHEDULED:
+            return batch
+
+        affected = snapshot_prices(batch, batch.variations() if variations is None else variations)
+        changed = Variation.objects.filter(pk__in=batch.items.values('variation_id'))
+        changed.update(price=new_price_expression(batch.mode, batch.value, batch.rounding))
+        batch.items.update(
+            new_price=Subquery(Variation.objects.filter(pk=OuterRef('variation_id')).values('price')[:1])
+        )
+        record_price_changes(changed, now)
+        expire_effective_prices(changed)
+
+        batch.status = PriceChangeBatch.APPLIED
+        batch.applied_at = now
+        batch.affected_count = affected
+        batch.save(update_fields=['status', 'applied_at', 'affected_count'])
+    return batch
+
+
+def reprice_now(batch, variations, user=None, now=None):
+    """
+    Немедленная переоценка queryset вариаций - например, отфильтрованного changelist'а админки.
+    Несохраненный batch задает режим, значение и округление и становится записью аудита:
+    старые и новые цены попадают в PriceChangeItem так же, как у запланированных пакетов,
+    и переоценку можно откатить тем же действием.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        batch.starts_at = now
+        batch.status = PriceChangeBatch.SCHEDULED
+        batch.created_by = user
+        batch.save()
+        return apply_price_change(batch, now, variations)
+
+
+def preview_price_change(variations, mode, value, rounding=PriceChangeBatch.NO_ROUNDING):
+    """Пробный прогон: итоги переоценки одним агрегирующим запросом, без выборки строк."""
+    variations = variations.order_by().annotate(new_price=new_price_expression(mode, value, rounding))
+    return variations.aggregate(
+        count=Count('pk'),
+        increased=Count('pk', filter=Q(new_price__gt=F('price'))),
+        decreased=Count('pk', filter=Q(new_price__lt=F('price'))),
+        old_min=Min('price'),
+        old_max=Max('price'),
+        old_avg=Avg('price'),
+        new_min=Min('new_price'),
+        new_max=Max('new_price'),
+        new_avg=Avg('new_price'),
+        # Стоимость остатков до и после
+        old_stock_value=Sum(F('price') * F('stock'), output_field=PRICE_FIELD),
+        new_stock_value=Sum(F('new_price') * F('stock'), output_field=PRICE_FIELD),
+    )
+
+
+def rollback_price_change(batch, now=None):
+    now = now or timezone.now()
+    with transaction.atomic():
+        batch = PriceChangeBatch.objects.select_for_update().get(pk=batch.pk)
+        if batch.status != PriceChangeBatch.APPLIED:
+            return batch
+
+        # Цены, которые успели поменять вручную после применения, не трогаем
+        restored = Variation.objects.filter(
+            price_change_items__batch=batch,
+            price_change_items__new_price=F('price'),
+        )
+        restored.update(
+            price=Subquery(batch.items.filter(variation=OuterRef('pk')).values('old_price')[:1])
+        )
+        affected = Variation.objects.filter(pk__in=batch.items.values('variation_id'))
+        record_price_changes(affected, now)
+        expire_effective_prices(affected)
+
+        batch.status = PriceChangeBatch.ROLLED_BACK
+        batch.rolled_back_at = now
+        batch.save(update_fields=['status', 'rolled_back_at'])
+    return batch
+
+
+def run_due_price_changes(now=None):
+    """Применяет и откатывает пакеты, чье время наступило. Возвращает (применено, откачено)."""
+    now = now or timezone.now()
+
+    PriceChangeBatch.objects.filter(
+        status=PriceChangeBatch.SCHEDULED, ends_at__lte=now
+    ).update(status=PriceChangeBatch.SKIPPED)
+
+    applied = 0
+    for batch in PriceChangeBatch.objects.filter(status=PriceChangeBatch.SCHEDULED, starts_at__lte=now):
+        apply_price_change(batch, now)
+        applied += 1
+
+    rolled_back = 0
+    for batch in PriceChangeBatch.objects.filter(status=PriceChangeBatch.APPLIED, ends_at__lte=now):
+        rollback_price_change(batch, now)
+        rolled_back += 1
+
+    return applied, rolled_back
+
+
+def next_price_change_at():
+    starts = PriceChangeBatch.objects.filter(status=PriceChangeBatch.SCHEDULED).order_by('starts_at')
+    ends = PriceChangeBatch.objects.filter(
+        status=PriceChangeBatch.APPLIED, ends_at__isnull=False
+    ).order_by('ends_at')
+    moments = [
+        moment for moment in (
+            starts.values_list('starts_at', flat=True).first(),
+            ends.values_list('ends_at', flat=True).first(),
+        )
+        if moment is not None
+    ]
+    return min(moments) if moments else None
@@ -0,0 +1,227 @@
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.common.routers import use_primary
+from apps.products.models import Variation
+from .models import Promotion, EffectivePrice
+from .promo_codes import validate_promo_code, promo_code_discount
+
+
+CENT = Decimal('0.01')
+CHUNK_SIZE = 2000
+
+Rule = namedtuple('Rule', [
+    'id', 'kind', 'value', 'buy_quantity', 'pay_quantity',
+    'product_id', 'product_type', 'manufacturer_id', 'tea_category_id', 'starts_at', 'ends_at',
+])
+
+VARIATION_FIELDS = (
+    'id', 'price', 'product_id', 'product__product_type', 'product__manufacturer_id', 'product__tea_attr__category_id'
+)
+
+
+def quantize(amount):
+    return max(amount, Decimal(0)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def load_item_rules(now=None):
+    """Все еще не закончившиеся товарные акции, в т.ч. будущие - они нужны для расчета valid_until."""
+    now = now or timezone.now()
+    promotions = Promotion.objects.filter(
+        Q(ends_at__isnull=True) | Q(ends_at__gt=now),
+        active=True,
+        kind__in=Promotion.ITEM_KINDS,
+    ).values_list(*Rule._fields)
+    return [Rule(*row) for row in promotions]
+
+
+def rule_matches(rule, product_id, product_type, manufacturer_id, tea_category_id):
+    return (
+        (rule.product_id is None or rule.product_id == product_id)
+        and (not rule.product_type or rule.product_type == product_type)
+        and (rule.manufacturer_id is None or rule.manufacturer_id == manufacturer_id)
+        and (rule.tea_category_id is None or rule.tea_category_id == tea_category_id)
+    )
+
+
+def apply_rule(rule, price):
+    if rule.kind == Promotion.PERCENT:
+        return quantize(price * (100 - rule.value) / 100)
+    return quantize(price - rule.value)
+
+
+def compile_variation(row, rules, now):
+    variation_id, base_price, *targets = row
+    price, promotion_id = base_price, None
+    bundle = None
+    valid_until = None
+
+    for rule in rules:
+        if not rule_matches(rule, *targets):
+            continue
+        if rule.starts_at > now:
+            boundary = rule.starts_at
+        else:
+            boundary = rule.ends_at
+            if rule.kind == Promotion.N_FOR_M:
+                # Из нескольких N по цене M берем самую выгодную долю оплаты
+                if bundle is None or rule.pay_quantity * bundle.buy_quantity < bundle.pay_quantity * rule.buy_quantity:
+                    bundle = rule
+            else:
+                discounted = apply_rule(rule, base_price)
+                if discounted < price:
+                    price, promotion_id = discounted, rule.id
+        if boundary is not None and (valid_until is None or boundary < valid_until):
+            valid_until = boundary
+
+    return EffectivePrice(
+        variation_id=variation_id,
+        price=price,
+        promotion_id=promotion_id,
+        bundle_promotion_id=bundle.id if bundle else None,
+        buy_quantity=bundle.buy_quantity if bundle else None,
+        pay_quantity=bundle.pay_quantity if bundle else None,
+        valid_until=valid_until,
+    )
+
+
+def _save(effective_prices):
+    EffectivePrice.objects.bulk_create(
+        effective_prices,
+        update_conflicts=True,
+        unique_fields=['variation'],
+        update_fields=['price', 'promotion', 'bundle_promotion', 'buy_quantity', 'pay_quantity', 'valid_until',
+                       'updated'],
+    )
+
+
+def refresh_effective_prices(variations=None, now=None):
+    """
+    Пересчитывает таблицу эффективных цен для переданного queryset вариаций (по умолчанию - для всех).
+    Правила загружаются один раз, строки читаются и записываются чанками.
+    """
+    now = now or timezone.now()
+    rules = load_item_rules(now)
+    if variations is None:
+        variations = Variation.objects.all()
+
+    rows = variations.order_by().values_list(*VARIATION_FIELDS)
+    batch = []
+    count = 0
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        batch.append(compile_variation(row, rules, now))
+        if len(batch) >= CHUNK_SIZE:
+            _save(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        _save(batch)
+        count += len(batch)
+    return count
+
+
+def refresh_stale_effective_prices(now=None):
+    now = now or timezone.now()
+    stale = Variation.objects.filter(effective_price__valid_until__lte=now)
+    missing = Variation.objects.filter(effective_price__isnull=True)
+    return refresh_effective_prices(stale, now) + refresh_effective_prices(missing, now)
+
+
+def get_effective_prices(variation_ids):
+    """
+    Эффективные цены для набора вариаций одним запросом: {variation_id: EffectivePrice}.
+    Устаревшие и отсутствующие строки пересчитываются на лету.
+    """
+    variation_ids = set(variation_ids)
+    now = timezone.now()
+    prices = {
+        effective_price.variation_id: effective_price
+        for effective_price in EffectivePrice.objects.filter(variation_id__in=variation_ids)
+    }
+    stale = [
+        variation_id for variation_id in variation_ids
+        if variation_id not in prices
+        or (prices[variation_id].valid_until is not None and prices[variation_id].valid_until <= now)
+    ]
+    if stale:
+        refresh_effective_prices(Variation.objects.filter(pk__in=stale), now)
+        # Только что записанные строки могли еще не дойти до реплик
+        with use_primary():
+            prices.update({
+                effective_price.variation_id: effective_price
+                for effective_price in EffectivePrice.objects.filter(variation_id__in=stale)
+            })
+    return prices
+
+
+def line_total(effective_price, quantity):
+    if effective_price.buy_quantity:
+        bundles, rest = divmod(quantity, effective_price.buy_quantity)
+        quantity = bundles * effective_price.pay_quantity + rest
+    return effective_price.price * quantity
+
+
+def best_cart_discount(subtotal, now=None):
+    now = now or timezone.now()
+    promotions = Promotion.objects.filter(
+        Q(ends_at__isnull=True) | Q(ends_at__gt=now),
+        active=True,
+        kind__in=Promotion.CART_KINDS,
+        starts_at__lte=now,
+        min_cart_total__lte=subtotal,
+    )
+    best, best_discount = None, Decimal(0)
+    for promotion in promotions:
+        if promotion.kind == Promotion.CART_PERCENT:
+            discount = min(quantize(subtotal * promotion.value / 100), subtotal)
+        else:
+            discount = min(promotion.value, subtotal)
+        if discount > best_discount:
+            best, best_discount = promotion, discount
+    return best, best_discount
+
+
+def price_cart(lines, promo_code=None):
+    """
+    Расчет корзины по предрассчитанным эффективным ценам.
+    lines - пары (variation_id, quantity).
+    """
+    lines = list(lines)
+    prices = get_effective_prices(variation_id for variation_id, _ in lines)
+
+    result_lines = []
+    subtotal = Decimal(0)
+    for variation_id, quantity in lines:
+        effective_price = prices[variation_id]
+        total = line_total(effective_price, quantity)
+        subtotal += total
+        result_lines.append({
+            'variation_id': variation_id,
+            'quantity': quantity,
+            'unit_price': effective_price.price,
+            'total': total,
+        })
+
+    cart_promotion, discount = best_cart_discount(subtotal) if subtotal else (None, Decimal(0))
+
+    promo_code_info, promo_code_error = None, None
+    if promo_code:
+        try:
+            promo_code_info = validate_promo_code(promo_code, cart_total=subtotal)
+            discount += promo_code_discount(promo_code_info, subtotal - discount)
+        except ValidationError as e:
+            promo_code_error = e.messages[0]
+
+    return {
+        'lines': result_lines,
+        'subtotal': subtotal,
+        'discount': discount,
+        'cart_promotion': cart_promotion,
+        'promo_code': promo_code_info,
+        'promo_code_error': promo_code_error,
+        'total': subtotal - discount,
+    }
@@ -0,0 +1,102 @@
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.common.metrics import record_cache_access
+from .models import PromoCode, PromoCodeUsage, PromoCodeRedemption
+
+
+PROMO_CODES_CACHE_KEY = 'promotions:promo_codes'
+PROMO_CODES_CACHE_TIMEOUT = 60 * 60
+
+PromoCodeInfo = namedtuple('PromoCodeInfo', [
+    'id', 'code', 'kind', 'value', 'min_cart_total', 'max_uses_per_user', 'starts_at', 'ends_at',
+])
+
+
+def normalize_code(code):
+    return (code or '').strip().upper()
+
+
+def build_promo_code_index():
+    promo_codes = PromoCode.objects.filter(
+        Q(max_uses__isnull=True) | Q(used_count__lt=F('max_uses')),
+        active=True,
+    ).values_list(*PromoCodeInfo._fields)
+    return {row[1]: PromoCodeInfo(*row) for row in promo_codes}
+
+
+def get_promo_code_index():
+    """Индекс действующих кодов code -> PromoCodeInfo. Строится одним запросом и живет в кеше до изменения кодов."""
+    index = cache.get(PROMO_CODES_CACHE_KEY)
+    record_cache_access('promotions:promo_codes', index is not None)
+    if index is None:
+        index = build_promo_code_index()
+        cache.set(PROMO_CODES_CACHE_KEY, index, PROMO_CODES_CACHE_TIMEOUT)
+    return index
+
+
+def invalidate_promo_code_index():
+    # После коммита, чтобы параллельный запрос не успел закешировать старое состояние
+    transaction.on_commit(lambda: cache.delete(PROMO_CODES_CACHE_KEY))
+
+
+def validate_promo_code(code, cart_total=None, now=None):
+    """
+    Проверка кода по кешированному индексу, без запросов к БД - вызывается на каждом просмотре корзины.
+    Лимиты использования окончательно проверяются в redeem_promo_code.
+    """
+    now = now or timezone.now()
+    info = get_promo_code_index().get(normalize_code(code))
+    if info is None:
+        raise ValidationError('Промокод не найден или больше не действует')
+    if info.starts_at and info.starts_at > now:
+        raise ValidationError('Промокод еще не действует')
+    if info.ends_at and info.ends_at <= now:
+        raise ValidationError('Срок действия промокода истек')
+    if info.min_cart_total is not None and cart_total is not None and cart_total < info.min_cart_total:
+        raise ValidationError(f'Промокод действует для заказов от {info.min_cart_total} ₽')
+    return info
+
+
+def promo_code_discount(info, subtotal):
+    if info.kind == PromoCode.PERCENT:
+        return (subtotal * info.value / 100).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    return min(info.value, subtotal)
+
+
+def redeem_promo_code(code, user=None, order=None, cart_total=None):
+    """
+    Списывает одно использование кода. Счетчики увеличиваются условными UPDATE,
+    поэтому лимиты не превышаются при параллельных оформлениях заказа.
+    """
+    info = validate_promo_code(code, cart_total=cart_total)
+
+    with transaction.atomic():
+        updated = PromoCode.objects.filter(
+            Q(max_uses__isnull=True) | Q(used_count__lt=F('max_uses')),
+            pk=info.id,
+            active=True,
+        ).update(used_count=F('used_count') + 1)
+        if not updated:
+            cache.delete(PROMO_CODES_CACHE_KEY)
+            raise ValidationError('Лимит использований промокода исчерпан')
+
+        if user is not None:
+            usage, _ = PromoCodeUsage.objects.get_or_create(promo_code_id=info.id, user=user)
+            usages = PromoCodeUsage.objects.filter(pk=usage.pk)
+            if info.max_uses_per_user is not None:
+                usages = usages.filter(used_count__lt=info.max_uses_per_user)
+            if not usages.update(used_count=F('used_count') + 1):
+                # Исключение откатит транзакцию, а с ней и общий счетчик
+                raise ValidationError('Вы уже использовали этот промокод')
+
+        if PromoCode.objects.filter(pk=info.id, used_count__gte=F('max_uses')).exists():
+            invalidate_promo_code_index()
+
+        return PromoCodeRedemption.objects.create(promo_code_id=info.id, user=user, order=order)
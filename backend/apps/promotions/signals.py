@@ -0,0 +1,56 @@
+from django.db.models import signals
+from django.dispatch import receiver
+
+from apps.common.tagged_cache import PRICES_TAG, invalidate_tags
+from apps.products.models import Product, Variation, TeaAttribute
+from .models import Promotion, PromoCode
+from .pricing import refresh_effective_prices
+from .promo_codes import invalidate_promo_code_index
+
+
+@receiver(signals.pre_save, sender=Promotion)
+def promotion_pre_save(sender, instance, **kwargs):
+    # Запоминаем прежние условия, чтобы пересчитать и вариации, вышедшие из акции
+    instance._previous_filter = None
+    if instance.pk:
+        previous = Promotion.objects.filter(pk=instance.pk).first()
+        if previous and previous.kind in Promotion.ITEM_KINDS:
+            instance._previous_filter = previous.variations_filter()
+
+
+@receiver(signals.post_save, sender=Promotion)
+def promotion_post_save(sender, instance, **kwargs):
+    affected = getattr(instance, '_previous_filter', None)
+    if instance.kind in Promotion.ITEM_KINDS:
+        affected = instance.variations_filter() if affected is None else affected | instance.variations_filter()
+    if affected is not None:
+        refresh_effective_prices(Variation.objects.filter(affected))
+        invalidate_tags(PRICES_TAG)
+
+
+@receiver(signals.post_delete, sender=Promotion)
+def promotion_post_delete(sender, instance, **kwargs):
+    if instance.kind in Promotion.ITEM_KINDS:
+        refresh_effective_prices(Variation.objects.filter(instance.variations_filter()))
+        invalidate_tags(PRICES_TAG)
+
+
+@receiver(signals.post_save, sender=Variation)
+def variation_post_save(sender, instance, **kwargs):
+    refresh_effective_prices(Variation.objects.filter(pk=instance.pk))
+
+
+@receiver(signals.post_save, sender=Product)
+def product_post_save(sender, instance, created, **kwargs):
+    if not created:
+        refresh_effective_prices(instance.variations.all())
+
+
+@receiver([signals.post_save, signals.post_delete], sender=TeaAttribute)
+def tea_attribute_changed(sender, instance, **kwargs):
+    refresh_effective_prices(Variation.objects.filter(product_id=instance.product_id))
+
+
+@receiver([signals.post_save, signals.post_delete], sender=PromoCode)
+def promo_code_changed(sender, instance, **kwargs):
+    invalidate_promo_code_index()
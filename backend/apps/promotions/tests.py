@@ -1,3 +1,292 @@
-from django.test import TestCase
+import datetime
+import json
+import threading
+import time
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection
+from django.db.models import Value
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.products.models import Variation, VariationPriceHistory
+from apps.products.price_history import price_at
+from apps.products.tests import create_product
+from apps.promotions.forms import RepriceForm
+from apps.promotions.models import (
+    EffectivePrice, PriceChangeBatch, Promotion, PromoCode, PromoCodeUsage, PromoCodeRedemption
+)
+from apps.promotions.price_changes import (
+    PRICE_FIELD, preview_price_change, reprice_now, rollback_price_change, rounded_price
+)
+from apps.promotions.pricing import (
+    best_cart_discount, price_cart, refresh_effective_prices, refresh_stale_effective_prices
+)
+from apps.promotions.promo_codes import redeem_promo_code
+
+User = get_user_model()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'promo-code-tests'}})
+class PromoCodeConcurrencyTests(TransactionTestCase):
+    """
+    Много потоков одновременно погашают один код; лимиты не должны превышаться, счетчики - расходиться.
+
+    На SQLite тестовая база в памяти в режиме shared cache: конфликт записи сразу дает OperationalError
+    (database table is locked) без ожидания, и попытка повторяется. Записи там сериализуются блокировкой
+    всей базы, поэтому гонку условных UPDATE по-настоящему проверяет только прогон на PostgreSQL.
+    """
+
+    THREADS = 20
+    ATTEMPTS = 3
+    USERS = 5
+    MAX_USES = 8
+    MAX_USES_PER_USER = 2
+    LOCK_RETRIES = 200
+
+    def redeem(self, code, user):
+        # Блокировку базы клиент переживает повтором - откаченная попытка не должна оставить следов
+        for _ in range(self.LOCK_RETRIES):
+            try:
+                redeem_promo_code(code, user=user)
+                return 'redeemed'
+            except ValidationError:
+                return 'rejected'
+            except OperationalError:
+                time.sleep(0.005)
+        return 'errors'
+
+    def test_limits_are_never_exceeded(self):
+        promo_code = PromoCode.objects.create(
+            code='STRESS', kind=PromoCode.PERCENT, value=10,
+            max_uses=self.MAX_USES, max_uses_per_user=self.MAX_USES_PER_USER,
+        )
+        users = User.objects.bulk_create([User(username=f'stress_{i}') for i in range(self.USERS)])
+        results = {'redeemed': 0, 'rejected': 0, 'errors': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(self.THREADS)
+
+        def worker(number):
+            user = users[number % len(users)]
+            barrier.wait()
+            try:
+                for _ in range(self.ATTEMPTS):
+                    outcome = self.redeem(promo_code.code, user)
+                    with lock:
+                        results[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        promo_code.refresh_from_db()
+        redemptions = PromoCodeRedemption.objects.filter(promo_code=promo_code).count()
+        per_user = PromoCodeUsage.objects.filter(promo_code=promo_code).values_list('used_count', flat=True)
+
+        self.assertEqual(sum(results.values()), self.THREADS * self.ATTEMPTS)
+        self.assertEqual(promo_code.used_count, redemptions)
+        self.assertEqual(redemptions, results['redeemed'])
+        self.assertLessEqual(promo_code.used_count, self.MAX_USES)
+        self.assertLessEqual(max(per_user, default=0), self.MAX_USES_PER_USER)
+        self.assertEqual(results['errors'], 0)
+        self.assertEqual(promo_code.used_count, min(self.MAX_USES, self.USERS * self.MAX_USES_PER_USER))
+
+
+class PriceRoundingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        product = create_product('Пуэр')
+        Variation.objects.bulk_create(
+            Variation(product=product, price=Decimal(price), weight=100, pieces=1, text_description_of_count=f'{i} шт')
+            for i, price in enumerate(['1343', '1349', '1355', '1200'])
+        )
+        cls.variations = Variation.objects.filter(product=product)
+
+    def rounded(self, price, rounding, direction):
+        expression = rounded_price(Value(Decimal(price), output_field=PRICE_FIELD), rounding, direction)
+        return Decimal(self.variations.annotate(rounded=expression).values_list('rounded', flat=True)[0])
+
+    def test_endings_follow_direction(self):
+        cases = [
+            ('1343', PriceChangeBatch.ROUND_9, 1, 1349),
+            ('1343', PriceChangeBatch.ROUND_9, -1, 1339),
+            ('1343', PriceChangeBatch.ROUND_9, 0, 1339),
+            ('1346', PriceChangeBatch.ROUND_9, 0, 1349),
+            ('1349', PriceChangeBatch.ROUND_9, -1, 1349),
+            ('1349', PriceChangeBatch.ROUND_9, 1, 1349),
+            ('1343.50', PriceChangeBatch.ROUND_99, 1, 1399),
+            ('1343.50', PriceChangeBatch.ROUND_99, -1, 1299),
+            ('1360', PriceChangeBatch.ROUND_99, 0, 1399),
+            ('100.40', PriceChangeBatch.ROUND_RUBLE, 1, 101),
+            ('100.60', PriceChangeBatch.ROUND_RUBLE, -1, 100),
+            ('100.40', PriceChangeBatch.ROUND_RUBLE, 0, 100),
+            # Цены с нужным окончанием ниже нет - остается неокругленная, а не 0
+            ('45', PriceChangeBatch.ROUND_99, -1, 45),
+            ('45', PriceChangeBatch.ROUND_99, 0, 45),
+            ('45', PriceChangeBatch.ROUND_99, 1, 99),
+            ('5.50', PriceChangeBatch.ROUND_9, -1, Decimal('5.50')),
+            ('0.40', PriceChangeBatch.ROUND_RUBLE, -1, Decimal('0.40')),
+        ]
+        for price, rounding, direction, expected in cases:
+            with self.subTest(price=price, rounding=rounding, direction=direction):
+                self.assertEqual(self.rounded(price, rounding, direction), expected)
+
+    def test_decrease_never_becomes_increase(self):
+        for rounding in [PriceChangeBatch.ROUND_9, PriceChangeBatch.ROUND_99]:
+            with self.subTest(rounding=rounding):
+                preview = preview_price_change(self.variations, PriceChangeBatch.PERCENT, Decimal(-1), rounding)
+                self.assertEqual(preview['count'], 4)
+                self.assertEqual(preview['increased'], 0)
+
+    def test_cheap_variation_is_not_zeroed(self):
+        cheap = Variation.objects.create(
+            product=create_product('Улун'), price=Decimal('50.00'), weight=50, pieces=1,
+            text_description_of_count='1 шт',
+        )
+        variations = Variation.objects.filter(pk=cheap.pk)
+        preview = preview_price_change(variations, PriceChangeBatch.PERCENT, Decimal(-10), PriceChangeBatch.ROUND_99)
+        self.assertEqual(preview['new_min'], Decimal('45'))
+
+        reprice_now(PriceChangeBatch(name='Скидка', mode=PriceChangeBatch.PERCENT, value=Decimal(-10),
+                                     rounding=PriceChangeBatch.ROUND_99), variations)
+        cheap.refresh_from_db()
+        self.assertEqual(cheap.price, Decimal('45.00'))
+
+    def test_increase_never_becomes_decrease(self):
+        preview = preview_price_change(
+            self.variations, PriceChangeBatch.FIXED, Decimal('0.5'), PriceChangeBatch.ROUND_99
+        )
+        self.assertEqual(preview['increased'], 4)
+        self.assertEqual(preview['new_min'], Decimal('1299'))
+        self.assertEqual(preview['new_max'], Decimal('1399'))
+
+
+class RepriceValidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('reprice_admin', password='password')
+
+    def test_blank_value_is_form_error(self):
+        for mode in [PriceChangeBatch.PERCENT, PriceChangeBatch.SET]:
+            with self.subTest(mode=mode):
+                form = RepriceForm({'mode': mode, 'value': ''})
+                self.assertFalse(form.is_valid())
+                self.assertIn('value', form.errors)
+
+    def test_api_blank_value_returns_400(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('promotions:reprice_variations'), {
+            'mode': PriceChangeBatch.PERCENT, 'value': '', 'filters': json.dumps({'price__gt': 0}), 'dry_run': '1',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('value', response.json()['errors'])
+
+
+class PriceChangeHistoryTests(TestCase):
+    def test_change_and_rollback_are_recorded(self):
+        variation = Variation.objects.create(
+            product=create_product('Пуэр'), price=Decimal('100.00'), weight=100, pieces=1,
+            text_description_of_count='1 шт',
+        )
+        created = variation.price_history.get().valid_from
+        applied_at = created + datetime.timedelta(hours=1)
+        rolled_back_at = created + datetime.timedelta(hours=2)
+
+        batch = reprice_now(
+            PriceChangeBatch(name='Скидка', mode=PriceChangeBatch.PERCENT, value=Decimal(-10)),
+            Variation.objects.filter(pk=variation.pk), now=applied_at,
+        )
+        rollback_price_change(batch, rolled_back_at)
+
+        history = VariationPriceHistory.objects.filter(variation=variation).order_by('valid_from')
+        self.assertEqual(list(history.values_list('price', 'valid_from', 'valid_to')), [
+            (Decimal('100.00'), created, applied_at),
+            (Decimal('90.00'), applied_at, rolled_back_at),
+            (Decimal('100.00'), rolled_back_at, None),
+        ])
+        self.assertEqual(price_at(variation.pk, applied_at), Decimal('90.00'))
+        self.assertEqual(price_at(variation.pk, rolled_back_at), Decimal('100.00'))
+
+
+class PricingEngineTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.product = create_product('Пуэр')
+        self.variation = Variation.objects.create(
+            product=self.product, price=Decimal('1000.00'), weight=100, pieces=1, text_description_of_count='1 шт'
+        )
+
+    def promotion(self, kind, starts_in=-1, ends_in=None, **fields):
+        hour = datetime.timedelta(hours=1)
+        return Promotion.objects.create(
+            name=kind, kind=kind, starts_at=self.now + starts_in * hour,
+            ends_at=self.now + ends_in * hour if ends_in is not None else None, **fields
+        )
+
+    def effective_price(self, now=None):
+        refresh_effective_prices(Variation.objects.filter(pk=self.variation.pk), now or self.now)
+        return EffectivePrice.objects.get(variation=self.variation)
+
+    def test_best_of_overlapping_promotions_wins(self):
+        self.promotion(Promotion.PERCENT, value=Decimal(10))
+        fixed = self.promotion(Promotion.FIXED, value=Decimal(150), product=self.product, ends_in=5)
+        future = self.promotion(Promotion.PERCENT, value=Decimal(50), starts_in=2)
+        self.promotion(Promotion.PERCENT, value=Decimal(90), product_type='coffee')
+
+        effective_price = self.effective_price()
+        self.assertEqual(effective_price.price, Decimal('850.00'))
+        self.assertEqual(effective_price.promotion_id, fixed.pk)
+        # Ближайшая граница - начало будущей акции, раньше окончания текущей
+        self.assertEqual(effective_price.valid_until, future.starts_at)
+
+        effective_price = self.effective_price(future.starts_at)
+        self.assertEqual(effective_price.price, Decimal('500.00'))
+        self.assertEqual(effective_price.promotion_id, future.pk)
+
+    def test_stale_prices_are_refreshed_when_promotion_ends(self):
+        self.promotion(Promotion.PERCENT, value=Decimal(20), ends_in=1)
+        self.assertEqual(self.effective_price().price, Decimal('800.00'))
+
+        self.assertEqual(refresh_stale_effective_prices(self.now + datetime.timedelta(hours=2)), 1)
+        effective_price = EffectivePrice.objects.get(variation=self.variation)
+        self.assertEqual(effective_price.price, Decimal('1000.00'))
+        self.assertIsNone(effective_price.promotion_id)
+
+    def test_most_generous_n_for_m_is_applied(self):
+        self.promotion(Promotion.N_FOR_M, buy_quantity=3, pay_quantity=2)
+        five_for_three = self.promotion(Promotion.N_FOR_M, buy_quantity=5, pay_quantity=3)
+        effective_price = self.effective_price()
+        self.assertEqual(effective_price.bundle_promotion_id, five_for_three.pk)
+        self.assertEqual(effective_price.price, Decimal('1000.00'))
+
+        # 7 штук: один комплект 5 по цене 3 и еще 2 по полной цене
+        cart = price_cart([(self.variation.pk, 7)])
+        self.assertEqual(cart['subtotal'], Decimal('5000.00'))
+
+    def test_cart_discount_never_exceeds_subtotal(self):
+        with self.assertRaises(ValidationError):
+            Promotion(name='Много', kind=Promotion.CART_PERCENT, value=Decimal(150), min_cart_total=Decimal(0),
+                      starts_at=self.now).full_clean()
+
+        # Уже сохраненная акция (до проверки в clean) не должна давать отрицательный итог
+        promotion = self.promotion(Promotion.CART_PERCENT, value=Decimal(150), min_cart_total=Decimal(100))
+        self.assertEqual(best_cart_discount(Decimal('300.00'), self.now), (promotion, Decimal('300.00')))
+
+        cart = price_cart([(self.variation.pk, 2)])
+        self.assertEqual(cart['discount'], cart['subtotal'])
+        self.assertEqual(cart['total'], Decimal('0.00'))
+
+    def test_cart_discount_respects_min_total(self):
+        self.promotion(Promotion.CART_FIXED, value=Decimal(100), min_cart_total=Decimal(5000))
+        ten_percent = self.promotion(Promotion.CART_PERCENT, value=Decimal(10), min_cart_total=Decimal(1000))
+        cart = price_cart([(self.variation.pk, 2)])
+        self.assertEqual(cart['cart_promotion'], ten_percent)
+        self.assertEqual(cart['total'], Decimal('1800.00'))
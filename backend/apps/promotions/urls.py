@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import reprice_variations
+
+
+app_name = 'promotions'
+
+urlpatterns = [
+    path('reprice/', reprice_variations, name='reprice_variations'),
+]
@@ -1,3 +1,32 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.http import require_POST
 
-# Create your views here.
+from apps.common.responses import FastJsonResponse
+from .forms import RepriceApiForm
+from .price_changes import preview_price_change, reprice_now
+
+
+@staff_member_required
+@require_POST
+def reprice_variations(request):
+    """
+    Переоценка вариаций по фильтру: filters (JSON), mode, value, rounding, name.
+    С dry_run=1 возвращает только итоги, цены не меняются.
+    """
+    if not request.user.has_perm('products.change_variation'):
+        return FastJsonResponse({'success': False, 'error': 'Нет права на изменение вариаций'}, status=403)
+
+    form = RepriceApiForm(request.POST)
+    if not form.is_valid():
+        return FastJsonResponse({'success': False, 'errors': form.errors.get_json_data()}, status=400)
+
+    batch = form.instance
+    variations = batch.variations()
+    if form.cleaned_data['dry_run']:
+        preview = preview_price_change(variations, batch.mode, batch.value, batch.rounding)
+        return FastJsonResponse({**preview, 'dry_run': True, 'success': True})
+
+    batch = reprice_now(batch, variations, user=request.user)
+    return FastJsonResponse({
+        'batch_id': batch.pk, 'affected_count': batch.affected_count, 'dry_run': False, 'success': True
+    })
@@ -1,3 +1,62 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Rating, Review
+
+
+class ReviewInline(admin.StackedInline):
+    model = Review
+    extra = 0
+    fields = ['title', 'text', 'status']
+
+
+@admin.register(Rating)
+class RatingAdmin(admin.ModelAdmin):
+    list_display = ['product', 'user', 'score', 'created']
+    list_filter = ['score', 'created']
+    search_fields = ['product__name', 'user__username']
+    autocomplete_fields = ['product', 'user']
+    list_select_related = ['product', 'user']
+    date_hierarchy = 'created'
+    list_per_page = 25
+
+    inlines = [ReviewInline]
+
+
+@admin.register(Review)
+class ReviewAdmin(admin.ModelAdmin):
+    list_display = ['short_text', 'product', 'author', 'score', 'helpful_count', 'status', 'created']
+    list_filter = ['status', 'created']
+    search_fields = ['title', 'text', 'product__name', 'rating__user__username']
+    list_editable = ['status']
+    readonly_fields = ['created', 'updated']
+    raw_id_fields = ['rating']
+    list_select_related = ['product', 'rating__user']
+    date_hierarchy = 'created'
+    actions = ['approve', 'reject']
+    list_per_page = 25
+
+    def short_text(self, obj):
+        return str(obj)
+
+    def author(self, obj):
+        return obj.rating.user.username
+
+    def score(self, obj):
+        return f'{obj.rating.score}★'
+
+    # Модерация идет через save(), чтобы агрегаты товара обновились в той же транзакции
+    @admin.action(description='Опубликовать')
+    def approve(self, request, queryset):
+        for review in queryset.exclude(status=Review.APPROVED).select_related('rating'):
+            review.status = Review.APPROVED
+            review.save(update_fields=['status', 'updated'])
+
+    @admin.action(description='Отклонить')
+    def reject(self, request, queryset):
+        for review in queryset.exclude(status=Review.REJECTED).select_related('rating'):
+            review.status = Review.REJECTED
+            review.save(update_fields=['status', 'updated'])
+
+    short_text.short_description = 'Отзыв'
+    author.short_description = 'Автор'
+    score.short_description = 'Оценка'
@@ -0,0 +1,74 @@
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from apps.products.models import Product
+from .models import Rating, Review
+
+
+AGGREGATE_FIELDS = ('rating_count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5')
+
+# Оценка попадает в агрегаты, если к ней нет отзыва или отзыв прошел модерацию
+COUNTED = Q(review__isnull=True) | Q(review__status=Review.APPROVED)
+
+
+def rating_contribution(rating_id):
+    """(product_id, score) оценки в текущем состоянии БД или None, если она не учитывается."""
+    if rating_id is None:
+        return None
+    return Rating.objects.filter(COUNTED, pk=rating_id).values_list('product_id', 'score').first()
+
+
+def _apply(contribution, sign):
+    product_id, score = contribution
+    Product.objects.filter(pk=product_id).update(**{
+        'rating_count': F('rating_count') + sign,
+        'rating_sum': F('rating_sum') + sign * score,
+        f'rating_{score}': F(f'rating_{score}') + sign,
+    })
+
+
+def apply_contribution_change(old, new):
+    if old == new:
+        return
+    if old is not None:
+        _apply(old, -1)
+    if new is not None:
+        _apply(new, 1)
+
+
+def computed_aggregates():
+    """Агрегаты, посчитанные заново по таблице оценок, сгруппированные по товару."""
+    return Rating.objects.filter(COUNTED).order_by().values('product_id').annotate(
+        rating_count=Count('pk'),
+        rating_sum=Sum('score'),
+        **{
+            f'rating_{score}': Count('pk', filter=Q(score=score))
+            for score in range(1, 6)
+        }
+    )
+
+
+def aggregate_subqueries():
+    aggregates = computed_aggregates().filter(product_id=OuterRef('pk'))
+    return {
+        field: Coalesce(Subquery(aggregates.values(field)[:1]), Value(0))
+        for field in AGGREGATE_FIELDS
+    }
+
+
+def rebuild_aggregates(products=None):
+    """Пересчитывает агрегаты одним UPDATE с коррелированными подзапросами."""
+    if products is None:
+        products = Product.objects.all()
+    return products.update(**aggregate_subqueries())
+
+
+def find_inconsistent_products(products=None):
+    """Товары, у которых сохраненные агрегаты расходятся с пересчитанными."""
+    if products is None:
+        products = Product.objects.all()
+    computed = {f'computed_{field}': expression for field, expression in aggregate_subqueries().items()}
+    mismatch = Q()
+    for field in AGGREGATE_FIELDS:
+        mismatch |= ~Q(**{field: F(f'computed_{field}')})
+    return products.annotate(**computed).filter(mismatch)
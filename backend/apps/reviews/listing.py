@@ -0,0 +1,112 @@
+import base64
+import json
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from apps.common.metrics import record_cache_access
+from apps.common.routers import use_primary
+from .models import Review
+
+
+NEWEST = 'newest'
+HELPFUL = 'helpful'
+
+SORT_FIELDS = {
+    NEWEST: 'created',
+    HELPFUL: 'helpful_count',
+}
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+TOP_REVIEWS_CACHE_TIMEOUT = 60 * 60
+
+REVIEW_FIELDS = (
+    'id', 'title', 'text', 'rating__score', 'rating__user__username', 'helpful_count', 'created',
+)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort_value, review_id):
+    payload = json.dumps([sort_value, review_id], default=str).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, review_id = json.loads(base64.urlsafe_b64decode(padded))
+        if sort == NEWEST:
+            sort_value = parse_datetime(sort_value)
+        else:
+            sort_value = int(sort_value)
+        review_id = int(review_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Некорректный курсор')
+    if sort_value is None:
+        raise InvalidCursor('Некорректный курсор')
+    return sort_value, review_id
+
+
+def serialize_review(row):
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'text': row['text'],
+        'score': row['rating__score'],
+        'author': row['rating__user__username'],
+        'helpful_count': row['helpful_count'],
+        'created': row['created'].isoformat(),
+    }
+
+
+def list_reviews(product_id, sort=NEWEST, cursor=None, limit=PAGE_SIZE):
+    """
+    Страница опубликованных отзывов с keyset-пагинацией по (sort_key, id).
+    Стоимость не зависит от номера страницы: каждый запрос - range scan по составному индексу.
+    """
+    sort_field = SORT_FIELDS[sort]
+    reviews = Review.objects.filter(product_id=product_id, status=Review.APPROVED)
+    if cursor:
+        sort_value, review_id = decode_cursor(cursor, sort)
+        reviews = reviews.filter(
+            Q(**{f'{sort_field}__lt': sort_value}) | Q(**{sort_field: sort_value, 'id__lt': review_id})
+        )
+    rows = list(reviews.order_by(f'-{sort_field}', '-id').values(*REVIEW_FIELDS)[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[sort_field], last['id'])
+
+    return {
+        'reviews': [serialize_review(row) for row in rows],
+        'next_cursor': next_cursor,
+    }
+
+
+def top_reviews_cache_key(product_id):
+    return f'reviews:top:{product_id}'
+
+
+def get_top_reviews(product_id):
+    """Первая страница "самых полезных" отзывов - из кеша, сбрасывается при изменении отзывов и голосов."""
+    key = top_reviews_cache_key(product_id)
+    page = cache.get(key)
+    record_cache_access('reviews:top', page is not None)
+    if page is None:
+        # Страница живет в кеше час - строим ее по основной базе, а не по отстающей реплике
+        with use_primary():
+            page = list_reviews(product_id, sort=HELPFUL)
+        cache.set(key, page, TOP_REVIEWS_CACHE_TIMEOUT)
+    return page
+
+
+def invalidate_top_reviews(product_id):
+    transaction.on_commit(lambda: cache.delete(top_reviews_cache_key(product_id)))
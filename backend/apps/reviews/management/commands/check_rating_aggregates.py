@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.products.models import Product
+from apps.reviews.aggregates import AGGREGATE_FIELDS, find_inconsistent_products, rebuild_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Проверяет, что сохраненные агрегаты оценок совпадают с пересчитанными по таблице оценок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Пересчитать агрегаты у расходящихся товаров')
+        parser.add_argument('--limit', type=int, default=20, help='Сколько расхождений вывести')
+
+    def handle(self, *args, **options):
+        inconsistent = find_inconsistent_products()
+        fields = [
+            value for field in AGGREGATE_FIELDS for value in (field, f'computed_{field}')
+        ]
+        rows = list(inconsistent.values('pk', 'name', *fields)[:options['limit']])
+        if not rows:
+            self.stdout.write(self.style.SUCCESS('Агрегаты оценок согласованы.'))
+            return
+
+        total = inconsistent.count()
+        for row in rows:
+            diff = ', '.join(
+                f'{field}: {row[field]} != {row[f"computed_{field}"]}'
+                for field in AGGREGATE_FIELDS if row[field] != row[f'computed_{field}']
+            )
+            self.stdout.write(f'#{row["pk"]} {row["name"]}: {diff}')
+
+        if options['fix']:
+            with transaction.atomic():
+                fixed = rebuild_aggregates(Product.objects.filter(pk__in=find_inconsistent_products().values('pk')))
+            self.stdout.write(self.style.SUCCESS(f'Исправлено товаров: {fixed}'))
+        else:
+            raise CommandError(f'Найдено расхождений: {total}')
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.products.models import Product
+from apps.reviews.aggregates import rebuild_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает агрегаты оценок товаров (количество, сумма, гистограмма 1-5) по таблице оценок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', type=int, nargs='*', help='Пересчитать только указанные товары')
+
+    def handle(self, *args, **options):
+        products = Product.objects.all()
+        if options['product']:
+            products = products.filter(pk__in=options['product'])
+
+        started_at = time.monotonic()
+        with transaction.atomic():
+            count = rebuild_aggregates(products)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитаны агрегаты {count} товаров за {time.monotonic() - started_at:.1f} с'
+        ))
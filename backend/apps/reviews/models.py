@@ -1,3 +1,85 @@
-from django.db import models
+from django.contrib.auth import get_user_model
+from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db import models, transaction
 
-# Create your models here.
+User = get_user_model()
+
+
+class Rating(models.Model):
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='ratings')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ratings')
+    score = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('product', 'user')
+
+    def __str__(self):
+        return f'{self.product_id}: {self.score}★'
+
+    # Агрегаты товара обновляются сигналами - сохранение и удаление оборачиваем в транзакцию,
+    # чтобы оценка и агрегаты менялись атомарно
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+
+class Review(models.Model):
+    PENDING = 'pending'
+    APPROVED = 'approved'
+    REJECTED = 'rejected'
+
+    STATUSES = (
+        (PENDING, 'На модерации'),
+        (APPROVED, 'Опубликован'),
+        (REJECTED, 'Отклонен'),
+    )
+
+    rating = models.OneToOneField(Rating, on_delete=models.CASCADE, related_name='review')
+    # Денормализовано из rating для индексов выдачи отзывов по товару
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='reviews', editable=False)
+    title = models.CharField(max_length=200, blank=True)
+    text = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUSES, default=PENDING)
+    helpful_count = models.IntegerField(default=0, editable=False)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ('-created',)
+        # Под keyset-пагинацию: WHERE product = ? AND status = ? ORDER BY <sort_key> DESC, id DESC
+        indexes = [
+            models.Index(fields=['product', 'status', '-created', '-id'], name='review_product_newest_idx'),
+            models.Index(fields=['product', 'status', '-helpful_count', '-id'], name='review_product_helpful_idx'),
+        ]
+
+    def __str__(self):
+        return self.title or self.text[:50]
+
+    def save(self, *args, **kwargs):
+        self.product_id = self.rating.product_id
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+
+class ReviewVote(models.Model):
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='votes')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='review_votes')
+    helpful = models.BooleanField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('review', 'user')
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
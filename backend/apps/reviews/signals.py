@@ -0,0 +1,82 @@
+from django.db.models import F, signals
+from django.dispatch import receiver
+
+from .aggregates import rating_contribution, apply_contribution_change
+from .listing import invalidate_top_reviews
+from .models import Rating, Review, ReviewVote
+
+
+def remember_contribution(rating_id, instance):
+    instance._previous_contribution = rating_contribution(rating_id)
+
+
+def update_contribution(rating_id, instance):
+    apply_contribution_change(getattr(instance, '_previous_contribution', None), rating_contribution(rating_id))
+
+
+@receiver(signals.pre_save, sender=Rating)
+def rating_pre_save(sender, instance, **kwargs):
+    remember_contribution(instance.pk, instance)
+
+
+@receiver(signals.post_save, sender=Rating)
+def rating_post_save(sender, instance, **kwargs):
+    update_contribution(instance.pk, instance)
+
+
+@receiver(signals.post_delete, sender=Rating)
+def rating_post_delete(sender, instance, **kwargs):
+    # Отзыв удаляется каскадно раньше оценки, и его post_delete уже вернул оценку в агрегаты,
+    # поэтому к этому моменту оценка учтена всегда
+    apply_contribution_change((instance.product_id, instance.score), None)
+
+
+@receiver(signals.pre_save, sender=Review)
+def review_pre_save(sender, instance, **kwargs):
+    remember_contribution(instance.rating_id, instance)
+
+
+@receiver(signals.post_save, sender=Review)
+def review_post_save(sender, instance, **kwargs):
+    update_contribution(instance.rating_id, instance)
+    invalidate_top_reviews(instance.product_id)
+
+
+@receiver(signals.pre_delete, sender=Review)
+def review_pre_delete(sender, instance, **kwargs):
+    remember_contribution(instance.rating_id, instance)
+
+
+@receiver(signals.post_delete, sender=Review)
+def review_post_delete(sender, instance, **kwargs):
+    update_contribution(instance.rating_id, instance)
+    invalidate_top_reviews(instance.product_id)
+
+
+@receiver(signals.pre_save, sender=ReviewVote)
+def review_vote_pre_save(sender, instance, **kwargs):
+    instance._previous_helpful = False
+    if instance.pk:
+        instance._previous_helpful = ReviewVote.objects.filter(
+            pk=instance.pk, helpful=True
+        ).exists()
+
+
+@receiver(signals.post_save, sender=ReviewVote)
+def review_vote_post_save(sender, instance, **kwargs):
+    delta = int(instance.helpful) - int(instance._previous_helpful)
+    if delta:
+        update_helpful_count(instance.review_id, delta)
+
+
+@receiver(signals.post_delete, sender=ReviewVote)
+def review_vote_post_delete(sender, instance, **kwargs):
+    if instance.helpful:
+        update_helpful_count(instance.review_id, -1)
+
+
+def update_helpful_count(review_id, delta):
+    Review.objects.filter(pk=review_id).update(helpful_count=F('helpful_count') + delta)
+    product_id = Review.objects.filter(pk=review_id).values_list('product_id', flat=True).first()
+    if product_id is not None:
+        invalidate_top_reviews(product_id)
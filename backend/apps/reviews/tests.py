@@ -1,3 +1,182 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.products.models import Product
+from apps.products.tests import create_product
+from apps.reviews.aggregates import AGGREGATE_FIELDS, find_inconsistent_products
+from apps.reviews.listing import HELPFUL, NEWEST, InvalidCursor, get_top_reviews, list_reviews
+from apps.reviews.models import Rating, Review, ReviewVote
+
+User = get_user_model()
+
+
+def create_review(product, username, score=5, status=Review.APPROVED, **fields):
+    rating = Rating.objects.create(product=product, user=User.objects.create(username=username), score=score)
+    return Review.objects.create(rating=rating, text=f'Отзыв {username}', status=status, **fields)
+
+
+class RatingAggregateTests(TestCase):
+    def setUp(self):
+        self.product = create_product('Пуэр')
+        self.other = create_product('Улун')
+
+    def assertAggregates(self, *scores):
+        """Сохраненные сигналами агрегаты равны ожидаемым и пересчитанным заново."""
+        product = Product.objects.values(*AGGREGATE_FIELDS).get(pk=self.product.pk)
+        expected = {'rating_count': len(scores), 'rating_sum': sum(scores)}
+        expected.update({f'rating_{score}': scores.count(score) for score in range(1, 6)})
+        self.assertEqual(product, expected)
+        self.assertFalse(find_inconsistent_products().exists())
+
+    def test_rating_without_review_is_counted(self):
+        rating = Rating.objects.create(product=self.product, user=User.objects.create(username='a'), score=4)
+        Rating.objects.create(product=self.other, user=User.objects.create(username='b'), score=1)
+        self.assertAggregates(4)
+
+        rating.score = 2
+        rating.save()
+        self.assertAggregates(2)
+
+        rating.delete()
+        self.assertAggregates()
+
+    def test_review_moderation_controls_counting(self):
+        review = create_review(self.product, 'a', score=5, status=Review.PENDING)
+        create_review(self.product, 'b', score=3)
+        self.assertAggregates(3)
+
+        review.status = Review.APPROVED
+        review.save()
+        self.assertAggregates(5, 3)
+
+        review.rating.score = 1
+        review.rating.save()
+        self.assertAggregates(1, 3)
+
+        review.status = Review.REJECTED
+        review.save()
+        self.assertAggregates(3)
+
+    def test_deleting_review_and_rating(self):
+        review = create_review(self.product, 'a', score=5, status=Review.REJECTED)
+        approved = create_review(self.product, 'b', score=4)
+        self.assertAggregates(4)
+
+        # Без отзыва оценка снова учитывается
+        review.delete()
+        self.assertAggregates(5, 4)
+
+        # Каскад: отзыв удаляется вместе с оценкой, вклад вычитается один раз
+        approved.rating.delete()
+        self.assertAggregates(5)
+
+
+class ReviewVoteTests(TestCase):
+    def setUp(self):
+        self.review = create_review(create_product('Пуэр'), 'author')
+        self.voter = User.objects.create(username='voter')
+        self.client.force_login(self.voter)
+        self.url = reverse('reviews:vote_review', args=[self.review.pk])
+
+    def vote(self, helpful):
+        response = self.client.post(self.url, {'helpful': '1' if helpful else '0'})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['helpful_count']
+
+    def test_repeated_and_changed_votes(self):
+        self.assertEqual(self.vote(True), 1)
+        self.assertEqual(self.vote(True), 1)
+        self.assertEqual(self.vote(False), 0)
+        self.assertEqual(self.vote(False), 0)
+        self.assertEqual(self.vote(True), 1)
+        self.assertEqual(ReviewVote.objects.filter(review=self.review).count(), 1)
+
+    def test_vote_created_concurrently_is_updated(self):
+        # Параллельный запрос создал голос между проверкой и INSERT: проверка "не видит" его
+        ReviewVote.objects.create(review=self.review, user=self.voter, helpful=False)
+        with mock.patch.object(QuerySet, 'exists', return_value=False):
+            self.assertEqual(self.vote(True), 1)
+        with mock.patch.object(QuerySet, 'exists', return_value=False):
+            self.assertEqual(self.vote(True), 1)
+        self.assertTrue(ReviewVote.objects.get(review=self.review, user=self.voter).helpful)
+
+
+class ReviewListingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = create_product('Пуэр')
+        # Много одинаковых helpful_count - порядок внутри группы держится на id
+        cls.reviews = [
+            create_review(cls.product, f'user{i}', helpful_count=i % 3) for i in range(25)
+        ]
+        create_review(cls.product, 'hidden', status=Review.PENDING, helpful_count=100)
+
+    def walk(self, sort, limit):
+        ids, cursor = [], None
+        while True:
+            page = list_reviews(self.product.pk, sort=sort, cursor=cursor, limit=limit)
+            ids += [review['id'] for review in page['reviews']]
+            cursor = page['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_every_review_once_in_order(self):
+        by_helpful = sorted(self.reviews, key=lambda review: (review.helpful_count, review.pk), reverse=True)
+        by_newest = sorted(self.reviews, key=lambda review: (review.created, review.pk), reverse=True)
+        for limit in [1, 7, 25, 100]:
+            with self.subTest(limit=limit):
+                self.assertEqual(self.walk(HELPFUL, limit), [review.pk for review in by_helpful])
+                self.assertEqual(self.walk(NEWEST, limit), [review.pk for review in by_newest])
+
+    def test_cursor_is_stable_when_reviews_are_added(self):
+        first = list_reviews(self.product.pk, sort=NEWEST, limit=10)
+        create_review(self.product, 'late')
+        second = list_reviews(self.product.pk, sort=NEWEST, cursor=first['next_cursor'], limit=10)
+        expected = sorted(self.reviews, key=lambda review: (review.created, review.pk), reverse=True)
+        self.assertEqual(
+            [review['id'] for review in first['reviews'] + second['reviews']], [review.pk for review in expected[:20]]
+        )
+
+    def test_invalid_cursor(self):
+        for cursor in ['garbage', 'W251bGwsIDFd']:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                list_reviews(self.product.pk, sort=HELPFUL, cursor=cursor)
+        response = self.client.get(reverse('reviews:product_reviews', args=[self.product.pk]), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'top-reviews-tests'}})
+class TopReviewsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = create_product('Пуэр')
+        self.review = create_review(self.product, 'author')
+        self.other = create_review(self.product, 'other')
+
+    def top_ids(self):
+        return [review['id'] for review in get_top_reviews(self.product.pk)['reviews']]
+
+    def test_page_is_served_from_cache(self):
+        self.top_ids()
+        with self.assertNumQueries(0):
+            self.top_ids()
+
+    def test_vote_invalidates_page(self):
+        self.assertEqual(self.top_ids(), [self.other.pk, self.review.pk])
+        self.client.force_login(User.objects.create(username='voter'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('reviews:vote_review', args=[self.review.pk]), {'helpful': '1'})
+        self.assertEqual(self.top_ids(), [self.review.pk, self.other.pk])
+
+    def test_moderation_invalidates_page(self):
+        self.top_ids()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.status = Review.REJECTED
+            self.other.save()
+        self.assertEqual(self.top_ids(), [self.review.pk])
@@ -0,0 +1,12 @@
+from django.urls import path
+from .views import (
+    product_reviews, vote_review
+)
+
+
+app_name = 'reviews'
+
+urlpatterns = [
+    path('products/<int:product_id>/', product_reviews, name='product_reviews'),
+    path('<int:review_id>/vote/', vote_review, name='vote_review'),
+]
@@ -1,3 +1,53 @@
-from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.db import IntegrityError
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET, require_POST
 
-# Create your views here.
+from apps.common.responses import FastJsonResponse
+from .listing import HELPFUL, SORT_FIELDS, PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, list_reviews, get_top_reviews
+from .models import Review, ReviewVote
+from .signals import update_helpful_count
+
+
+@require_GET
+def product_reviews(request, product_id):
+    sort = request.GET.get('sort', HELPFUL)
+    if sort not in SORT_FIELDS:
+        return FastJsonResponse({'success': False, 'error': f'sort must be one of: {", ".join(SORT_FIELDS)}'}, status=400)
+    cursor = request.GET.get('cursor')
+    try:
+        limit = min(max(int(request.GET.get('limit', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        limit = PAGE_SIZE
+
+    try:
+        if sort == HELPFUL and not cursor and limit == PAGE_SIZE:
+            page = get_top_reviews(product_id)
+        else:
+            page = list_reviews(product_id, sort=sort, cursor=cursor, limit=limit)
+    except InvalidCursor as e:
+        return FastJsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    return FastJsonResponse({**page, 'success': True})
+
+
+@login_required
+@require_POST
+def vote_review(request, review_id):
+    review = get_object_or_404(Review, pk=review_id, status=Review.APPROVED)
+    helpful = request.POST.get('helpful', '1') not in ('0', 'false', '')
+    votes = ReviewVote.objects.filter(review=review, user=request.user)
+    created = False
+    if not votes.exists():
+        try:
+            # ReviewVote.save() сам открывает atomic-блок (savepoint в транзакции) - ошибка откатывает только его
+            ReviewVote.objects.create(review=review, user=request.user, helpful=helpful)
+            created = True
+        except IntegrityError:
+            # Параллельный запрос (двойной клик) успел создать голос - дальше он обновляется как существующий
+            pass
+    # Условный UPDATE меняет голос ровно один раз, даже если одинаковых запросов несколько
+    if not created and votes.exclude(helpful=helpful).update(helpful=helpful):
+        update_helpful_count(review.pk, 1 if helpful else -1)
+    review.refresh_from_db(fields=['helpful_count'])
+    return FastJsonResponse({'helpful_count': review.helpful_count, 'success': True})
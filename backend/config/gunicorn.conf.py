@@ -0,0 +1,19 @@
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+# Каталог для файлов метрик воркеров (apps/common/metrics.py). Очищается при старте мастера,
+# иначе значения счетчиков переживали бы перезапуск
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus_multiproc')
+
+wsgi_app = 'config.wsgi:application'
+
+
+def on_starting(server):
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR)
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
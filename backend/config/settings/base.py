@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -53,11 +54,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.common.metrics.MetricsMiddleware',
+    'apps.common.middleware.QueryInstrumentationMiddleware',
+    'apps.common.routers.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'apps.common.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.common.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -85,13 +92,82 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite для одиночного сервера: WAL позволяет читать во время записи, а BEGIN IMMEDIATE берет блокировку
+# записи в начале транзакции, и конкурирующий писатель ждет busy_timeout вместо мгновенного
+# "database is locked" при повышении блокировки. SQLITE_TUNING=0 возвращает настройки SQLite по умолчанию.
+
+SQLITE_TUNING = os.environ.get('SQLITE_TUNING', '1') == '1'
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # В режиме WAL NORMAL не теряет целостность, только последние транзакции при сбое питания
+    'synchronous': 'NORMAL',
+    'busy_timeout': 10_000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение - размер в КиБ
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+        } if SQLITE_TUNING else {},
     }
 }
 
+# Реплики для чтения каталога (apps/common/routers.py). Для SQLite это копии основного файла,
+# которые обновляет команда sync_sqlite_replicas; в тестах реплики зеркалируют основную базу
+SQLITE_REPLICAS = int(os.environ.get('SQLITE_REPLICAS', 0))
+
+for number in range(1, SQLITE_REPLICAS + 1):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'NAME': f"{DATABASES['default']['NAME']}.replica{number}",
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['apps.common.routers.ReplicaRouter']
+
+# Сколько секунд после записи чтения клиента идут на основную базу
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# CACHE_BACKEND: locmem (по умолчанию, на процесс), file (общий для процессов одной машины) или redis.
+# В prod по умолчанию redis, locmem там запрещен (config/settings/prod.py)
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+
+CACHE_LOCATIONS = {
+    'locmem': 'default',
+    'file': str(BASE_DIR / 'cache'),
+    'redis': 'redis://127.0.0.1:6379/0',
+}
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.environ.get('CACHE_LOCATION', CACHE_LOCATIONS[CACHE_BACKEND]),
+        'TIMEOUT': 300,
+    }
+}
+
+# Как часто процесс сверяет версии справочников в памяти (apps/products/reference.py) с общим кешем, с
+REFERENCE_CHECK_INTERVAL = float(os.environ.get('REFERENCE_CHECK_INTERVAL', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -128,8 +204,128 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = os.environ.get('STATIC_ROOT', BASE_DIR / 'staticfiles')
+
+# collectstatic добавляет в имена файлов хеш содержимого и рядом кладет сжатые .gz и .br
+# (brotli - если установлен пакет brotli), сжимая файлы параллельно в потоках.
+# WhiteNoiseMiddleware отдает их без отдельного веб-сервера: файлы с хешем - с
+# Cache-Control: max-age=315360000, immutable, сжатый вариант выбирается по Accept-Encoding.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Файлы без хеша в имени (favicon.ico, robots.txt и т.п.), с
+WHITENOISE_MAX_AGE = int(os.environ.get('WHITENOISE_MAX_AGE', 60 * 60))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Performance instrumentation
+# Счетчики SQL-запросов и Server-Timing на каждый запрос, бюджеты и поиск N+1
+
+PERFORMANCE_INSTRUMENTATION = os.environ.get('PERFORMANCE_INSTRUMENTATION', '0') == '1'
+
+PERFORMANCE_QUERY_BUDGET = int(os.environ.get('PERFORMANCE_QUERY_BUDGET', 50))
+
+PERFORMANCE_TIME_BUDGET_MS = int(os.environ.get('PERFORMANCE_TIME_BUDGET_MS', 500))
+
+# Бюджеты отдельных URL по имени представления: {'products:catalog': {'queries': 5, 'time_ms': 100}}
+PERFORMANCE_BUDGETS = {
+    'products:catalog': {'queries': 5, 'time_ms': 200},
+    'products:get_variations_for_product': {'queries': 5, 'time_ms': 100},
+    'products:search_products': {'queries': 3, 'time_ms': 100},
+    'products:search_variations': {'queries': 3, 'time_ms': 100},
+    # Пробная переоценка агрегирует весь отфильтрованный каталог
+    'promotions:reprice_variations': {'queries': 3, 'time_ms': 200},
+    'reviews:product_reviews': {'queries': 3, 'time_ms': 100},
+}
+
+PERFORMANCE_DUPLICATE_QUERY_THRESHOLD = 5
+
+
+# Compression
+# Сжатие ответов API (apps/common/compression.py): brotli или gzip по Accept-Encoding
+
+COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', '1') == '1'
+
+# Ответы меньше этого размера (байт) отдаются без сжатия
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+
+COMPRESSION_CONTENT_TYPES = ['application/json']
+
+# Уровни подобраны для динамических ответов: максимальный brotli (11) сжимает в десятки раз медленнее
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_GZIP_LEVEL = 6
+
+
+# Metrics
+# /metrics в формате Prometheus. Под gunicorn задайте PROMETHEUS_MULTIPROC_DIR (см. config/gunicorn.conf.py)
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '0') == '1'
+
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1').split(',')
+
+METRICS_BUSINESS_TTL = 30
+
+METRICS_LOW_STOCK_THRESHOLD = 5
+
+
+# Profiling
+# Профилирование запросов персонала по заголовку X-Profile или параметру ?_profile=cprofile|sampling
+
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'
+
+PROFILING_DIR = os.environ.get('PROFILING_DIR', BASE_DIR / 'profiles')
+
+PROFILING_DEFAULT_MODE = 'sampling'
+
+PROFILING_SAMPLING_INTERVAL_MS = float(os.environ.get('PROFILING_SAMPLING_INTERVAL_MS', 5))
+
+PROFILING_RETENTION_HOURS = int(os.environ.get('PROFILING_RETENTION_HOURS', 72))
+
+PROFILING_MAX_FILES = int(os.environ.get('PROFILING_MAX_FILES', 200))
+
+
+# Exports
+# Выгрузка списков админки в CSV/XLSX (apps/common/exports.py), большие - в фоне командой run_export_jobs
+
+EXPORT_DIR = os.environ.get('EXPORT_DIR', BASE_DIR / 'exports')
+
+# Строк, читаемых из БД за раз
+EXPORT_CHUNK_SIZE = 2000
+
+# До этого числа строк CSV отдается сразу потоковым ответом, больше - через фоновое задание
+EXPORT_SYNC_MAX_ROWS = int(os.environ.get('EXPORT_SYNC_MAX_ROWS', 10_000))
+
+EXPORT_RETENTION_HOURS = int(os.environ.get('EXPORT_RETENTION_HOURS', 24))
+
+# Задание дольше этого в статусе running считается брошенным (воркер упал) и возвращается в очередь
+EXPORT_STALE_MINUTES = int(os.environ.get('EXPORT_STALE_MINUTES', 60))
+
+EXPORT_MAX_ATTEMPTS = 3
+
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'apps.common.performance': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
@@ -13,6 +13,12 @@ INSTALLED_APPS = [
 
 STATIC_URL = "static/"
 
+# В разработке файлы берутся из приложений без collectstatic и манифеста
+STORAGES = {
+    **STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 # TEMPLATES = [
 #     {
 #         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -26,6 +32,8 @@ MIDDLEWARE = [
     *MIDDLEWARE,
 ]
 
+PERFORMANCE_INSTRUMENTATION = True
+
 INTERNAL_IPS = [
     "127.0.0.1",
 ]
@@ -1,4 +1,68 @@
+from django.core.exceptions import ImproperlyConfigured
+
 from .base import *
 
 DEBUG = False
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', SECRET_KEY)
+
+
+# Database
+# PostgreSQL с пулом соединений psycopg (DATABASE_POOL=1, по умолчанию) или с постоянными
+# соединениями на поток (DATABASE_POOL=0, DATABASE_CONN_MAX_AGE секунд).
+# Django не допускает CONN_MAX_AGE > 0 вместе с пулом: соединение возвращается в пул в конце запроса.
+
+DATABASE_POOL = os.environ.get('DATABASE_POOL', '1') == '1'
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('POSTGRES_DB', 'shop'),
+        'USER': os.environ.get('POSTGRES_USER', 'shop'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        # При пуле проверка выполняется самим пулом при выдаче соединения (ConnectionPool.check_connection)
+        'CONN_HEALTH_CHECKS': True,
+        'CONN_MAX_AGE': 0 if DATABASE_POOL else int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
+        'OPTIONS': {},
+    }
+}
+
+if DATABASE_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', 10)),
+        # Сколько секунд запрос ждет свободное соединение, прежде чем получить PoolTimeout
+        'timeout': float(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),
+        'max_idle': float(os.environ.get('DATABASE_POOL_MAX_IDLE', 600)),
+        'max_lifetime': float(os.environ.get('DATABASE_POOL_MAX_LIFETIME', 3600)),
+    }
+
+# Реплики для чтения каталога: POSTGRES_REPLICA_HOSTS=replica1:5432,replica2:5432
+for number, address in enumerate(filter(None, os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(',')), 1):
+    host, _, port = address.partition(':')
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+
+# Cache
+# Кеш должен быть общим для всех воркеров: на нем держатся инвалидация тегов, single-flight блокировки,
+# версии справочников и индекс промокодов. locmem у каждого воркера свой - такие настройки не запускаем.
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'redis')
+
+if CACHE_BACKEND == 'locmem':
+    raise ImproperlyConfigured('CACHE_BACKEND=locmem не подходит для prod: кеш не общий для воркеров')
+
+CACHES['default'].update(
+    BACKEND=CACHE_BACKENDS[CACHE_BACKEND],
+    LOCATION=os.environ.get('CACHE_LOCATION', CACHE_LOCATIONS[CACHE_BACKEND]),
+)
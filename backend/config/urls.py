@@ -1,14 +1,19 @@
 from django.urls import include, path
 from django.contrib import admin
 from django.urls import path
-from debug_toolbar.toolbar import debug_toolbar_urls
 
 from django.conf import settings
 
+from apps.common.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/', include('apps.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
-if settings.DEBUG:
+if settings.DEBUG and 'debug_toolbar' in settings.INSTALLED_APPS:
+    # debug_toolbar установлен только в dev-окружении
+    from debug_toolbar.toolbar import debug_toolbar_urls
+
     urlpatterns += debug_toolbar_urls()